@@ -1,19 +1,21 @@
 from __future__ import unicode_literals
 
-import os, sys
+import atexit, os, sys
 
 # project libs
 from botlib import BotConfig
 from botlib.api.lineapi import LineApi
 from botlib.botlogger import BotLogger
 from botlib.botresponse import BotResponse, BotResponseLanguage
+from botlib.event_worker import EventWorkerPool
 from botlib.converter.audio_converter import AudioConvert
 from botlib.converter.speech_to_text import SpeechToText
-from botlib.services import match_service, Services
+from botlib.services import activity, match_service, news, Services
+from botlib.services.news.fetcher import NewsFetcher
 from botlib.semantic_analyzer import SemanticAnalyzer
 
 # flask libs
-from flask import abort, Flask, request, send_from_directory, make_response
+from flask import abort, copy_current_request_context, Flask, jsonify, request, send_from_directory, make_response
 
 # line bot apis
 from linebot import LineBotApi, WebhookHandler, WebhookParser
@@ -31,6 +33,78 @@ parser = WebhookParser(channel_secret = BotConfig.LINE_CHANNEL_SECRET)
 
 sys.path.append(os.path.join(BotConfig.PROJECT_ROOT))
 
+# 處理 webhook events 的 worker pool，關閉時會等待剩下的 events 處理完畢
+event_pool = EventWorkerPool(BotConfig.EVENT_WORKER_COUNT, BotConfig.EVENT_QUEUE_SIZE)
+event_pool.start()
+atexit.register(event_pool.shutdown, BotConfig.EVENT_DRAIN_TIMEOUT)
+
+# 在背景定期將各媒體的最新文章存到本地的 index，查詢新聞時會先查 index
+news.start_ingester()
+
+# 啟動時就開啟 activity store（第一次開啟會建立或轉換資料庫），不用讓第一個活動 request 等待
+activity.get_store()
+
+
+def handle_audio_event( event: MessageEvent ) -> None :
+    """
+    處理一個 AudioMessage event（下載音檔、STT、語意辨識、執行服務、傳送結果）
+    由 event_pool 的 worker 執行，所以不會佔住 webhook 的 request
+
+    :param event: 已經通過檢查的 MessageEvent（message 為 AudioMessage）
+    :return: None
+    """
+
+    # get userid, reply_token, channel_token
+    userid = event.source.user_id
+    reply_token = event.reply_token
+    channel_token = BotConfig.LINE_CHANNEL_TOKEN
+
+    # 將 User 傳送的 Audio Message 轉存為 m4a 音檔
+    m4a_tmp_path = LineApi.save_audio_message_as_m4a(userid, event.message, line_bot_api)
+
+    # 必須將 m4a 轉成 wav 才能進行 STT(語音辨識)
+    wav_tmp_path = AudioConvert.m4a_to_wav(m4a_tmp_path)
+
+    # STT, 同時以中文及台語辨識 audio 的內容，若中文結果已經能對應到服務就不等台語的結果
+    is_known_service = lambda text : SemanticAnalyzer.guess_service(text) != Services.UNKNOWN
+    c2c_result, t2c_result = SpeechToText.duo_lang_to_cht(wav_tmp_path, concurrent = True, is_known_service = is_known_service)
+
+
+    def parse_content_and_match_service( stt_text: str, default_lang: BotResponseLanguage ) -> BotResponse :
+        # 將辨識內容進行語意辨識
+        analyzer = SemanticAnalyzer(stt_text, default_lang)
+        analyzer.parse_content()
+
+        # 根據語意辨識結果進行對應服務並獲得結果（RESPONSE）
+        return match_service(analyzer = analyzer)
+
+
+    # check if c2c result meaningful
+    c2c_response = t2c_response = None
+    c2c_meaningful = t2c_meaningful = False
+
+    if c2c_result is not None :
+        c2c_response = parse_content_and_match_service(c2c_result, BotResponseLanguage.CHINESE)
+        c2c_meaningful = not c2c_response.is_unknown_service
+
+    # if c2c result not meaningful, check t2c result
+    if t2c_result is not None and c2c_meaningful == False :
+        t2c_response = parse_content_and_match_service(t2c_result, BotResponseLanguage.TAIWANESE)
+        t2c_meaningful = not t2c_response.is_unknown_service
+
+    # 兩種語言都辨識失敗（Unknown Service）
+    if c2c_meaningful == t2c_meaningful == False :
+        err_msg = f"非常抱歉，我聽不懂你的需求，請再說一遍"
+        speech_text = f"\n中文：({c2c_result})\n台語：({t2c_result})\n"
+        response = BotResponse.make_inform_response(speech_text, err_msg, BotResponseLanguage.CHINESE)
+
+    # 中文或台語辨識成功
+    else :
+        response = c2c_response if c2c_meaningful else t2c_response
+
+    # 傳送 response
+    LineApi.send_response(userid, channel_token, response)
+
 
 # 接收 http POST requests
 @app.route("/post_message", methods = ['POST'])
@@ -53,55 +127,10 @@ def callback() :
             # MessageEvent 的 message 需要是 Audio Message
             if isinstance(event.message, AudioMessage) :
 
-                # get userid, reply_token, channel_token
-                userid = event.source.user_id
-                reply_token = event.reply_token
-                channel_token = BotConfig.LINE_CHANNEL_TOKEN
-
-                # 將 User 傳送的 Audio Message 轉存為 m4a 音檔
-                m4a_tmp_path = LineApi.save_audio_message_as_m4a(userid, event.message, line_bot_api)
-
-                # 必須將 m4a 轉成 wav 才能進行 STT(語音辨識)
-                wav_tmp_path = AudioConvert.m4a_to_wav(m4a_tmp_path)
-
-                # STT, 將 audio 的內容辨識成中文
-                c2c_result, t2c_result = SpeechToText.duo_lang_to_cht(wav_tmp_path)
-
-
-                def parse_content_and_match_service( stt_text: str, default_lang: BotResponseLanguage ) -> BotResponse :
-                    # 將辨識內容進行語意辨識
-                    analyzer = SemanticAnalyzer(stt_text, default_lang)
-                    analyzer.parse_content()
-
-                    # 根據語意辨識結果進行對應服務並獲得結果（RESPONSE）
-                    return match_service(analyzer = analyzer)
-
-
-                # check if c2c result meaningful
-                c2c_response = t2c_response = None
-                c2c_meaningful = t2c_meaningful = False
-
-                if c2c_result is not None :
-                    c2c_response = parse_content_and_match_service(c2c_result, BotResponseLanguage.CHINESE)
-                    c2c_meaningful = not c2c_response.is_unknown_service
-
-                # if c2c result not meaningful, check t2c result
-                if t2c_result is not None and c2c_meaningful == False :
-                    t2c_response = parse_content_and_match_service(t2c_result, BotResponseLanguage.TAIWANESE)
-                    t2c_meaningful = not t2c_response.is_unknown_service
-
-                # 兩種語言都辨識失敗（Unknown Service）
-                if c2c_meaningful == t2c_meaningful == False :
-                    err_msg = f"非常抱歉，我聽不懂你的需求，請再說一遍"
-                    speech_text = f"\n中文：({c2c_result})\n台語：({t2c_result})\n"
-                    response = BotResponse.make_inform_response(speech_text, err_msg, BotResponseLanguage.CHINESE)
-
-                # 中文或台語辨識成功
-                else :
-                    response = c2c_response if c2c_meaningful else t2c_response
-
-                # 傳送 response
-                LineApi.send_response(userid, channel_token, response)
+                # 交給 worker 處理，webhook 直接回傳（保留 request context 讓 worker 可以取得 host_url）
+                job = copy_current_request_context(handle_audio_event)
+                if not event_pool.submit(job, event) :
+                    BotLogger.error(f"Event Of {event.source.user_id} Dropped, {event_pool.stats()}")
 
 
     except InvalidSignatureError as e :
@@ -115,6 +144,30 @@ def callback() :
     return "OK"
 
 
+@app.route("/event_stats", methods = ["GET"])
+def event_stats() :
+    """
+    webhook worker pool 的 backpressure metrics（queue depth, wait time...）
+
+    :return: json metrics
+    """
+    return jsonify(event_pool.stats())
+
+
+@app.route("/news_stats", methods = ["GET"])
+def news_stats() :
+    """
+    各新聞來源的新鮮度（上次成功拉取的時間、最新文章時間、連續失敗次數...）以及搜尋的 latency histogram
+
+    :return: json metrics
+    """
+    return jsonify({
+        "ingester" : news.INGESTER.stats() if news.INGESTER is not None else { },
+        "search_latency" : news.FANOUT.stats(),
+        "http_cache" : NewsFetcher.CACHE.stats() if NewsFetcher.CACHE is not None else { },
+    })
+
+
 @app.route("/audio/<path:filename>")
 def audio( filename ) :
     """
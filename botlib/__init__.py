@@ -37,6 +37,79 @@ class BotConfig :
     HANLP_URL = "http://140.116.245.157:7778/HANLP"
     HANLP_TEST_URL = "http://140.116.245.157:7778/HANLP"
 
+    # hanlp micro-batching (seconds to collect sentences from other requests, 0 to disable; max sentences per POST)
+    HANLP_BATCH_WINDOW = __CONFIG_FILE.getfloat("GENERAL", "hanlp_batch_window", fallback = 0.01)
+    HANLP_MAX_BATCH = __CONFIG_FILE.getint("GENERAL", "hanlp_max_batch", fallback = 32)
+
+    # hanlp http client (seconds, keep-alive connections, retries on connection errors and 502/503/504)
+    HANLP_CONNECT_TIMEOUT = __CONFIG_FILE.getfloat("GENERAL", "hanlp_connect_timeout", fallback = 3.0)
+    HANLP_READ_TIMEOUT = __CONFIG_FILE.getfloat("GENERAL", "hanlp_read_timeout", fallback = 30.0)
+    HANLP_POOL_SIZE = __CONFIG_FILE.getint("GENERAL", "hanlp_pool_size", fallback = 8)
+    HANLP_RETRIES = __CONFIG_FILE.getint("GENERAL", "hanlp_retries", fallback = 2)
+
+    # hanlp result cache (max sentences, seconds to live, file to keep cache across restarts, empty to disable)
+    HANLP_CACHE_SIZE = __CONFIG_FILE.getint("GENERAL", "hanlp_cache_size", fallback = 4096)
+    HANLP_CACHE_TTL = __CONFIG_FILE.getfloat("GENERAL", "hanlp_cache_ttl", fallback = 7 * 24 * 3600.0)
+    HANLP_CACHE_PATH = __CONFIG_FILE.get("GENERAL", "hanlp_cache_path", fallback = "")
+
+    # webhook event worker pool (number of workers, max queued events, seconds to drain on shutdown)
+    EVENT_WORKER_COUNT = __CONFIG_FILE.getint("GENERAL", "event_worker_count", fallback = 4)
+    EVENT_QUEUE_SIZE = __CONFIG_FILE.getint("GENERAL", "event_queue_size", fallback = 64)
+    EVENT_DRAIN_TIMEOUT = __CONFIG_FILE.getfloat("GENERAL", "event_drain_timeout", fallback = 30.0)
+
+    # speech to text (threads shared by all requests, per-engine timeout in seconds)
+    STT_WORKER_COUNT = __CONFIG_FILE.getint("GENERAL", "stt_worker_count", fallback = 8)
+    STT_CHINESE_TIMEOUT = __CONFIG_FILE.getfloat("GENERAL", "stt_chinese_timeout", fallback = 15.0)
+    STT_TAIWANESE_TIMEOUT = __CONFIG_FILE.getfloat("GENERAL", "stt_taiwanese_timeout", fallback = 20.0)
+
+    # news crawler http client (seconds, concurrent requests per site, fetch threads shared by all crawlers)
+    NEWS_CONNECT_TIMEOUT = __CONFIG_FILE.getfloat("GENERAL", "news_connect_timeout", fallback = 3.0)
+    NEWS_READ_TIMEOUT = __CONFIG_FILE.getfloat("GENERAL", "news_read_timeout", fallback = 10.0)
+    NEWS_HOST_CONNECTIONS = __CONFIG_FILE.getint("GENERAL", "news_host_connections", fallback = 6)
+    NEWS_FETCH_WORKERS = __CONFIG_FILE.getint("GENERAL", "news_fetch_workers", fallback = 16)
+    NEWS_RETRIES = __CONFIG_FILE.getint("GENERAL", "news_retries", fallback = 1)
+
+    # html parser for crawlers ("lxml" or "html.parser", empty to use lxml when installed)
+    NEWS_HTML_PARSER = __CONFIG_FILE.get("GENERAL", "news_html_parser", fallback = "")
+
+    # news http cache (pages kept in memory, 0 to disable; sqlite path, empty for memory only; seconds before revalidating)
+    NEWS_CACHE_SIZE = __CONFIG_FILE.getint("GENERAL", "news_cache_size", fallback = 512)
+    NEWS_CACHE_PATH = __CONFIG_FILE.get("GENERAL", "news_cache_path", fallback = "")
+    NEWS_CACHE_LISTING_TTL = __CONFIG_FILE.getfloat("GENERAL", "news_cache_listing_ttl", fallback = 120.0)
+    NEWS_CACHE_ARTICLE_TTL = __CONFIG_FILE.getfloat("GENERAL", "news_cache_article_ttl", fallback = 86400.0)
+
+    # search every media when none is named (seconds for the whole search, media searched at once, 1 for first hit or top k)
+    NEWS_FANOUT_DEADLINE = __CONFIG_FILE.getfloat("GENERAL", "news_fanout_deadline", fallback = 5.0)
+    NEWS_FANOUT_WORKERS = __CONFIG_FILE.getint("GENERAL", "news_fanout_workers", fallback = 7)
+    NEWS_FANOUT_TOP_K = __CONFIG_FILE.getint("GENERAL", "news_fanout_top_k", fallback = 1)
+
+    # local news index (sqlite path, ":memory:" to keep in memory, empty to disable; seconds between ingestions)
+    NEWS_INDEX_PATH = __CONFIG_FILE.get("GENERAL", "news_index_path", fallback = ":memory:")
+    NEWS_INGEST_INTERVAL = __CONFIG_FILE.getfloat("GENERAL", "news_ingest_interval", fallback = 600.0)
+
+    # ncku crawler state (file to keep crawled articles across restarts, empty to disable; seconds to reuse listing page)
+    NCKU_CACHE_PATH = __CONFIG_FILE.get("GENERAL", "ncku_cache_path", fallback = "")
+    NCKU_LISTING_TTL = __CONFIG_FILE.getfloat("GENERAL", "ncku_listing_ttl", fallback = 60.0)
+
+    # activity store (sqlite path, empty for activity.db in project root, a new file starts with the activities in the
+    # activity service's test.db; MiB mapped and cached by each connection; seconds between background wal checkpoints,
+    # 0 to checkpoint on commit)
+    ACTIVITY_DB_PATH = __CONFIG_FILE.get("GENERAL", "activity_db_path", fallback = "") or join(PROJECT_ROOT, "activity.db")
+    ACTIVITY_DB_MMAP_MB = __CONFIG_FILE.getint("GENERAL", "activity_db_mmap_mb", fallback = 256)
+    ACTIVITY_DB_CACHE_MB = __CONFIG_FILE.getint("GENERAL", "activity_db_cache_mb", fallback = 32)
+    ACTIVITY_DB_CHECKPOINT_INTERVAL = __CONFIG_FILE.getfloat("GENERAL", "activity_db_checkpoint_interval", fallback = 1.0)
+
+    # geocoding (cached places; seconds to keep found and not found places; file to keep cache across restarts, empty to disable;
+    # seconds per request, between requests and after a rate limit without Retry-After; json of known places, empty to disable)
+    GEO_CACHE_SIZE = __CONFIG_FILE.getint("GENERAL", "geo_cache_size", fallback = 4096)
+    GEO_CACHE_TTL = __CONFIG_FILE.getfloat("GENERAL", "geo_cache_ttl", fallback = 30 * 24 * 3600.0)
+    GEO_NEGATIVE_TTL = __CONFIG_FILE.getfloat("GENERAL", "geo_negative_ttl", fallback = 24 * 3600.0)
+    GEO_CACHE_PATH = __CONFIG_FILE.get("GENERAL", "geo_cache_path", fallback = "")
+    GEO_TIMEOUT = __CONFIG_FILE.getfloat("GENERAL", "geo_timeout", fallback = 5.0)
+    GEO_MIN_INTERVAL = __CONFIG_FILE.getfloat("GENERAL", "geo_min_interval", fallback = 1.0)
+    GEO_RATE_LIMIT_BACKOFF = __CONFIG_FILE.getfloat("GENERAL", "geo_rate_limit_backoff", fallback = 60.0)
+    GEO_GAZETTEER_PATH = __CONFIG_FILE.get("GENERAL", "geo_gazetteer_path", fallback = "")
+
     # log level
     LOG_LEVEL = "info"
 
@@ -52,6 +125,16 @@ class BotConfig :
     LAB_TSTT_HOST_PORT = ("140.116.245.149", 2802)
     LAB_T2C_HOST_PORT = ("140.116.245.149", 27002)
 
+    # lab api connections (seconds, max concurrent connections per host_port)
+    LAB_CONNECT_TIMEOUT = __CONFIG_FILE.getfloat("LABAPI", "lab_connect_timeout", fallback = 5.0)
+    LAB_READ_TIMEOUT = __CONFIG_FILE.getfloat("LABAPI", "lab_read_timeout", fallback = 30.0)
+    LAB_MAX_CONNECTIONS = __CONFIG_FILE.getint("LABAPI", "lab_max_connections", fallback = 4)
+    LAB_ASYNC_MAX_CONNECTIONS = __CONFIG_FILE.getint("LABAPI", "lab_async_max_connections", fallback = 64)
+
+    # host_ports whose responses are ">I" length-prefixed and keep the connection open,
+    # others close the connection after responding so their sockets can't be reused
+    LAB_KEEP_ALIVE_HOST_PORTS = []
+
 
     # -------------------------------------------------------------------------------------------------------
 
@@ -0,0 +1,150 @@
+import asyncio
+import struct
+from json import loads
+from pathlib import Path
+
+# project libs
+from botlib import BotConfig
+from botlib.botlogger import BotLogger
+from botlib.api.labprotocol import LabProtocol
+
+
+
+class AsyncLabApi :
+    """
+    asyncio Version Of LabApi
+
+    與 LabApi 使用相同的 wire format（LabProtocol），但所有 api 都是 coroutine
+    所以單一 event loop 就能同時處理大量的 requests，而不需要每個 socket 佔用一個 thread
+    每個 backend 同時最多只會有 BotConfig.LAB_ASYNC_MAX_CONNECTIONS 條連線
+    """
+
+    # (host, port) : asyncio.Semaphore, created lazily inside the running loop
+    __SEMAPHORES = { }
+
+
+    @staticmethod
+    def __semaphore_of( host_port: tuple ) -> asyncio.Semaphore :
+
+        key = tuple(host_port)
+        if key not in AsyncLabApi.__SEMAPHORES :
+            AsyncLabApi.__SEMAPHORES[key] = asyncio.Semaphore(BotConfig.LAB_ASYNC_MAX_CONNECTIONS)
+        return AsyncLabApi.__SEMAPHORES[key]
+
+
+    @staticmethod
+    async def __exchange( data: bytes, host_port: tuple ) -> bytes :
+
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*host_port), BotConfig.LAB_CONNECT_TIMEOUT)
+
+        try :
+            writer.write(data)
+            await writer.drain()
+
+            # keep-alive backends reply with a ">I" length-prefixed frame, others reply until eof
+            if tuple(host_port) in map(tuple, BotConfig.LAB_KEEP_ALIVE_HOST_PORTS) :
+                (length,) = struct.unpack(">I", await reader.readexactly(4))
+                return await reader.readexactly(length)
+
+            return await reader.read()
+
+        finally :
+            writer.close()
+
+
+    @staticmethod
+    async def __base_sender( data: bytes, host_port: tuple ) -> bytes or None :
+
+        try :
+            async with AsyncLabApi.__semaphore_of(host_port) :
+                return await asyncio.wait_for(AsyncLabApi.__exchange(data, host_port),
+                                              BotConfig.LAB_CONNECT_TIMEOUT + BotConfig.LAB_READ_TIMEOUT)
+
+        except asyncio.TimeoutError as e :
+            BotLogger.exception(f"Lab API {host_port} Timeout : {e}")
+
+        except (ConnectionError, asyncio.IncompleteReadError) as e :
+            BotLogger.exception(f"Lab API Connection Error : {e}")
+
+        except Exception as e :
+            BotLogger.exception(f"Exception ({type(e).__name__}) : {e}")
+
+        return None
+
+
+    # -------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def lab_ner_api( cht_text: str ) -> dict or None :
+        """
+        coroutine version of LabApi.lab_ner_api
+
+        :param cht_text: cht text to do NER analyze
+        :return: NER result dict (None if something wrong)
+        """
+
+        data = LabProtocol.format_text_data(BotConfig.LAB_NER_TOKEN, cht_text)
+        result = await AsyncLabApi.__base_sender(data, BotConfig.LAB_NER_HOST_PORT)
+
+        # decode as utf-8 and convert to dict
+        if result is not None :
+            result = loads(str(result, "utf-8"))
+
+        return result
+
+
+    @staticmethod
+    async def lab_c2t_api( output_filename: str, cht_text: str ) -> Path or None :
+        """
+        coroutine version of LabApi.lab_c2t_api
+
+        :param output_filename: filename of tmp speech output file
+        :param cht_text: cht text which will be convert to taiwanese speech
+        :return: taiwanese speech audio file's abs path (None if something wrong)
+        """
+
+        data = LabProtocol.format_text_data(BotConfig.LAB_C2T_TOKEN, cht_text)
+        speech_data = await AsyncLabApi.__base_sender(data, BotConfig.LAB_C2T_HOST_PORT)
+
+        if speech_data is None :
+            return None
+
+        try :
+            output = BotConfig.file_path_from(BotConfig.AUDIO_OUTPUT_TMP_DIR, output_filename, ".wav")
+            with open(output, "wb") as file :
+                file.write(speech_data)
+            return output
+
+        except Exception as e :
+            BotLogger.exception(f"Exception {type(e).__name__} : {e}")
+            return None
+
+
+    @staticmethod
+    async def lab_tstt_api( wav_16khz_audio_path: Path ) -> str or None :
+        """
+        coroutine version of LabApi.lab_tstt_api
+
+        :param wav_16khz_audio_path: taiwanese speech audio (16khz wav)
+        :return: best match taiwanese text (None if something wrong)
+        """
+
+        data = LabProtocol.format_audio_data(BotConfig.LAB_TSTT_TOKEN, wav_16khz_audio_path)
+        bytes_result = await AsyncLabApi.__base_sender(data, BotConfig.LAB_TSTT_HOST_PORT)
+
+        return None if bytes_result is None else LabProtocol.parse_tstt_result(bytes_result)
+
+
+    @staticmethod
+    async def lab_t2c_api( taiwanese_text: str ) -> str or None :
+        """
+        coroutine version of LabApi.lab_t2c_api
+
+        :param taiwanese_text: taiwanese text
+        :return: cht text (None if something wrong)
+        """
+
+        data = LabProtocol.format_text_data(BotConfig.LAB_T2C_TOKEN, taiwanese_text)
+        result = await AsyncLabApi.__base_sender(data, BotConfig.LAB_T2C_HOST_PORT)
+
+        return None if result is None else result.decode("utf-8")
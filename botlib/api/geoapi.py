@@ -1,15 +1,115 @@
+import atexit
+import json
+import threading
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from geopy.exc import GeocoderRateLimited
 from geopy.geocoders import Nominatim
 
 # proj lib
+from botlib import BotConfig
 from botlib.botlogger import BotLogger
+from botlib.ttl_cache import TtlLruCache
 
 
 
 class GeoApi :
     """
+    Geocoding With Nominatim
 
+    geocode() 一次查詢同時取得完整地址與座標，查詢的順序：
+        GAZETTEER : 預先載入的已知地點（校園內、城市的地點），不會送出任何 request
+        CACHE     : 查過的地點（找不到的也會記下來，存活時間較短），可以存到硬碟，重新啟動後不用再查一次
+        Nominatim : 同一個地點同時只會送出一個 request（其他 thread 等待結果），所有 request 間隔至少 GEO_MIN_INTERVAL 秒，
+                    被 rate limit 後到 Retry-After 之前的查詢都直接失敗（不會被 cache），不會讓 worker 等上數十秒
     """
-    geo_locator = Nominatim(user_agent = "SuperStudentBot")
+    geo_locator = Nominatim(user_agent = "SuperStudentBot", timeout = BotConfig.GEO_TIMEOUT)
+
+    # address : (full address, (latitude, longitude))，找不到的地點則為 None
+    CACHE = TtlLruCache(BotConfig.GEO_CACHE_SIZE, BotConfig.GEO_CACHE_TTL, BotConfig.GEO_CACHE_PATH or None)
+    atexit.register(CACHE.save)
+
+    # 地點 : (full address, (latitude, longitude))，由 GEO_GAZETTEER_PATH 載入（見 load_gazetteer）
+    GAZETTEER = { }
+
+    __MISSING = object()
+
+    # address : threading.Event，正在向 Nominatim 查詢的地點
+    __IN_FLIGHT = { }
+    __IN_FLIGHT_LOCK = threading.Lock()
+
+    # 一次只送出一個 request，並記錄下一個 request 最早可以送出的時間（time.monotonic()）
+    __REQUEST_LOCK = threading.Lock()
+    __NEXT_REQUEST = 0.0
+
+
+    @staticmethod
+    def load_gazetteer( path: str ) -> dict :
+        """
+        讀取已知地點的 JSON 檔，格式為 { 地點 : { "address" : 完整地址, "latitude" : 緯度, "longitude" : 經度 } }
+
+        :param path: JSON 檔案路徑，空字串則回傳空的 dict
+        :return: 地點 -> (完整地址, (緯度, 經度))
+        """
+
+        if not path :
+            return { }
+
+        try :
+            with open(path, encoding = "utf-8") as file :
+                places = json.load(file)
+
+            gazetteer = { name.strip() : (place["address"], (float(place["latitude"]), float(place["longitude"])))
+                          for name, place in places.items() }
+            BotLogger.debug(f"Gazetteer Loaded From {path} ({len(gazetteer)} Places).")
+            return gazetteer
+
+        except Exception as e :
+            BotLogger.exception(f"Loading Gazetteer From {path} Failed, {type(e).__name__} : {e}")
+            return { }
+
+
+    @staticmethod
+    def geocode( address: str ) -> (str, (float, float)) or None :
+        """
+        查詢地點的完整地址以及座標
+
+        :param address: location string
+        :return: (完整地址, (緯度, 經度))，找不到或查詢失敗則回傳 None
+        """
+
+        address = address.strip()
+        if address in GeoApi.GAZETTEER :
+            return GeoApi.GAZETTEER[address]
+
+        cached = GeoApi.CACHE.get(address, GeoApi.__MISSING)
+        if cached is not GeoApi.__MISSING :
+            return cached
+
+        # 已經有其他 thread 在查詢這個地點，等它查完後直接使用它的結果
+        with GeoApi.__IN_FLIGHT_LOCK :
+            event = GeoApi.__IN_FLIGHT.get(address)
+            is_owner = event is None
+            if is_owner :
+                event = GeoApi.__IN_FLIGHT[address] = threading.Event()
+
+        # 最多等一個 request 的時間，等不到就當作查詢失敗
+        if not is_owner :
+            event.wait(BotConfig.GEO_MIN_INTERVAL + BotConfig.GEO_TIMEOUT)
+            cached = GeoApi.CACHE.get(address, GeoApi.__MISSING)
+            return None if cached is GeoApi.__MISSING else cached
+
+        try :
+            result = GeoApi.__request(address)
+            if result is not GeoApi.__MISSING :
+                GeoApi.CACHE.put(address, result, BotConfig.GEO_CACHE_TTL if result is not None else BotConfig.GEO_NEGATIVE_TTL)
+            return None if result is GeoApi.__MISSING else result
+
+        finally :
+            with GeoApi.__IN_FLIGHT_LOCK :
+                del GeoApi.__IN_FLIGHT[address]
+            event.set()
 
 
     @staticmethod
@@ -19,16 +119,9 @@ class GeoApi :
         :param address:
         :return:
         """
-        location = GeoApi.geo_locator.geocode(address, country_codes = "tw")
-
-        if location is None :
-            return None
-
-        # if this location exists, get coordinate
-        coordinate = location.latitude, location.longitude
 
-        BotLogger.debug(f"Coordinate Of {address} is {coordinate}")
-        return coordinate
+        result = GeoApi.geocode(address)
+        return None if result is None else result[1]
 
 
     @staticmethod
@@ -38,23 +131,73 @@ class GeoApi :
         :param address: location string
         :return:
         """
-        location = GeoApi.geo_locator.geocode(address, country_codes = "tw")
+
+        result = GeoApi.geocode(address)
+        return None if result is None else result[0]
+
+
+    # -------------------------------------------------------------------------------------------------------
+
+
+    @staticmethod
+    def __request( address: str ) :
+        """
+        :return: (完整地址, (緯度, 經度))，找不到則為 None，查詢失敗則為 __MISSING（不會被 cache）
+        """
+
+        with GeoApi.__REQUEST_LOCK :
+            # 被 rate limit 時不要拿著 lock 等到 Retry-After，其他查詢也會一起卡住
+            wait = GeoApi.__NEXT_REQUEST - time.monotonic()
+            if wait > BotConfig.GEO_MIN_INTERVAL :
+                BotLogger.debug(f"Geocoding {address} Skipped, Rate Limited For {wait:.0f} More Seconds")
+                return GeoApi.__MISSING
+            if wait > 0 :
+                time.sleep(wait)
+
+            try :
+                location = GeoApi.geo_locator.geocode(address, country_codes = "tw")
+
+            except GeocoderRateLimited as e :
+                retry_after = e.retry_after if e.retry_after is not None else BotConfig.GEO_RATE_LIMIT_BACKOFF
+                GeoApi.__NEXT_REQUEST = time.monotonic() + retry_after
+                BotLogger.info(f"Geocoding Rate Limited, Next Request After {retry_after} Seconds")
+                return GeoApi.__MISSING
+
+            except Exception as e :
+                GeoApi.__NEXT_REQUEST = time.monotonic() + BotConfig.GEO_MIN_INTERVAL
+                BotLogger.exception(f"Geocoding {address} Failed, {type(e).__name__} : {e}")
+                return GeoApi.__MISSING
+
+            GeoApi.__NEXT_REQUEST = time.monotonic() + BotConfig.GEO_MIN_INTERVAL
 
         if location is None :
+            BotLogger.debug(f"Cannot Find {address}")
             return None
 
-        # if this location exists, get full address string
-        full_address = location.address
-        BotLogger.debug(f"Full Address Of {address} is {full_address}")
-        return full_address
+        # if this location exists, get full address string and coordinate
+        result = (location.address, (location.latitude, location.longitude))
+        BotLogger.debug(f"Full Address And Coordinate Of {address} is {result}")
+        return result
 
 
-if __name__ == '__main__' :
-
-    location = "清華大學"
+GeoApi.GAZETTEER = GeoApi.load_gazetteer(BotConfig.GEO_GAZETTEER_PATH)
 
-    address = GeoApi.get_full_address(location)
-    coordinate = GeoApi.get_coordinate(location)
 
-    print(address)
-    print(coordinate)
\ No newline at end of file
+if __name__ == '__main__' :
+    arg_parser = ArgumentParser(description = "geocode locations, or write them into a gazetteer")
+    arg_parser.add_argument("locations", nargs = "+")
+    arg_parser.add_argument("--gazetteer", help = "json file to add the found locations to")
+    args = arg_parser.parse_args()
+
+    found = GeoApi.load_gazetteer(args.gazetteer) if args.gazetteer and Path(args.gazetteer).exists() else { }
+    for name in args.locations :
+        result = GeoApi.geocode(name)
+        print(f"{name} : {result}")
+        if result is not None :
+            found[name] = result
+
+    if args.gazetteer :
+        with open(args.gazetteer, "w", encoding = "utf-8") as file :
+            json.dump({ name : { "address" : address, "latitude" : coordinate[0], "longitude" : coordinate[1] }
+                        for name, (address, coordinate) in found.items() }, file, ensure_ascii = False, indent = 1)
+        print(f"{len(found)} places in {args.gazetteer}")
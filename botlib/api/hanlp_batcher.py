@@ -0,0 +1,139 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# project libs
+from botlib.botlogger import BotLogger
+
+
+
+class HanlpBatcher :
+    """
+    Micro-Batching Client For HanLP API
+
+    收集不同 thread 在短時間（window）內送出的句子，合併成一次 parse_sentences 呼叫
+    然後再把結果切開，讓每個 caller 只拿到自己那一句的 WS, POS, NER
+    custom dict 不同的句子無法一起送出（server 一次只能套用一個 dict），所以會依照 custom dict 分組
+    """
+
+
+    class _Pending :
+        __slots__ = ("sentence", "custom_dict", "result", "done")
+
+
+        def __init__( self, sentence: str, custom_dict: dict ) :
+            self.sentence = sentence
+            self.custom_dict = custom_dict
+            self.result = None
+            self.done = threading.Event()
+
+
+    def __init__( self, send, window: float, max_batch: int, max_in_flight = 4 ) :
+        """
+        :param send: (sentences: list, ws_custom_dict: dict) -> dict or None, usually HanlpApi.parse_sentences
+        :param window: 收到第一句後最多再等幾秒收集其他句子
+        :param max_batch: 一次最多送出幾句
+        :param max_in_flight: 最多同時有幾個 batch 在等待 server 回應
+        """
+
+        self.__send = send
+        self.__window = window
+        self.__max_batch = max(1, max_batch)
+        self.__queue = queue.Queue()
+
+        self.__senders = ThreadPoolExecutor(max_workers = max(1, max_in_flight), thread_name_prefix = "HanlpBatchSender")
+
+        self.__stats_lock = threading.Lock()
+        self.__batches = 0
+        self.__sentences = 0
+
+        self.__collector = threading.Thread(target = self.__collect, name = "HanlpBatcher", daemon = True)
+        self.__collector.start()
+
+
+    def parse_sentence( self, sentence: str, ws_custom_dict = None ) -> dict or None :
+        """
+        與 HanlpApi.parse_sentence 相同，但會與其他 thread 的句子一起送出
+
+        :param sentence: 要進行 WS, POS, NER 處理的句子（string）
+        :param ws_custom_dict: 自定義的斷詞 dict
+        :return: 由 WS, POS, NER 結果構成的 dict，發生錯誤時則回傳 None
+        """
+
+        pending = HanlpBatcher._Pending(sentence, ws_custom_dict)
+        self.__queue.put(pending)
+        pending.done.wait()
+        return pending.result
+
+
+    def stats( self ) -> dict :
+        with self.__stats_lock :
+            return {
+                "batches" : self.__batches,
+                "sentences" : self.__sentences,
+                "avg_batch_size" : self.__sentences / self.__batches if self.__batches != 0 else 0.0,
+            }
+
+
+    # -------------------------------------------------------------------------------------------------------
+
+    def __collect( self ) -> None :
+
+        while True :
+            # wait for the first sentence, then keep collecting until window closes or batch is full
+            batch = [self.__queue.get()]
+            deadline = time.monotonic() + self.__window
+
+            while len(batch) < self.__max_batch :
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 :
+                    break
+                try :
+                    batch.append(self.__queue.get(timeout = remaining))
+                except queue.Empty :
+                    break
+
+            self.__flush(batch)
+
+
+    def __flush( self, batch: list ) -> None :
+
+        # sentences can only be sent together if they use the same custom dict
+        groups = { }
+        for pending in batch :
+            key = json.dumps(pending.custom_dict, sort_keys = True, ensure_ascii = False)
+            groups.setdefault(key, []).append(pending)
+
+        # send in other threads, so next batch can be collected while waiting for server
+        for group in groups.values() :
+            self.__senders.submit(self.__send_group, group)
+
+        BotLogger.debug(f"HanLP Batch Flushed, {len(batch)} Sentences In {len(groups)} Requests.")
+
+
+    def __send_group( self, group: list ) -> None :
+
+        try :
+            ws_pos_ner = self.__send([pending.sentence for pending in group], group[0].custom_dict)
+
+            # give each caller its own slice
+            if ws_pos_ner is not None :
+                for i, pending in enumerate(group) :
+                    pending.result = {
+                        "WS" : ws_pos_ner["WS"][i],
+                        "POS" : ws_pos_ner["POS"][i],
+                        "NER" : ws_pos_ner["NER"][i]
+                    }
+
+        except Exception as e :
+            BotLogger.exception(f"HanLP Batch Error, {type(e).__name__} = {e}")
+
+        finally :
+            with self.__stats_lock :
+                self.__batches += 1
+                self.__sentences += len(group)
+
+            for pending in group :
+                pending.done.set()
@@ -1,10 +1,17 @@
+import atexit
+import hashlib
 import json
-from requests import post, HTTPError
+import threading
+from requests import HTTPError, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from enum import Enum
 
 # project libs
 from botlib import BotConfig
 from botlib.botlogger import BotLogger
+from botlib.api.hanlp_batcher import HanlpBatcher
+from botlib.ttl_cache import TtlLruCache
 
 
 
@@ -27,6 +34,27 @@ class HanlpApi :
     """
     URL = BotConfig.HANLP_URL
 
+    # shared keep-alive session, retry with backoff on connection errors and 502/503/504
+    TIMEOUT = (BotConfig.HANLP_CONNECT_TIMEOUT, BotConfig.HANLP_READ_TIMEOUT)
+    __SESSION = Session()
+    __SESSION.mount("http://", HTTPAdapter(pool_connections = 1, pool_maxsize = BotConfig.HANLP_POOL_SIZE,
+                                           max_retries = Retry(total = BotConfig.HANLP_RETRIES, backoff_factor = 0.2,
+                                                               status_forcelist = (502, 503, 504),
+                                                               allowed_methods = frozenset(["POST"]),
+                                                               raise_on_status = False)))
+    __SESSION.mount("https://", __SESSION.get_adapter("http://"))
+
+    # sentences from concurrent parse_sentence calls are sent together, see HanlpBatcher
+    BATCH_WINDOW = BotConfig.HANLP_BATCH_WINDOW
+    MAX_BATCH = BotConfig.HANLP_MAX_BATCH
+
+    __BATCHER = None
+    __BATCHER_LOCK = threading.Lock()
+
+    # WS, POS, NER result of each sentence, keyed by (normalized sentence, hash of custom dict)
+    CACHE = TtlLruCache(BotConfig.HANLP_CACHE_SIZE, BotConfig.HANLP_CACHE_TTL, BotConfig.HANLP_CACHE_PATH or None)
+    atexit.register(CACHE.save)
+
 
     # -----------------------------------------------------------------------------------------
     # Call Server API to do WS, POS, NER
@@ -40,6 +68,7 @@ class HanlpApi :
         負責呼叫 HanLP API 進行 WS, POS, NER 處理
         會先對「由數個句子組成的 list」進行 WS，可使用 ws_custom_dict 進行自訂字典處理
         並用 WS 的結果進行 POS, NER 最後回傳一個 dict（包含 "WS", "POS", "NER" 三個 KEY）
+        處理過的句子（相同的 ws_custom_dict）會直接使用 CACHE 中的結果，不會再送到 HanLP API
 
         Exceptions:
             - TypeError : Wrong Param Type or HanLP API return non-json data
@@ -67,25 +96,27 @@ class HanlpApi :
             else :
                 raise TypeError("Custom Dict Should Be A Dict.")
 
-            # 將「句子」、「自訂斷詞字典」打包成單一字典
-            data_dict = {
-                "sentences" : sentences,
-                "custom_dict" : custom_dict
+            # 先從 cache 找出處理過的句子，只將沒處理過的句子送到 hanlp api
+            dict_hash = HanlpApi.__hash_custom_dict(custom_dict)
+            keys = [HanlpApi.__cache_key(sentence, dict_hash) for sentence in sentences]
+            parsed = [HanlpApi.CACHE.get(key) for key in keys]
+
+            missing = { }
+            for key, sentence, ws_pos_ner in zip(keys, sentences, parsed) :
+                if ws_pos_ner is None :
+                    missing.setdefault(key, sentence)
+
+            if missing != { } :
+                fetched = HanlpApi.__post_sentences(list(missing.values()), custom_dict)
+                fetched_of = dict(zip(missing.keys(), fetched))
+                parsed = [fetched_of[key] if ws_pos_ner is None else ws_pos_ner for key, ws_pos_ner in zip(keys, parsed)]
+
+            result = {
+                "WS" : [ws_pos_ner["WS"] for ws_pos_ner in parsed],
+                "POS" : [ws_pos_ner["POS"] for ws_pos_ner in parsed],
+                "NER" : [ws_pos_ner["NER"] for ws_pos_ner in parsed]
             }
 
-            # 將上面打包出的單一字典轉換成 json 格式，然後 POST 到 hanlp api 的 address
-            response = post(HanlpApi.URL, json = json.dumps(data_dict))
-
-            # 檢查 post 結果是否為 200
-            if response.status_code == 200 :
-                try :
-                    result = json.loads(response.text)
-                except TypeError :
-                    raise TypeError(f"TypeError, HanlpAPI return non json file : \n {response.text}")
-
-            else :
-                raise HTTPError(f"Status is not 200 ({response.status_code})")
-
         except (TypeError, HTTPError) as e :
             BotLogger.exception(e.__str__())
 
@@ -96,6 +127,61 @@ class HanlpApi :
             return result
 
 
+    @staticmethod
+    def __post_sentences( sentences: list, custom_dict: dict ) -> list :
+        """
+        將句子 POST 到 hanlp api，並將各句的結果存入 cache
+
+        Exceptions:
+            - TypeError : HanLP API return non-json data
+            - HTTPError : Request Error, status_code not 200
+
+        :param sentences: 要處理的句子 list
+        :param custom_dict: 自定義的斷詞 dict
+        :return: 各句的 WS, POS, NER dict 組成的 list
+        """
+
+        # 將「句子」、「自訂斷詞字典」打包成單一字典
+        data_dict = {
+            "sentences" : sentences,
+            "custom_dict" : custom_dict
+        }
+
+        # 將上面打包出的單一字典以 json body POST 到 hanlp api 的 address（由 requests 編碼一次即可）
+        response = HanlpApi.__SESSION.post(HanlpApi.URL, json = data_dict, timeout = HanlpApi.TIMEOUT)
+
+        # 檢查 post 結果是否為 200
+        if response.status_code != 200 :
+            raise HTTPError(f"Status is not 200 ({response.status_code})")
+
+        try :
+            result = response.json()
+        except ValueError :
+            raise TypeError(f"TypeError, HanlpAPI return non json file : \n {response.text}")
+
+        # split result into sentences and cache them
+        dict_hash = HanlpApi.__hash_custom_dict(custom_dict)
+        ws_pos_ner_list = []
+        for i, sentence in enumerate(sentences) :
+            ws_pos_ner = { "WS" : result["WS"][i], "POS" : result["POS"][i], "NER" : result["NER"][i] }
+            HanlpApi.CACHE.put(HanlpApi.__cache_key(sentence, dict_hash), ws_pos_ner)
+            ws_pos_ner_list.append(ws_pos_ner)
+
+        return ws_pos_ner_list
+
+
+    @staticmethod
+    def __hash_custom_dict( custom_dict: dict or None ) -> str :
+        dumped = json.dumps(custom_dict or { }, sort_keys = True, ensure_ascii = False)
+        return hashlib.sha1(dumped.encode("utf-8")).hexdigest()
+
+
+    @staticmethod
+    def __cache_key( sentence: str, dict_hash: str ) -> (str, str) :
+        # normalize whitespaces, they don't change ws, pos, ner result
+        return " ".join(sentence.split()), dict_hash
+
+
     @staticmethod
     def parse_sentence( sentence: str, ws_custom_dict = None ) -> dict or None :
         """
@@ -104,11 +190,20 @@ class HanlpApi :
         並抽出 WS, POS, NER 結果的第一個 result（傳入 [sentence]）
         然後回傳由 WS, POS, NER 結果構成的 dict
 
+        若 BATCH_WINDOW > 0 則會經由 HanlpBatcher 與其他 thread 同時送出的句子合併成一次 request
+
         :param sentence: 要進行 WS, POS, NER 處理的句子（string）
         :param ws_custom_dict: 以 "WS", "POS", "NER" 為 KEY, token results 為 VALUE 的 dict
         :return: 由 WS, POS, NER 結果構成的 dict
         """
 
+        if HanlpApi.BATCH_WINDOW > 0 :
+            # cache hit doesn't need to wait for a batch
+            cached = HanlpApi.CACHE.get(HanlpApi.__cache_key(sentence, HanlpApi.__hash_custom_dict(ws_custom_dict)))
+            if cached is not None :
+                return cached
+            return HanlpApi.batcher().parse_sentence(sentence, ws_custom_dict)
+
         ws_pos_ner = HanlpApi.parse_sentences([sentence], ws_custom_dict)
 
         if ws_pos_ner is None :
@@ -121,6 +216,32 @@ class HanlpApi :
             }
 
 
+    @staticmethod
+    def batcher() -> HanlpBatcher :
+        """
+        get the shared HanlpBatcher (created at first use)
+
+        :return: HanlpBatcher instance
+        """
+
+        with HanlpApi.__BATCHER_LOCK :
+            if HanlpApi.__BATCHER is None :
+                HanlpApi.__BATCHER = HanlpBatcher(HanlpApi.__send_batch, HanlpApi.BATCH_WINDOW, HanlpApi.MAX_BATCH)
+            return HanlpApi.__BATCHER
+
+
+    @staticmethod
+    def __send_batch( sentences: list, ws_custom_dict = None ) -> dict or None :
+
+        # sentences in a batch were already missed in cache, send them directly
+        ws_pos_ner_list = HanlpApi.__post_sentences(sentences, ws_custom_dict or { })
+        return {
+            "WS" : [ws_pos_ner["WS"] for ws_pos_ner in ws_pos_ner_list],
+            "POS" : [ws_pos_ner["POS"] for ws_pos_ner in ws_pos_ner_list],
+            "NER" : [ws_pos_ner["NER"] for ws_pos_ner in ws_pos_ner_list]
+        }
+
+
     # -----------------------------------------------------------------------------------------------
     # Other Methods to parse WS, POS, NER results
     #
@@ -322,20 +443,45 @@ class HanlpApi :
 
             # do ws, pos, ner on this sentence
             ws_pos_ner = HanlpApi.parse_sentence(sentence)
-            classification = HanlpApi.classify_common_words(ws_pos_ner["NER"])
+            return HanlpApi.__main_location(ws_pos_ner["NER"])
+
+        # sentence is none
+        return None
+
+
+    @staticmethod
+    def extract_locations( sentences: list ) -> list or None :
+        """
+        與 extract_location 相同，但是所有句子只經由 parse_sentences 送出一次 request
+
+        :param sentences: 句子 list
+        :return: 各個句子最長的 location token 組成的 list（找不到則為 None），發生錯誤時則回傳 None
+        """
+
+        ws_pos_ner = HanlpApi.parse_sentences(sentences)
+        if ws_pos_ner is None :
+            return None
+
+        return [HanlpApi.__main_location(ner_result) for ner_result in ws_pos_ner["NER"]]
+
+
+    @staticmethod
+    def __main_location( ner_result: list ) -> str or None :
+
+        classification = HanlpApi.classify_common_words(ner_result)
 
-            locations = classification[NerCatalogs.LOCATION.value]
+        locations = classification[NerCatalogs.LOCATION.value]
 
-            # if no location found, also include org
-            if locations == [] :
-                locations += classification[NerCatalogs.ORGANIZATION.value]
+        # if no location found, also include org
+        if locations == [] :
+            locations += classification[NerCatalogs.ORGANIZATION.value]
 
-            # return longest location token ( sort and return first match )
-            locations = sorted(locations, key = len, reverse = True)
-            for location in locations :
-                return location
+        # return longest location token ( sort and return first match )
+        locations = sorted(locations, key = len, reverse = True)
+        for location in locations :
+            return location
 
-        # sentence is none or location not found
+        # location not found
         return None
 
 
@@ -1,68 +1,29 @@
-import struct
-import socket
 from json import loads
 from pathlib import Path
 
 # project libs
 from botlib import BotConfig
 from botlib.botlogger import BotLogger
+from botlib.api.labpool import LabConnectionPool
+from botlib.api.labprotocol import LabProtocol
 from botlib.converter.audio_converter import AudioConvert
 
 
 
 class LabApi :
 
-    @staticmethod
-    def __format_text_data( token: str, raw_text: str ) -> bytes :
-
-        # concatenate user token and data with @@@, and convert to bytes
-        data = bytes(token + "@@@" + raw_text, "utf-8")
-
-        # convert msg msg length(unsigned int) to bytes, and put before msg
-        data = struct.pack(">I", len(data)) + data
-
-        return data
-
-
-    @staticmethod
-    def __format_audio_data( token: str, audio_path: Path ) -> bytes :
-
-        audio_data = open(audio_path, "rb").read()
-        data = bytes(token + "@@@", "utf-8") + struct.pack("8s", bytes("main", encoding = "utf8")) + b"P" + audio_data
-        data = struct.pack(">I", len(data)) + data
-
-        return data
-
-
     @staticmethod
     def __base_sender( data: bytes, host_port: tuple ) -> bytes or None :
 
         # response data
         response = None
 
-        # init tcp socket fd
-        api = socket.socket(family = socket.AF_INET, type = socket.SOCK_STREAM)
-
         try :
-            # connect server with this socket
-            api.connect(host_port)
-            BotLogger.debug("Connecting To Lab API Done")
-
-            # send data to server
-            api.sendall(data)
-            BotLogger.debug("Sending Data To Lab API Done.")
-
-            # recv ALL byte from server and return data
-            response = bytes()
-            while True :
-                buffer = api.recv(1024)
-                if buffer == bytes() :
-                    break
-                else :
-                    response += buffer
-
-            BotLogger.debug("Receiving Data From Lab API Done.")
+            # send data with a pooled connection of this backend and recv the whole response
+            response = LabConnectionPool.of(host_port).request(data)
 
+        except TimeoutError as e :
+            BotLogger.exception(f"Lab API {host_port} Timeout : {e}")
 
         except ConnectionError as e :
             BotLogger.exception(f"Lab API Connection Error : {e}")
@@ -70,10 +31,6 @@ class LabApi :
         except Exception as e :
             BotLogger.exception(f"Exception ({type(e).__name__}) : {e}")
 
-        finally :
-            api.close()
-            BotLogger.debug("Lab API Socket Had Been Closed.")
-
         # return response or None (Error)
         return response
 
@@ -93,7 +50,7 @@ class LabApi :
         token = BotConfig.LAB_NER_TOKEN
 
         # send content to server and recv ner result
-        data = LabApi.__format_text_data(token, cht_text)
+        data = LabProtocol.format_text_data(token, cht_text)
         result = LabApi.__base_sender(data, BotConfig.LAB_NER_HOST_PORT)
 
         # decode as utf-8 and convert to dict
@@ -121,7 +78,7 @@ class LabApi :
         token = BotConfig.LAB_C2T_TOKEN
 
         # send text to server and get result
-        data = LabApi.__format_text_data(token, cht_text)
+        data = LabProtocol.format_text_data(token, cht_text)
         speech_data = LabApi.__base_sender(data, BotConfig.LAB_C2T_HOST_PORT)
 
         # if result not None, output bytes to file.wav
@@ -148,7 +105,7 @@ class LabApi :
 
         token = BotConfig.LAB_T2C_TOKEN
 
-        data = LabApi.__format_text_data(token, taiwanese_text)
+        data = LabProtocol.format_text_data(token, taiwanese_text)
         result = LabApi.__base_sender(data, BotConfig.LAB_T2C_HOST_PORT)
 
         return result.decode("utf-8")
@@ -158,15 +115,11 @@ class LabApi :
     def lab_tstt_api( wav_16khz_audio_path: Path ) -> str :
 
 
-        data = LabApi.__format_audio_data(BotConfig.LAB_TSTT_TOKEN, wav_16khz_audio_path)
+        data = LabProtocol.format_audio_data(BotConfig.LAB_TSTT_TOKEN, wav_16khz_audio_path)
         bytes_result = LabApi.__base_sender(data, BotConfig.LAB_TSTT_HOST_PORT)
 
-        result = bytes_result.decode("utf-8")
         # get best match
-        try :
-            return result.split("1.")[1].split(" ")[0]
-        except :
-            return ""
+        return LabProtocol.parse_tstt_result(bytes_result)
 
 
 if __name__ == '__main__' :
@@ -0,0 +1,259 @@
+import socket
+import struct
+import threading
+import time
+
+# project libs
+from botlib import BotConfig
+from botlib.botlogger import BotLogger
+
+
+
+class LabConnectionPool :
+    """
+    Pooled TCP Connections To A Lab API Backend (host, port)
+
+    每個 backend 最多只會同時開 max_connections 條連線，並且有 connect 以及 read timeout
+    keep_alive 的 backend 以 ">I" length prefix 回傳 response，所以連線可以在檢查後重複使用
+    其他 backend 則是回傳完 response 就關閉連線，只能讀到 EOF 為止
+    """
+
+    # (host, port) : LabConnectionPool
+    __POOLS = { }
+    __POOLS_LOCK = threading.Lock()
+
+    # idle sockets older than this will be closed instead of reused
+    MAX_IDLE_SECONDS = 60.0
+
+    # initial size of the eof reader buffer
+    EOF_BUFFER_SIZE = 64 * 1024
+
+
+    def __init__( self, host_port: tuple, max_connections: int, connect_timeout: float, read_timeout: float, keep_alive: bool ) :
+        self.host_port = tuple(host_port)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keep_alive = keep_alive
+
+        self.__slots = threading.BoundedSemaphore(max(1, max_connections))
+        self.__idle = []
+        self.__idle_lock = threading.Lock()
+
+
+    @staticmethod
+    def of( host_port: tuple ) -> 'LabConnectionPool' :
+        """
+        取得 host_port 對應的 pool（同一個 backend 共用同一個 pool）
+
+        :param host_port: (host, port) of lab api backend
+        :return: LabConnectionPool of this backend
+        """
+
+        key = tuple(host_port)
+        with LabConnectionPool.__POOLS_LOCK :
+            if key not in LabConnectionPool.__POOLS :
+                LabConnectionPool.__POOLS[key] = LabConnectionPool(key, BotConfig.LAB_MAX_CONNECTIONS,
+                                                                   BotConfig.LAB_CONNECT_TIMEOUT, BotConfig.LAB_READ_TIMEOUT,
+                                                                   key in map(tuple, BotConfig.LAB_KEEP_ALIVE_HOST_PORTS))
+            return LabConnectionPool.__POOLS[key]
+
+
+    # -------------------------------------------------------------------------------------------------------
+
+    def request( self, data: bytes ) -> bytes :
+        """
+        送出一個已經 format 好的 request 並讀取完整的 response
+
+        Exceptions :
+            - TimeoutError : 等不到可用的連線，或是 connect / read 超時
+            - ConnectionError : 連線在讀完 response 前就被關閉
+
+        :param data: formatted request bytes (with ">I" length prefix)
+        :return: response bytes
+        """
+
+        if not self.__slots.acquire(timeout = self.connect_timeout + self.read_timeout) :
+            raise TimeoutError(f"No Free Connection To Lab API {self.host_port}.")
+
+        try :
+            sock, reused = self.__checkout()
+            try :
+                response = self.__exchange(sock, data)
+
+            except (ConnectionError, socket.timeout) :
+                # a reused connection may have been closed by server while idle, retry once with a new one
+                if not reused :
+                    raise
+                BotLogger.debug(f"Reused Lab API Connection {self.host_port} Broken, Reconnecting.")
+                sock = self.__connect()
+                response = self.__exchange(sock, data)
+
+            self.__checkin(sock)
+            return response
+
+        finally :
+            self.__slots.release()
+
+
+    def close_idle( self ) -> None :
+        """
+        關閉所有 idle 的連線
+
+        :return: None
+        """
+
+        with self.__idle_lock :
+            idle, self.__idle = self.__idle, []
+
+        for sock, _ in idle :
+            sock.close()
+
+
+    # -------------------------------------------------------------------------------------------------------
+
+    def __connect( self ) -> socket.socket :
+
+        sock = socket.create_connection(self.host_port, timeout = self.connect_timeout)
+        sock.settimeout(self.read_timeout)
+        BotLogger.debug(f"Connecting To Lab API {self.host_port} Done.")
+        return sock
+
+
+    def __checkout( self ) -> (socket.socket, bool) :
+
+        # try to reuse a healthy idle connection first
+        while True :
+            with self.__idle_lock :
+                if self.__idle == [] :
+                    break
+                sock, idle_since = self.__idle.pop()
+
+            if time.monotonic() - idle_since < LabConnectionPool.MAX_IDLE_SECONDS and LabConnectionPool.is_healthy(sock) :
+                return sock, True
+
+            sock.close()
+
+        return self.__connect(), False
+
+
+    def __checkin( self, sock: socket.socket ) -> None :
+
+        # server closes non keep-alive connections after responding
+        if not self.keep_alive :
+            sock.close()
+            return
+
+        with self.__idle_lock :
+            self.__idle.append((sock, time.monotonic()))
+
+
+    def __exchange( self, sock: socket.socket, data: bytes ) -> bytes :
+
+        # socket will be closed if anything goes wrong, it can't be reused after a partial exchange
+        try :
+            sock.sendall(data)
+            BotLogger.debug(f"Sending Data To Lab API {self.host_port} Done.")
+
+            if self.keep_alive :
+                response = LabConnectionPool.read_frame(sock)
+            else :
+                response = LabConnectionPool.read_until_eof(sock)
+
+        except Exception :
+            sock.close()
+            raise
+
+        BotLogger.debug(f"Receiving {len(response)} Bytes From Lab API {self.host_port} Done.")
+        return response
+
+
+    # -------------------------------------------------------------------------------------------------------
+    # socket helpers
+
+    @staticmethod
+    def is_healthy( sock: socket.socket ) -> bool :
+        """
+        檢查 idle 連線是否還能使用（沒有被 server 關閉，也沒有殘留的資料）
+
+        :param sock: idle socket
+        :return: is this socket reusable
+        """
+
+        timeout = sock.gettimeout()
+        try :
+            sock.setblocking(False)
+
+            # b'' means peer closed, any data means a stale response is left in the socket
+            sock.recv(1, socket.MSG_PEEK)
+            return False
+
+        except BlockingIOError :
+            return True
+
+        except OSError :
+            return False
+
+        finally :
+            sock.settimeout(timeout)
+
+
+    @staticmethod
+    def recv_exactly( sock: socket.socket, size: int ) -> bytes :
+        """
+        讀取剛好 size bytes，直接寫入預先配置好的 buffer
+
+        :param sock: connected socket
+        :param size: bytes to read
+        :return: received bytes
+        """
+
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+
+        while received < size :
+            n = sock.recv_into(view[received :])
+            if n == 0 :
+                raise ConnectionError(f"Connection Closed After {received} Of {size} Bytes.")
+            received += n
+
+        return bytes(buffer)
+
+
+    @staticmethod
+    def read_frame( sock: socket.socket ) -> bytes :
+        """
+        讀取一個以 ">I" length prefix 開頭的 frame
+
+        :param sock: connected socket
+        :return: frame payload (without length prefix)
+        """
+
+        (length,) = struct.unpack(">I", LabConnectionPool.recv_exactly(sock, 4))
+        return LabConnectionPool.recv_exactly(sock, length)
+
+
+    @staticmethod
+    def read_until_eof( sock: socket.socket ) -> bytes :
+        """
+        讀取到連線被關閉為止，buffer 不夠時才加倍（避免 bytes 串接造成的 quadratic copy）
+
+        :param sock: connected socket
+        :return: all received bytes
+        """
+
+        buffer = bytearray(LabConnectionPool.EOF_BUFFER_SIZE)
+        received = 0
+
+        while True :
+            if received == len(buffer) :
+                buffer.extend(bytes(len(buffer)))
+
+            with memoryview(buffer) as view :
+                n = sock.recv_into(view[received :])
+
+            if n == 0 :
+                break
+            received += n
+
+        return bytes(buffer[:received])
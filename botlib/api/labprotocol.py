@@ -0,0 +1,63 @@
+import struct
+from pathlib import Path
+
+
+
+class LabProtocol :
+    """
+    Wire Format Of WMMKS Lab's APIs, Shared By LabApi And AsyncLabApi
+
+    request : ">I" length of body + body
+        - text body  : token + "@@@" + utf-8 text
+        - audio body : token + "@@@" + "main" (8s) + "P" + wav bytes
+    """
+
+    TOKEN_SEPARATOR = "@@@"
+
+
+    @staticmethod
+    def frame( body: bytes ) -> bytes :
+        """
+        put body length (unsigned int, big endian) before body
+
+        :param body: request body
+        :return: framed request
+        """
+        return struct.pack(">I", len(body)) + body
+
+
+    @staticmethod
+    def format_text_data( token: str, raw_text: str ) -> bytes :
+
+        # concatenate user token and data with @@@, and convert to bytes
+        return LabProtocol.frame(bytes(token + LabProtocol.TOKEN_SEPARATOR + raw_text, "utf-8"))
+
+
+    @staticmethod
+    def format_audio_bytes( token: str, audio_data: bytes ) -> bytes :
+
+        header = bytes(token + LabProtocol.TOKEN_SEPARATOR, "utf-8") + struct.pack("8s", bytes("main", encoding = "utf8")) + b"P"
+        return LabProtocol.frame(header + audio_data)
+
+
+    @staticmethod
+    def format_audio_data( token: str, audio_path: Path ) -> bytes :
+
+        with open(audio_path, "rb") as file :
+            return LabProtocol.format_audio_bytes(token, file.read())
+
+
+    @staticmethod
+    def parse_tstt_result( bytes_result: bytes ) -> str :
+        """
+        TSTT server returns ranked candidates like "1.xxx 2.xxx", only the best match is needed
+
+        :param bytes_result: raw TSTT response
+        :return: best match text, empty string if no candidate
+        """
+
+        result = bytes_result.decode("utf-8")
+        try :
+            return result.split("1.")[1].split(" ")[0]
+        except IndexError :
+            return ""
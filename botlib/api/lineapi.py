@@ -85,18 +85,21 @@ class LineApi :
 
 
     @staticmethod
-    def try_push_location( userid, channel_token, location: str or None ) -> None :
+    def try_push_location( userid, channel_token, location: str or None, address: str or None = None,
+                           coordinate: tuple or None = None ) -> None :
         """
         試著 Push 一個 LocationMessage
 
         if 'location' is :
             - None : do nothing
             - not str : TypeError, 只紀錄 log
-            - str : 查詢地址以及座標，如果都有找到就傳送 LocationMessage
+            - str : 有給地址以及座標就直接使用，否則查詢地址以及座標，如果都有找到就傳送 LocationMessage
 
         :param userid: target user id
         :param channel_token: bot channel token
         :param location: target location string
+        :param address: 已經找好的完整地址
+        :param coordinate: 已經找好的 (緯度, 經度)
         :return: None
         """
 
@@ -108,9 +111,9 @@ class LineApi :
             if type(location) is not str :
                 raise TypeError("Location Should Be A String.")
 
-            # 查詢該地點的完整地址以及座標
-            address = GeoApi.get_full_address(location)
-            coordinate = GeoApi.get_coordinate(location)
+            # 沒有事先找好的話，查詢該地點的完整地址以及座標
+            if address is None or coordinate is None :
+                address, coordinate = GeoApi.geocode(location) or (None, None)
 
             # 如果地址或座標其中一項找不到就不 Push LocationMessage
             if coordinate is None or address is None :
@@ -214,8 +217,8 @@ class LineApi :
             LineApi.push_text(userid, channel_token, response.speech_text)
             # 將「搜尋活動的結果轉成語音」並以「語音訊息」回覆 User
             LineApi.make_audio_message(channel_token, userid, response.text, response.language)
-            # 根據 RESPONSE 的 LOCATION 查詢並傳送地點（如果沒找到地點就不傳送位置訊息）
-            LineApi.try_push_location(userid, channel_token, response.location)
+            # 根據 RESPONSE 的 LOCATION 傳送地點（如果沒找到地點就不傳送位置訊息）
+            LineApi.try_push_location(userid, channel_token, response.location, response.address, response.coordinate)
 
         else :
             BotLogger.error("Error Response Type, Should Not Be Here.")
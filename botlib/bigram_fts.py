@@ -0,0 +1,69 @@
+import re
+
+
+
+class BigramFts :
+    """
+    Bigram Tokenizer For SQLite FTS5
+
+    FTS5 的 unicode61 tokenizer 會把一整串沒有空白的中文當成一個 token，所以無法用中文關鍵字搜尋
+    因此寫入 FTS table 前先把每一串連續的文字（中文、英數字混合也是同一串）切成互相重疊的二字詞
+    （台北101 -> 台北 北1 10 01），只有一個字的則保留整個字
+    查詢時把關鍵字用同樣方式切開並組成 phrase query，兩個字以上、沒有空白與標點的關鍵字（見 is_indexed）
+    只要是內容的子字串就一定會符合，但 phrase 可能跨過空白或標點而多找到一些，所以結果還要再以 instr 確認
+    """
+
+    # 文字串的切法改變時要加一，已經建立的 FTS table 需要重建
+    VERSION = 2
+
+    __TOKEN_RULE = re.compile(r"[^\W_]+")
+
+
+    @staticmethod
+    def tokens( text: str ) -> list :
+        """
+        :param text: 任意文字
+        :return: 每一串文字的二字詞（只有一個字則為那個字）的 list（依照出現順序）
+        """
+
+        tokens = []
+        for run in BigramFts.__TOKEN_RULE.findall(text.lower()) :
+            if len(run) == 1 :
+                tokens.append(run)
+            else :
+                tokens.extend(run[i :i + 2] for i in range(len(run) - 1))
+        return tokens
+
+
+    @staticmethod
+    def is_indexed( keyword: str ) -> bool :
+        """
+        :param keyword: 關鍵字
+        :return: FTS index 能不能找出所有包含這個關鍵字的內容（兩個字以上的一串文字），否則只能直接比對內容
+        """
+
+        return len(keyword) > 1 and BigramFts.__TOKEN_RULE.fullmatch(keyword.lower()) is not None
+
+
+    @staticmethod
+    def to_document( text: str ) -> str :
+        """
+        :param text: 要寫入 FTS table 的文字
+        :return: 以空白分隔 tokens 的文字
+        """
+
+        return " ".join(BigramFts.tokens(text))
+
+
+    @staticmethod
+    def match_query( keywords: list ) -> str or None :
+        """
+        將 index 能回答的關鍵字（見 is_indexed）轉成 FTS5 MATCH query，每個關鍵字都必須出現（AND）
+        其他關鍵字會被略過，呼叫端要自己比對
+
+        :param keywords: 關鍵字 list
+        :return: MATCH query，沒有可用的關鍵字時回傳 None
+        """
+
+        phrases = ['"' + " ".join(BigramFts.tokens(keyword)) + '"' for keyword in keywords if BigramFts.is_indexed(keyword)]
+        return " AND ".join(phrases) if phrases else None
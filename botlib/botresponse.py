@@ -19,6 +19,8 @@ class BotResponse :
         self.url = ''
         self.text = ''
         self.location = ''
+        self.address = None
+        self.coordinate = None
         self.language = language
         self.type = BotResponse.INFORM
 
@@ -52,11 +54,14 @@ class BotResponse :
 
 
     @staticmethod
-    def make_activity_response( speech_text: str, content: str, location: str or None, language: BotResponseLanguage ) -> 'BotResponse' :
+    def make_activity_response( speech_text: str, content: str, location: str or None, language: BotResponseLanguage,
+                                address: str or None = None, coordinate: tuple or None = None ) -> 'BotResponse' :
         response = BotResponse(speech_text, language)
         response.type = BotResponse.ACTIVITY
         response.text = content
         response.location = location
+        response.address = address
+        response.coordinate = coordinate
         return response
 
 
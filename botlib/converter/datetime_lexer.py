@@ -0,0 +1,235 @@
+import re
+import datetime
+from dateutil.relativedelta import relativedelta
+
+
+
+class DatetimeSpan :
+    """
+    A Datetime Expression Found In Sentence
+    """
+
+    __slots__ = ("start", "end", "text", "value", "fields", "until")
+
+
+    def __init__( self, start: int, end: int, text: str, value: str, fields: dict, until: dict or None = None ) :
+        """
+        :param start: 在原字串中的起始位置
+        :param end: 在原字串中的結束位置（不包含）
+        :param text: 原字串中的時間表示
+        :param value: 以「年月日時分（阿拉伯數值）」表示的結果
+        :param fields: value 中各單位的值，例如 {"year": 2021, "month": 3}
+        :param until: 時間表示本身就是範圍時（例如：下週），範圍結尾的各單位值
+        """
+
+        self.start = start
+        self.end = end
+        self.text = text
+        self.value = value
+        self.fields = fields
+        self.until = until
+
+
+    def __repr__( self ) :
+        return f"DatetimeSpan({self.start}, {self.end}, {self.text!r} -> {self.value!r})"
+
+
+class DatetimeLexer :
+    """
+    One-Pass Lexer For Datetime Expressions In CHT Sentence
+
+    用一個 compiled regex 由左到右掃過句子一次，同時找出常見日期（今天、下週）和數值時間（三天後、五點十分）
+    並直接在掃描時轉換成「年月日時分（阿拉伯數值）」表示
+    """
+
+    UNITS = ("year", "month", "week", "day", "hour", "minute")
+
+    __DIGITS = str.maketrans({
+        "零" : "0", "一" : "1", "二" : "2", "兩" : "2", "三" : "3", "四" : "4",
+        "五" : "5", "六" : "6", "七" : "7", "八" : "8", "九" : "9", "十" : "10",
+    })
+
+    __YEAR_SHIFT = { "前" : -2, "去" : -1, "今" : 0, "明" : 1, "後" : 2 }
+    __DAY_SHIFT = { "前" : -2, "昨" : -1, "今" : 0, "明" : 1, "後" : 2 }
+
+    __STD_DATE_FMT = "%Y年%m月%d日"
+
+    # format of relative datetime result, by its smallest unit
+    __RELATIVE_FMT = {
+        "year" : "%Y年",
+        "month" : "%Y年%m月",
+        "week" : __STD_DATE_FMT,
+        "day" : __STD_DATE_FMT,
+        "hour" : f"{__STD_DATE_FMT}%H點",
+        "minute" : f"{__STD_DATE_FMT}%H點%M分",
+    }
+    __RELATIVE_FIELDS = {
+        "year" : ("year",),
+        "month" : ("year", "month"),
+        "week" : ("year", "month", "day"),
+        "day" : ("year", "month", "day"),
+        "hour" : ("year", "month", "day", "hour"),
+        "minute" : ("year", "month", "day", "hour", "minute"),
+    }
+
+    __NUM = "[零一二兩三四五六七八九十0-9]"
+
+    # common date words first, they have priority over numeric datetime (e.g. 三天後天氣 -> 三天 + 後天)
+    __RULE = re.compile(
+        "(?P<year_word>[前去今明後]年)"
+        "|(?P<month_word>(?P<month_shift>上+|這|下+)個?月)"
+        "|(?P<week_word>(?P<week_shift>上+|這|下+)個?(?:禮拜|星期|周|週))"
+        "|(?P<day_word>[前昨今明後][天日])"
+        f"|又?(?={__NUM})"
+        f"(?:(?P<year>{__NUM}+)個?年)?又?"
+        f"(?:(?P<month>{__NUM}+)個?月)?又?"
+        f"(?:(?P<week>{__NUM}+)個?(?:週|周|星期|禮拜))?又?"
+        f"(?:(?P<day>{__NUM}+)個?(?:日|天|號))?又?"
+        f"(?:(?P<hour>{__NUM}+)個?(?:小?時|鐘頭|點))?又?"
+        f"(?:(?P<minute>{__NUM}+)個?分鐘?)?"
+        "(?P<relative>之?前(?![天日年])|後(?![天日年]))?"
+    )
+
+
+    @staticmethod
+    def tokenize( any_cht_sentence: str, now: datetime.datetime = None ) -> list :
+        """
+        找出句子中所有的時間表示，並轉換成「年月日時分（阿拉伯數值）」表示
+
+        :param any_cht_sentence: any cht sentence
+        :param now: 相對時間的基準，預設為當前時間
+        :return: list of DatetimeSpan，依照在句子中的位置排序
+        """
+
+        now = now or datetime.datetime.now()
+        spans = []
+
+        for match in DatetimeLexer.__RULE.finditer(any_cht_sentence) :
+            kind = match.lastgroup
+            if kind is None and match.group("relative") is None :
+                # empty match, or numbers without any unit
+                continue
+
+            if kind == "year_word" :
+                span = DatetimeLexer.__year_word(match, now)
+            elif kind == "month_word" :
+                span = DatetimeLexer.__month_word(match, now)
+            elif kind == "week_word" :
+                span = DatetimeLexer.__week_word(match, now)
+            elif kind == "day_word" :
+                span = DatetimeLexer.__day_word(match, now)
+            else :
+                span = DatetimeLexer.__numeric(match, now)
+
+            if span is not None :
+                spans.append(span)
+
+        return spans
+
+
+    # ------------------------------------------------------------------------------------------------------------
+    # common date words
+
+    @staticmethod
+    def __year_word( match, now: datetime.datetime ) -> DatetimeSpan :
+        year = now.year + DatetimeLexer.__YEAR_SHIFT[match.group()[0]]
+        return DatetimeSpan(match.start(), match.end(), match.group(), f"{year}年", { "year" : year })
+
+
+    @staticmethod
+    def __month_word( match, now: datetime.datetime ) -> DatetimeSpan :
+        shift_text = match.group("month_shift")
+        shift = len(shift_text) if shift_text[0] == "下" else -len(shift_text) if shift_text[0] == "上" else 0
+
+        month = (now + relativedelta(months = shift)).month
+        return DatetimeSpan(match.start(), match.end(), match.group(), f"{month}月", { "month" : month })
+
+
+    @staticmethod
+    def __week_word( match, now: datetime.datetime ) -> DatetimeSpan :
+        shift_text = match.group("week_shift")
+        shift = len(shift_text) if shift_text[0] == "下" else -len(shift_text) if shift_text[0] == "上" else 0
+
+        # 找到目標周的開頭以及結尾日期，以「日期範圍」表示
+        start_date = now + relativedelta(days = -now.weekday(), weeks = shift)
+        end_date = start_date + relativedelta(days = 6)
+
+        value = f"{start_date.strftime(DatetimeLexer.__STD_DATE_FMT)} 到 {end_date.strftime(DatetimeLexer.__STD_DATE_FMT)}"
+        return DatetimeSpan(match.start(), match.end(), match.group(), value,
+                            DatetimeLexer.__date_fields(start_date, DatetimeLexer.__RELATIVE_FIELDS["day"]),
+                            DatetimeLexer.__date_fields(end_date, DatetimeLexer.__RELATIVE_FIELDS["day"]))
+
+
+    @staticmethod
+    def __day_word( match, now: datetime.datetime ) -> DatetimeSpan :
+        date = now + relativedelta(days = DatetimeLexer.__DAY_SHIFT[match.group()[0]])
+        return DatetimeSpan(match.start(), match.end(), match.group(), date.strftime(DatetimeLexer.__STD_DATE_FMT),
+                            DatetimeLexer.__date_fields(date, DatetimeLexer.__RELATIVE_FIELDS["day"]))
+
+
+    # ------------------------------------------------------------------------------------------------------------
+    # numeric datetime
+
+    @staticmethod
+    def cht_number_text( cht_number: str ) -> str :
+        """
+        將中文數值轉成阿拉伯數值，例如：二十三 -> 23、十 -> 10、二零二一 -> 2021
+
+        :param cht_number: 中文（或混合阿拉伯數字）的數值
+        :return: 以阿拉伯數字表示的數值字串
+        """
+
+        tens, ten, ones = cht_number.partition("十")
+        if ten == "" or "十" in ones or len(tens) > 1 or len(ones) > 1 :
+            return cht_number.translate(DatetimeLexer.__DIGITS)
+
+        tens = int(tens.translate(DatetimeLexer.__DIGITS)) if tens != "" else 1
+        ones = int(ones.translate(DatetimeLexer.__DIGITS)) if ones != "" else 0
+        return str(tens * 10 + ones)
+
+
+    @staticmethod
+    def __numeric( match, now: datetime.datetime ) -> DatetimeSpan or None :
+
+        text = match.group()
+        offset = match.start()
+
+        # convert numbers of each unit, and keep other parts of the text
+        fields = { }
+        pieces = []
+        position = 0
+        for unit in DatetimeLexer.UNITS :
+            number = match.group(unit)
+            if number is not None :
+                start, end = match.span(unit)
+                number_text = DatetimeLexer.cht_number_text(number)
+                fields[unit] = int(number_text)
+                pieces.append(text[position :start - offset])
+                pieces.append(number_text)
+                position = end - offset
+
+        if fields == { } :
+            return None
+
+        relative = match.group("relative")
+        if relative is None :
+            pieces.append(text[position :])
+            value = "".join(pieces).replace("又", "").replace("個", "")
+            return DatetimeSpan(match.start(), match.end(), text, value, fields)
+
+        # 相對時間，以當前時間為基準換算成實際時間，並以原字串的最小時間單位表示
+        delta = relativedelta(years = fields.get("year", 0), months = fields.get("month", 0), weeks = fields.get("week", 0),
+                              days = fields.get("day", 0), hours = fields.get("hour", 0), minutes = fields.get("minute", 0))
+        try :
+            real_datetime = now - delta if "前" in relative else now + delta
+        except (ValueError, OverflowError) :
+            return None
+
+        smallest = [unit for unit in DatetimeLexer.UNITS if unit in fields][-1]
+        return DatetimeSpan(match.start(), match.end(), text, real_datetime.strftime(DatetimeLexer.__RELATIVE_FMT[smallest]),
+                            DatetimeLexer.__date_fields(real_datetime, DatetimeLexer.__RELATIVE_FIELDS[smallest]))
+
+
+    @staticmethod
+    def __date_fields( dt: datetime.datetime, units: tuple ) -> dict :
+        return { unit : getattr(dt, unit) for unit in units }
@@ -1,7 +1,11 @@
 import speech_recognition as recognizer
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from pathlib import Path
 
 # project lib
+from botlib import BotConfig
 from botlib.botlogger import BotLogger
 from botlib.api.labapi import LabApi
 
@@ -13,15 +17,73 @@ class SpeechToText :
     """
 
 
+    # shared by all requests, so concurrent STT calls won't create threads per request
+    __EXECUTOR = ThreadPoolExecutor(max_workers = BotConfig.STT_WORKER_COUNT, thread_name_prefix = "STT")
+
+
     @staticmethod
-    def duo_lang_to_cht( wav_audio_path: Path ) -> (str, str) :
+    def duo_lang_to_cht( wav_audio_path: Path, concurrent = False, is_known_service = None,
+                         chinese_timeout = BotConfig.STT_CHINESE_TIMEOUT,
+                         taiwanese_timeout = BotConfig.STT_TAIWANESE_TIMEOUT ) -> (str, str) :
+        """
+        同時以「中文」以及「台語」辨識同一個音檔
+
+        concurrent 模式會同時啟動兩種辨識，各自的 timeout 都是從啟動時開始計算，超時的結果視為 None
+        若有提供 is_known_service（speculative），當中文辨識結果已經能對應到服務時
+        就不再等待台語辨識（如果台語辨識還沒進行 T2C 也會直接取消）
+
+        :param wav_audio_path: 16khz wav audio file path obj
+        :param concurrent: 是否同時進行兩種語言的辨識，預設為依序進行
+        :param is_known_service: (str) -> bool，判斷中文辨識結果是否已經對應到某個服務，None 則兩種都會等待
+        :param chinese_timeout: 中文辨識的 timeout（秒），只用於 concurrent 模式
+        :param taiwanese_timeout: 台語辨識的 timeout（秒），只用於 concurrent 模式
+        :return: (中文辨識結果, 台語辨識結果)，失敗、超時或被略過的結果為 None
+        """
+
+        if not concurrent :
+            c2c_result = SpeechToText.chinese_to_cht(wav_audio_path)
+            if c2c_result is not None and is_known_service is not None and is_known_service(c2c_result) :
+                return c2c_result, None
+
+            t2c_result = SpeechToText.taiwanese_to_cht(wav_audio_path)
+            return c2c_result, t2c_result
 
-        c2c_result = SpeechToText.chinese_to_cht(wav_audio_path)
-        t2c_result = SpeechToText.taiwanese_to_cht(wav_audio_path)
+        # start both recognizers together
+        start = time.monotonic()
+        cancel = threading.Event()
+        c2c_future = SpeechToText.__EXECUTOR.submit(SpeechToText.chinese_to_cht, wav_audio_path)
+        t2c_future = SpeechToText.__EXECUTOR.submit(SpeechToText.taiwanese_to_cht, wav_audio_path, cancel)
+
+        c2c_result = SpeechToText.__wait_result(c2c_future, start + chinese_timeout, "Chinese")
+
+        # speculative : chinese result is good enough, ignore taiwanese result
+        if c2c_result is not None and is_known_service is not None and is_known_service(c2c_result) :
+            cancel.set()
+            t2c_future.cancel()
+            BotLogger.debug("Chinese STT Result Matches A Service, Taiwanese STT Ignored.")
+            return c2c_result, None
+
+        t2c_result = SpeechToText.__wait_result(t2c_future, start + taiwanese_timeout, "Taiwanese")
 
         return c2c_result, t2c_result
 
 
+    @staticmethod
+    def __wait_result( future, deadline: float, engine: str ) -> str or None :
+
+        try :
+            return future.result(timeout = max(0.0, deadline - time.monotonic()))
+
+        except TimeoutError :
+            future.cancel()
+            BotLogger.error(f"{engine} STT Timeout, Result Ignored.")
+
+        except Exception as e :
+            BotLogger.exception(f"{engine} STT Error, {type(e).__name__} : {e}")
+
+        return None
+
+
     @staticmethod
     def chinese_to_cht( wav_audio_path: Path ) -> str or None :
         """
@@ -55,9 +117,21 @@ class SpeechToText :
 
 
     @staticmethod
-    def taiwanese_to_cht( wav_16khz_audio_path: Path ) -> str or None :
+    def taiwanese_to_cht( wav_16khz_audio_path: Path, cancel: threading.Event = None ) -> str or None :
+        """
+        Convert Taiwanese Speech Audio To CHT Text With Lab API (TSTT then T2C)
+
+        :param wav_16khz_audio_path: Taiwanese Speech Audio File Path Obj (16khz wav)
+        :param cancel: 如果在 TSTT 完成後已經被 set，就不再進行 T2C 並回傳 None
+        :return: Result Text, None if cancelled
+        """
 
         tai_text = LabApi.lab_tstt_api(wav_16khz_audio_path)
+
+        if cancel is not None and cancel.is_set() :
+            BotLogger.debug("Taiwanese STT Cancelled Before T2C.")
+            return None
+
         cht_text = LabApi.lab_t2c_api(tai_text)
 
         return cht_text
@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+
+# project libs
+from botlib.botlogger import BotLogger
+
+
+
+class EventWorkerPool :
+    """
+    Bounded Job Queue Served By A Fixed Number Of Worker Threads
+
+    webhook handler 只負責把 job 放進 queue 就可以馬上回傳，實際的處理則交給 worker threads
+    queue 滿的時候 submit 會直接回傳 False（backpressure），而不是讓 webhook 卡住
+    """
+
+
+    def __init__( self, worker_count: int, queue_size: int, name = "EventWorker" ) :
+        self.__name = name
+        self.__worker_count = max(1, worker_count)
+        self.__queue = queue.Queue(maxsize = max(1, queue_size))
+        self.__workers = []
+        self.__accepting = False
+        self.__lock = threading.Lock()
+
+        # backpressure metrics
+        self.__submitted = 0
+        self.__rejected = 0
+        self.__processed = 0
+        self.__failed = 0
+        self.__busy = 0
+        self.__total_wait = 0.0
+        self.__max_wait = 0.0
+
+
+    def start( self ) -> None :
+        """
+        啟動所有 worker threads，重複呼叫不會建立新的 worker
+
+        :return: None
+        """
+
+        with self.__lock :
+            if self.__workers != [] :
+                return
+
+            for i in range(self.__worker_count) :
+                worker = threading.Thread(target = self.__work, name = f"{self.__name}-{i}", daemon = True)
+                worker.start()
+                self.__workers.append(worker)
+
+            self.__accepting = True
+
+        BotLogger.info(f"{self.__name} Pool Started With {self.__worker_count} Workers.")
+
+
+    def submit( self, job, *args ) -> bool :
+        """
+        將 job(*args) 放進 queue 等待 worker 處理，不會 block
+
+        :param job: 要執行的 callable
+        :param args: job 的參數
+        :return: 成功放進 queue 則回傳 True，pool 已關閉或 queue 已滿則回傳 False
+        """
+
+        # 與 shutdown 共用 lock，避免 job 排在 stop sentinel 之後而永遠不會被處理
+        with self.__lock :
+            if not self.__accepting :
+                BotLogger.warning(f"{self.__name} Pool Is Not Accepting Jobs, Job Dropped.")
+                return False
+
+            try :
+                self.__queue.put_nowait((time.monotonic(), job, args))
+                self.__submitted += 1
+
+            except queue.Full :
+                self.__rejected += 1
+                BotLogger.warning(f"{self.__name} Queue Full ({self.__queue.maxsize}), Job Rejected.")
+                return False
+
+        return True
+
+
+    def stats( self ) -> dict :
+        """
+        目前的 queue 狀態以及等待時間，用來觀察 backpressure
+
+        :return: metrics dict
+        """
+
+        with self.__lock :
+            started = self.__processed + self.__failed + self.__busy
+            return {
+                "workers" : self.__worker_count,
+                "busy_workers" : self.__busy,
+                "queue_depth" : self.__queue.qsize(),
+                "queue_capacity" : self.__queue.maxsize,
+                "submitted" : self.__submitted,
+                "rejected" : self.__rejected,
+                "processed" : self.__processed,
+                "failed" : self.__failed,
+                "avg_wait_seconds" : self.__total_wait / started if started != 0 else 0.0,
+                "max_wait_seconds" : self.__max_wait,
+            }
+
+
+    def shutdown( self, timeout: float or None = None ) -> bool :
+        """
+        停止接收新的 job，並等待 queue 中剩下的 job 處理完畢（graceful drain）
+
+        :param timeout: 最多等待幾秒，None 則會一直等到處理完畢
+        :return: 所有 worker 是否都在時限內結束
+        """
+
+        with self.__lock :
+            if not self.__accepting :
+                return True
+            self.__accepting = False
+            workers = list(self.__workers)
+
+        BotLogger.info(f"{self.__name} Pool Draining, {self.__queue.qsize()} Jobs Left.")
+
+        # 每個 worker 一個 stop sentinel，排在剩下的 job 之後
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for _ in workers :
+            try :
+                self.__queue.put(None, timeout = None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Full :
+                break
+
+        for worker in workers :
+            worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+        drained = not any(worker.is_alive() for worker in workers)
+        if drained :
+            BotLogger.info(f"{self.__name} Pool Drained.")
+        else :
+            BotLogger.warning(f"{self.__name} Pool Drain Timeout, {self.__queue.qsize()} Jobs Left.")
+
+        return drained
+
+
+    # -------------------------------------------------------------------------------------------------------
+
+    def __work( self ) -> None :
+
+        while True :
+            item = self.__queue.get()
+
+            # stop sentinel
+            if item is None :
+                self.__queue.task_done()
+                break
+
+            enqueue_time, job, args = item
+            wait = time.monotonic() - enqueue_time
+
+            with self.__lock :
+                self.__busy += 1
+                self.__total_wait += wait
+                self.__max_wait = max(self.__max_wait, wait)
+
+            failed = False
+            try :
+                job(*args)
+
+            except Exception as e :
+                failed = True
+                BotLogger.exception(f"{self.__name} Job Error, {type(e).__name__} => {e}")
+
+            finally :
+                with self.__lock :
+                    self.__busy -= 1
+                    if failed :
+                        self.__failed += 1
+                    else :
+                        self.__processed += 1
+                self.__queue.task_done()
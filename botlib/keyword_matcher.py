@@ -0,0 +1,139 @@
+from collections import deque
+
+
+
+class KeywordMatcher :
+    """
+    Aho-Corasick Keyword Matcher
+
+    建立時把所有關鍵字編成一個自動機，之後每次比對只需要掃過文字一次就能找出所有命中的關鍵字
+    所以關鍵字再多也不會讓比對變慢（只跟文字長度和命中數有關）
+    """
+
+
+    def __init__( self, keyword_table: dict, ignore_case = False ) :
+        """
+        :param keyword_table: label -> list of keywords，同一個關鍵字可以屬於多個 label
+        :param ignore_case: 是否忽略英文大小寫
+        """
+
+        self.ignore_case = ignore_case
+
+        # node i : transitions, failure link, (keyword, labels) that end at this node
+        self.__goto = [{ }]
+        self.__fail = [0]
+        self.__outputs = [[]]
+
+        terminals = { }
+        for label, keywords in keyword_table.items() :
+            for keyword in keywords :
+                if keyword :
+                    node = self.__insert(self.__normalize(keyword))
+                    terminals.setdefault(node, (self.__normalize(keyword), set()))[1].add(label)
+
+        for node, (keyword, labels) in terminals.items() :
+            self.__outputs[node] = [(keyword, frozenset(labels))]
+
+        self.__link()
+
+
+    def __normalize( self, text: str ) -> str :
+        return text.lower() if self.ignore_case else text
+
+
+    def __insert( self, keyword: str ) -> int :
+
+        node = 0
+        for char in keyword :
+            child = self.__goto[node].get(char)
+            if child is None :
+                child = len(self.__goto)
+                self.__goto[node][char] = child
+                self.__goto.append({ })
+                self.__fail.append(0)
+                self.__outputs.append([])
+            node = child
+
+        return node
+
+
+    def __link( self ) -> None :
+
+        # bfs, so failure link of parent is always ready before its children
+        nodes = deque(self.__goto[0].values())
+        while nodes :
+            node = nodes.popleft()
+
+            for char, child in self.__goto[node].items() :
+                fail = self.__fail[node]
+                while fail != 0 and char not in self.__goto[fail] :
+                    fail = self.__fail[fail]
+
+                self.__fail[child] = self.__goto[fail].get(char, 0)
+                # keywords that are suffix of this one also end here
+                self.__outputs[child] = self.__outputs[child] + self.__outputs[self.__fail[child]]
+                nodes.append(child)
+
+
+    # -------------------------------------------------------------------------------------------------------
+
+    def find_all( self, text: str ) -> list :
+        """
+        找出 text 中所有命中的關鍵字（包含互相重疊的）
+
+        :param text: 要比對的文字
+        :return: list of (start, end, keyword, labels)，依照 end 排序
+        """
+
+        goto, fail, outputs = self.__goto, self.__fail, self.__outputs
+        hits = []
+
+        node = 0
+        for i, char in enumerate(self.__normalize(text)) :
+            while node != 0 and char not in goto[node] :
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            for keyword, labels in outputs[node] :
+                hits.append((i + 1 - len(keyword), i + 1, keyword, labels))
+
+        return hits
+
+
+    def labels( self, text: str ) -> set :
+        """
+        :param text: 要比對的文字
+        :return: text 中所有命中的關鍵字所屬的 label
+        """
+
+        found = set()
+        for _, _, _, labels in self.find_all(text) :
+            found |= labels
+        return found
+
+
+    def replace( self, text: str, replacements: dict ) -> str :
+        """
+        由左到右將命中的關鍵字換成 replacements 中對應的文字，重疊時取最左邊、最長的那個
+
+        :param text: 要取代的文字
+        :param replacements: keyword -> replacement
+        :return: 取代後的文字
+        """
+
+        if self.ignore_case :
+            replacements = { self.__normalize(keyword) : value for keyword, value in replacements.items() }
+
+        hits = sorted(self.find_all(text), key = lambda hit : (hit[0], -hit[1]))
+
+        pieces = []
+        position = 0
+        for start, end, keyword, _ in hits :
+            if start < position or keyword not in replacements :
+                continue
+            pieces.append(text[position :start])
+            pieces.append(replacements[keyword])
+            position = end
+
+        pieces.append(text[position :])
+        return "".join(pieces)
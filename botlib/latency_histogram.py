@@ -0,0 +1,63 @@
+import bisect
+import threading
+
+
+
+class LatencyHistogram :
+    """
+    Fixed Bucket Latency Histogram (milliseconds)
+    """
+
+    BUCKETS_MS = (50, 100, 200, 500, 1000, 2000, 3000, 5000, 10000, 20000)
+
+
+    def __init__( self ) :
+        # last bucket counts everything slower than BUCKETS_MS[-1]
+        self.__counts = [0] * (len(LatencyHistogram.BUCKETS_MS) + 1)
+        self.__total = 0
+        self.__sum_ms = 0.0
+        self.__lock = threading.Lock()
+
+
+    def record( self, seconds: float ) -> None :
+        ms = seconds * 1000
+        with self.__lock :
+            self.__counts[bisect.bisect_left(LatencyHistogram.BUCKETS_MS, ms)] += 1
+            self.__total += 1
+            self.__sum_ms += ms
+
+
+    def percentile( self, q: float ) -> float or None :
+        """
+        :param q: 0 ~ 1
+        :return: 第 q 百分位落在的 bucket 上限（毫秒），超過最後一個 bucket 則為 inf，沒有資料則回傳 None
+        """
+
+        with self.__lock :
+            if self.__total == 0 :
+                return None
+
+            rank = q * self.__total
+            seen = 0
+            for bucket, count in enumerate(self.__counts) :
+                seen += count
+                if seen >= rank :
+                    break
+
+        return LatencyHistogram.BUCKETS_MS[bucket] if bucket < len(LatencyHistogram.BUCKETS_MS) else float("inf")
+
+
+    def snapshot( self ) -> dict :
+
+        with self.__lock :
+            total, sum_ms = self.__total, self.__sum_ms
+            buckets = { f"le_{bound}" : count for bound, count in zip(LatencyHistogram.BUCKETS_MS, self.__counts) }
+            buckets["inf"] = self.__counts[-1]
+
+        return {
+            "count" : total,
+            "mean_ms" : round(sum_ms / total, 1) if total != 0 else None,
+            "p50_ms" : self.percentile(0.5),
+            "p90_ms" : self.percentile(0.9),
+            "buckets" : buckets,
+        }
@@ -1,11 +1,14 @@
 # project libs
+import json
 import re
+from pathlib import Path
 
 from botlib.api.hanlpapi import HanlpApi, NerCatalogs
 from botlib.botlogger import BotLogger
 from botlib.converter.datetime_converter import DatetimeConverter
 from botlib.services import Services, news
 from botlib.botresponse import BotResponseLanguage
+from botlib.keyword_matcher import KeywordMatcher
 
 
 
@@ -16,10 +19,26 @@ class SemanticAnalyzer :
     1. Target Service
     2. pnList, Events, Datetime Range, Locations
     """
-    NEWS_SEARCH_KEYWORDS = ["新聞", "報導"]
-    ACTIVITY_GENERAL_KEYWORDS = ["活動", "考試", "展", "演講", "遊行", "舉行", "舉辦", "會", "比賽", "賽事", "競賽"]
-    ACTIVITY_SEARCH_KEYWORDS = ["查詢", "什麼", "想知道", "哪些"]
-    ACTIVITY_CREATE_KEYWORDS = ["有", "舉行", "舉辦", "開放", "加入"]
+    # keyword tables, add vocabulary in keywords.json
+    __KEYWORDS = json.loads((Path(__file__).parent / "keywords.json").read_text(encoding = "utf-8"))
+
+    NEWS_SEARCH_KEYWORDS = __KEYWORDS["intents"]["NEWS_SEARCH"]
+    ACTIVITY_GENERAL_KEYWORDS = __KEYWORDS["intents"]["ACTIVITY_GENERAL"]
+    ACTIVITY_SEARCH_KEYWORDS = __KEYWORDS["intents"]["ACTIVITY_SEARCH"]
+    ACTIVITY_CREATE_KEYWORDS = __KEYWORDS["intents"]["ACTIVITY_CREATE"]
+
+    # compiled once, each matcher finds all of its keywords in one pass over the text
+    __INTENT_MATCHER = KeywordMatcher(__KEYWORDS["intents"])
+    __MEDIA_MATCHER = KeywordMatcher(__KEYWORDS["media"], ignore_case = True)
+    __ABBR_DICT = __KEYWORDS["abbreviations"]
+    __ABBR_MATCHER = KeywordMatcher({ "ABBR" : list(__ABBR_DICT) })
+    __IGNORED_KEYWORDS = set(__KEYWORDS["ignored_keywords"])
+
+    # media checked in this order when text mentions more than one
+    __MEDIA_PRIORITY = [news.AvailableMedia[name] for name in __KEYWORDS["media"]]
+
+    __CHINESE_RULE = re.compile("(以|用)(中文|國語)((告訴|回答|回覆)我?|說)")
+    __TAIWANESE_RULE = re.compile("(以|用)(閩南語|台語|臺語)((告訴|回答|回覆)我?|說)")
 
 
     def __init__( self, speech_text: str, default_response_lang: BotResponseLanguage ) :
@@ -30,8 +49,10 @@ class SemanticAnalyzer :
         self.speech_text_no_abbr = SemanticAnalyzer.__remove_speech_abbreviation(self.speech_text_no_lang)
 
         # parse datetime description and extract datetime range
-        self.parsed_content = DatetimeConverter.standardize_datetime(self.speech_text_no_abbr)
-        self.time_range = DatetimeConverter.extract_datetime(self.parsed_content)
+        self.parsed_content, self.time_range = DatetimeConverter.parse(self.speech_text_no_abbr)
+
+        # intents found in parsed content, parsed content won't change after this
+        self.__intents = SemanticAnalyzer.__INTENT_MATCHER.labels(self.parsed_content)
 
         # information that extract from user speech
         self.people = []
@@ -42,8 +63,8 @@ class SemanticAnalyzer :
 
         self.keywords = []
 
-        # media extract from speech text
-        self.media = news.AvailableMedia.NCKU
+        # media extract from speech text, None for searching every media
+        self.media = None
 
         # result types
         self.service = Services.UNKNOWN
@@ -55,7 +76,7 @@ class SemanticAnalyzer :
 
         # check request mode
         if self.service == Services.SEARCH_NEWS :
-            content += f"Search {self.media} News Request : \n"
+            content += f"Search {self.media or 'All Media'} News Request : \n"
         elif self.service == Services.SEARCH_ACTIVITY :
             content += f"Search Activity Request : \n"
         elif self.service == Services.CREATE_ACTIVITY :
@@ -80,16 +101,13 @@ class SemanticAnalyzer :
         """
 
         # extract language specification part from speech text
-        chinese_rule = "(以|用)(中文|國語)((告訴|回答|回覆)我?|說)"
-        taiwanese_rule = "(以|用)(閩南語|台語|臺語)((告訴|回答|回覆)我?|說)"
+        speech_text_no_lang, count = SemanticAnalyzer.__CHINESE_RULE.subn("", speech_text)
+        if count != 0 :
+            return speech_text_no_lang, BotResponseLanguage.CHINESE
 
-        if re.search(chinese_rule, speech_text) is not None :
-            speech_text = re.sub(chinese_rule, "", speech_text)
-            return speech_text, BotResponseLanguage.CHINESE
-
-        if re.search(taiwanese_rule, speech_text) is not None :
-            speech_text = re.sub(taiwanese_rule, "", speech_text)
-            return speech_text, BotResponseLanguage.TAIWANESE
+        speech_text_no_lang, count = SemanticAnalyzer.__TAIWANESE_RULE.subn("", speech_text)
+        if count != 0 :
+            return speech_text_no_lang, BotResponseLanguage.TAIWANESE
 
         return speech_text, default_lang
 
@@ -97,17 +115,7 @@ class SemanticAnalyzer :
     @staticmethod
     def __remove_speech_abbreviation( speech_text_no_lang: str ) -> str :
 
-        result = speech_text_no_lang
-
-        abbr_dict = {
-            "台北101" : "台北101大樓", "北捷" : "台北捷運",
-            "台大" : "台灣大學", "清大" : "清華大學", "交大" : "交通大學", "成大" : "成功大學"
-        }
-
-        for abbr in abbr_dict :
-            result = result.replace(abbr, abbr_dict[abbr])
-
-        return result
+        return SemanticAnalyzer.__ABBR_MATCHER.replace(speech_text_no_lang, SemanticAnalyzer.__ABBR_DICT)
 
 
     def __extract_keywords( self, ws_pos_ner: dict ) :
@@ -124,10 +132,10 @@ class SemanticAnalyzer :
             # rm single word
             if len(keyword) < 2 :
                 continue
-            elif keyword in ["新聞", "報導", "活動"] :
+            elif keyword in SemanticAnalyzer.__IGNORED_KEYWORDS :
                 continue
             # rm media keyword
-            elif SemanticAnalyzer.__extract_media(keyword) is not None :
+            elif len(SemanticAnalyzer.__MEDIA_MATCHER.find_all(keyword)) != 0 :
                 continue
 
             self.keywords.append(keyword)
@@ -145,26 +153,60 @@ class SemanticAnalyzer :
         """
 
         # find available media from pn List
-        if re.search("自由時報", cht_text) :
-            return news.AvailableMedia.LTN
-        if re.search("(中國時報|中時(電子報)?)", cht_text) :
-            return news.AvailableMedia.CHINATIME
-        if re.search("TVBS", cht_text, re.IGNORECASE) :
-            return news.AvailableMedia.TVBS
-        if re.search("(東森|ETTODAY|新聞雲)", cht_text, re.IGNORECASE) :
-            return news.AvailableMedia.ETTODAY
-        if re.search("(UDN|聯合報)", cht_text, re.IGNORECASE) :
-            return news.AvailableMedia.UDN
-        if re.search("三立(新聞)?", cht_text) :
-            return news.AvailableMedia.SETN
-        if re.search("(成大|成功大學)", cht_text) :
-            return news.AvailableMedia.NCKU
+        found = SemanticAnalyzer.__MEDIA_MATCHER.labels(cht_text)
+
+        for media in SemanticAnalyzer.__MEDIA_PRIORITY :
+            if media.name in found :
+                return media
 
         return None
 
 
+    @staticmethod
+    def __determine_service( parsed_content: str ) -> Services :
+        """
+        determine target service only by keywords in parsed content
+
+        :param parsed_content: speech text after removing language part, abbreviations and standardizing datetime
+        :return: target Services
+        """
+
+        return SemanticAnalyzer.__service_of(SemanticAnalyzer.__INTENT_MATCHER.labels(parsed_content))
+
+
+    @staticmethod
+    def __service_of( intents: set ) -> Services :
+
+        if "NEWS_SEARCH" in intents :
+            return Services.SEARCH_NEWS
+
+        if "ACTIVITY_GENERAL" in intents :
+            if "ACTIVITY_SEARCH" in intents :
+                return Services.SEARCH_ACTIVITY
+            if "ACTIVITY_CREATE" in intents :
+                return Services.CREATE_ACTIVITY
+
+        return Services.UNKNOWN
+
+
     # ------------------------------------------------------------------------------------------------------------
 
+    @staticmethod
+    def guess_service( speech_text: str ) -> Services :
+        """
+        只用關鍵字判斷 speech text 對應的服務，不會呼叫 HanLP 也不會抽取時間範圍
+        結果與 parse_content 所決定的 service 相同，可以用來提早判斷 STT 結果是否有意義
+
+        :param speech_text: STT result text
+        :return: target Services
+        """
+
+        speech_text_no_lang, _ = SemanticAnalyzer.__change_response_language(speech_text, BotResponseLanguage.CHINESE)
+        speech_text_no_abbr = SemanticAnalyzer.__remove_speech_abbreviation(speech_text_no_lang)
+        parsed_content = DatetimeConverter.standardize_datetime(speech_text_no_abbr)
+
+        return SemanticAnalyzer.__determine_service(parsed_content)
+
 
     def parse_content( self ) -> None :
         """
@@ -207,19 +249,8 @@ class SemanticAnalyzer :
             self.media = media
 
         # determine service type
-        if self.is_search_news() :
-            self.service = Services.SEARCH_NEWS
-
-        elif self.is_activity() :
-            if self.is_search_activity() :
-                self.service = Services.SEARCH_ACTIVITY
-            elif self.is_create_activity() :
-                self.service = Services.CREATE_ACTIVITY
-            else :
-                self.service = Services.UNKNOWN
-
-        else :
-            self.service = Services.UNKNOWN
+        self.service = SemanticAnalyzer.__service_of(self.__intents)
+        if self.service == Services.UNKNOWN :
             BotLogger.info("Unknown Service")
 
         BotLogger.debug("Parsing Speech Text Done.")
@@ -231,10 +262,7 @@ class SemanticAnalyzer :
 
         :return: is a news searching request
         """
-        for kw in SemanticAnalyzer.NEWS_SEARCH_KEYWORDS :
-            if kw in self.parsed_content :
-                return True
-        return False
+        return "NEWS_SEARCH" in self.__intents
 
 
     def is_activity( self ) -> bool :
@@ -243,10 +271,7 @@ class SemanticAnalyzer :
 
         :return: is a activity request
         """
-        for kw in SemanticAnalyzer.ACTIVITY_GENERAL_KEYWORDS :
-            if kw in self.parsed_content :
-                return True
-        return False
+        return "ACTIVITY_GENERAL" in self.__intents
 
 
     def is_search_activity( self ) -> bool :
@@ -255,10 +280,7 @@ class SemanticAnalyzer :
 
         :return: is a activity searching request
         """
-        for keyword in SemanticAnalyzer.ACTIVITY_SEARCH_KEYWORDS :
-            if keyword in self.parsed_content :
-                return True
-        return False
+        return "ACTIVITY_SEARCH" in self.__intents
 
 
     def is_create_activity( self ) -> bool :
@@ -267,7 +289,4 @@ class SemanticAnalyzer :
 
         :return: is a activity searching request
         """
-        for keyword in SemanticAnalyzer.ACTIVITY_CREATE_KEYWORDS :
-            if keyword in self.parsed_content :
-                return True
-        return False
\ No newline at end of file
+        return "ACTIVITY_CREATE" in self.__intents
\ No newline at end of file
@@ -7,7 +7,6 @@ if TYPE_CHECKING :
 from enum import Enum
 
 # project libs
-from botlib.api.hanlpapi import HanlpApi
 from botlib.botlogger import BotLogger
 from botlib.services import news, activity
 from botlib.botresponse import BotResponse
@@ -74,9 +73,9 @@ def match_service( analyzer: 'SemanticAnalyzer' ) -> BotResponse or None :
             not_found_msg = f"找不到活動"
             return BotResponse.make_inform_response(analyzer.speech_text_no_lang, not_found_msg, analyzer.response_language)
         else :
-            # 使用 hanlp 從「找到的活動」中找出 main location（longest location）
-            location = HanlpApi.extract_location(result)
-            return BotResponse.make_activity_response(analyzer.speech_text_no_lang, result, location, analyzer.response_language)
+            # 活動的 main location 以及地址、座標在新增活動時就已經找好了（沒有地點則為空字串）
+            return BotResponse.make_activity_response(analyzer.speech_text_no_lang, result.content, result.location or None,
+                                                      analyzer.response_language, result.address, result.coordinate)
     #
     #
     # 辨識結果為：新增活動
@@ -84,19 +83,19 @@ def match_service( analyzer: 'SemanticAnalyzer' ) -> BotResponse or None :
     # * 地點明確：回傳 INFORM RESPONSE 告知新增活動成功並附上辨識結果
     #
     elif analyzer.service == Services.CREATE_ACTIVITY :
-        # 如果地點不明確則無法新增活動
-        ambiguous_location = (analyzer.locations == [])
-
         # include some location in campus
-        for campus_location in ["榕園", "系館", "總圖", "宿舍", "活動中心"] :
-            if campus_location in analyzer.speech_text_no_lang :
-                ambiguous_location = False
+        campus_locations = [location for location in ["榕園", "系館", "總圖", "宿舍", "活動中心"] if location in analyzer.speech_text_no_lang]
+
+        # 如果地點不明確則無法新增活動
+        ambiguous_location = (analyzer.locations == [] and campus_locations == [])
 
         if ambiguous_location :
             error_msg = f"地點不明，請補上活動舉辦的地點後再說一次"
             return BotResponse.make_inform_response(analyzer.speech_text_no_lang, error_msg, analyzer.response_language)
         else :
-            result = activity.create_activity(analyzer.parsed_content, analyzer.time_range)
+            # 以語意辨識找到的最長 location 作為活動的 main location，不用再對活動內容做一次 NER
+            location = (analyzer.locations + campus_locations)[0]
+            result = activity.create_activity(analyzer.parsed_content, analyzer.time_range, location)
             return BotResponse.make_inform_response(analyzer.speech_text_no_lang, result, analyzer.response_language)
     #
     #
@@ -1,42 +1,61 @@
 import datetime
-import sqlite3
+import shutil
+import threading
 
 from pathlib import Path
 
 # project lib
+from botlib import BotConfig
+from botlib.api.geoapi import GeoApi
+from botlib.api.hanlpapi import HanlpApi
 from botlib.botlogger import BotLogger
+from botlib.services.activity.activity_store import Activity, ActivityStore
 
+# activities shipped with the project, copied into a new activity store (the tracked file itself is never opened)
+SEED_DB_PATH = Path(__file__).parent.joinpath("test.db")
 
+# activity store, opened by the first get_store()
+_STORE = None
+_STORE_LOCK = threading.Lock()
 
-def create_activity( content: str, time_range: (datetime, datetime) ) -> str :
+
+
+def get_store() -> ActivityStore :
+    """
+    第一次呼叫時才開啟 activity store（BotConfig.ACTIVITY_DB_PATH），import 時不會碰到資料庫
+    資料庫檔案還不存在時會先複製 SEED_DB_PATH 的活動，舊版的資料表會在開啟時轉換成新版
+
+    :return: ActivityStore
     """
 
+    global _STORE
+    with _STORE_LOCK :
+        if _STORE is None :
+            path = BotConfig.ACTIVITY_DB_PATH
+            if path != ":memory:" and not Path(path).exists() and SEED_DB_PATH.exists() :
+                shutil.copyfile(str(SEED_DB_PATH), path)
+                BotLogger.info(f"Activity Store {path} Created From {SEED_DB_PATH}")
+
+            _STORE = ActivityStore(path,
+                                   mmap_size = BotConfig.ACTIVITY_DB_MMAP_MB * 1024 * 1024,
+                                   cache_size = BotConfig.ACTIVITY_DB_CACHE_MB * 1024 * 1024,
+                                   checkpoint_interval = BotConfig.ACTIVITY_DB_CHECKPOINT_INTERVAL)
+        return _STORE
+
+
+def create_activity( content: str, time_range: (datetime, datetime), location: str or None = None ) -> str :
+    """
+    新增活動時就找好地點的完整地址與座標一起存入，查詢活動時不用再做 NLP 以及 geocoding
+
     :param content:
     :param time_range:
+    :param location: 活動的主要地點，None 則以 HanLP 從 content 找出
     :return:
     """
 
     response = "新增活動成功"
     try :
-        this_dir = Path(__file__).parent
-        db = sqlite3.connect(Path.joinpath(this_dir, "test.db").__str__())
-        cursor = db.cursor()
-
-        start_datetime = time_range[0].strftime("%Y/%m/%d %H:%M")
-        end_datetime = time_range[1].strftime("%Y/%m/%d %H:%M")
-        start_datetime_value = time_range[0].strftime("%Y%m%d%H%M")
-        end_datetime_value = time_range[1].strftime("%Y%m%d%H%M")
-
-        cmd = f"""
-            INSERT OR IGNORE INTO activities 
-            VALUES ("{content}",
-                    "{start_datetime_value}","{end_datetime_value}",
-                    "{start_datetime}","{end_datetime}")"""
-
-        # commit change
-        cursor.execute(cmd)
-        db.commit()
-        db.close()
+        get_store().add(content, time_range, *resolve_location(content, location))
 
     except Exception as e :
         response = "新增活動失敗，請再次一次"
@@ -51,44 +70,63 @@ def create_activity( content: str, time_range: (datetime, datetime) ) -> str :
     return response
 
 
-def search_activity( time_range: (datetime, datetime), keywords: list ) -> str or None :
+def search_activity( time_range: (datetime, datetime), keywords: list ) -> Activity or None :
     """
 
     :param keywords:
     :param time_range:
-    :return:
+    :return: 與時間範圍重疊且包含所有關鍵字的活動中，最相關的活動（包含地點、地址與座標），沒有則回傳 None
     """
 
     response = None
     try :
-        # open db
-        this_dir = Path(__file__).parent
-        db = sqlite3.connect(Path.joinpath(this_dir, "test.db").__str__())
-        cursor = db.cursor()
+        activities = get_store().search(time_range, keywords, limit = 1)
+        if activities :
+            response = activities[0]
 
-        # select all data that that match keywords from db
-        start_datetime_value = time_range[0].strftime("%Y%m%d%H%M")
-        end_datetime_value = time_range[1].strftime("%Y%m%d%H%M")
+        # 還沒找過地點的活動（舊版資料庫或匯入時沒找地點）只在第一次被查到時找一次並存回去
+        if response is not None and response.location is None :
+            response.location, response.address, response.coordinate = resolve_location(response.content)
+            if response.location is not None :
+                get_store().set_location(response.id, response.location, response.address, response.coordinate)
 
-        search_cmd = f"""
-            SELECT content from activities WHERE 
-                {start_datetime_value} <= end_datetime_value 
-            AND 
-                {end_datetime_value} >= start_datetime_value 
-        """
+    except Exception as e :
+        BotLogger.exception(f"Search Activity Error, {type(e).__name__} => {e}")
 
-        # should also match keywords
-        for kw in keywords :
-            search_cmd += f""" AND content LIKE "%{kw}%" """
+    return response
 
-        cursor.execute(search_cmd)
 
-        result = cursor.fetchall()
-        if result != [] and result is not None :
-            # only fetch first column of first fetch
-            response = result[0][0]
+def resolve_location( content: str, location: str or None = None ) -> (str or None, str or None, tuple or None) :
+    """
+    找出活動的主要地點以及該地點的完整地址與座標
 
-    except Exception as e :
-        BotLogger.exception(f"Search Activity Error, {type(e).__name__} => {e}")
+    :param content: 活動內容
+    :param location: 活動的主要地點，None 則以 HanLP 從 content 找出（與 HanlpApi.extract_location 相同）
+    :return: (地點, 完整地址, (緯度, 經度))，沒有地點時地點為空字串，HanLP 失敗時地點為 None（之後再找）
+    """
+
+    if location is None :
+        try :
+            location = HanlpApi.extract_location(content) or ""
+        except Exception as e :
+            BotLogger.exception(f"Extract Location Of {content} Failed, {type(e).__name__} => {e}")
+            return None, None, None
+
+    if location == "" :
+        return "", None, None
+
+    return (location, *geocode(location))
+
+
+def geocode( location: str ) -> (str or None, tuple or None) :
+    """
+    :param location: 地點
+    :return: (完整地址, (緯度, 經度))，找不到或查詢失敗則都為 None
+    """
+
+    result = GeoApi.geocode(location)
+    if result is None :
+        BotLogger.info(f"Cannot Find Address or Coordinate Of Location : {location}")
+        return None, None
 
-    return response
\ No newline at end of file
+    return result
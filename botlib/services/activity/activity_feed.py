@@ -0,0 +1,242 @@
+import csv
+import datetime
+import json
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+# project libs
+from botlib import BotConfig
+from botlib.api.hanlpapi import HanlpApi
+from botlib.botlogger import BotLogger
+from botlib.converter.datetime_converter import DatetimeConverter
+from botlib.converter.datetime_lexer import DatetimeLexer
+from botlib.services.activity import geocode
+from botlib.services.activity.activity_store import Activity, ActivityStore
+
+
+
+class ActivityFeed :
+    """
+    Bulk Import And Export Of Activities
+
+    讀取校園活動的 CSV 或 JSON lines（依照副檔名判斷），每一筆資料的欄位：
+        content  : 活動內容（必要）
+        start    : 開始時間，ISO 格式、"%Y/%m/%d %H:%M" 或任何 DatetimeConverter 看得懂的文字
+        end      : 結束時間，同上，沒有則為開始當天的 23:59
+        time     : 沒有 start 時，以 DatetimeConverter 從這段文字（沒有則從 content）找出時間範圍，找不到時間的資料會被略過
+        location : 活動的主要地點，沒有則以 HanLP 從 content 找出（與 HanlpApi.extract_location 相同），NO_LOCATION 表示已經找過但沒有地點
+        address, latitude, longitude : 地點的完整地址與座標，沒有則以 GeoApi 查詢
+    一次讀取 batch_size 筆，同一批的地點以一個 request 交給 HanLP，再以一個 transaction 寫入 ActivityStore
+    匯出時寫出相同的欄位（ISO 格式的時間），所以匯出的檔案可以再匯入
+    """
+
+    FIELDS = ["content", "start", "end", "location", "address", "latitude", "longitude"]
+
+    # 找過但沒有地點的活動（location 為空字串），CSV 的空欄位無法和還沒找過（None）區分
+    NO_LOCATION = "-"
+
+    # ISO 格式（export_file 寫出的格式，datetime.fromisoformat 需要 Python 3.7）以及 "/" 分隔的日期
+    __TIME_FORMATS = ["%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S",
+                      "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y/%m/%d %H:%M", "%Y/%m/%d"]
+
+
+    @staticmethod
+    def records( path: str ) -> iter :
+        """
+        :param path: .csv 或 .jsonl 檔案
+        :return: iterator of dict，一次讀取一行
+        """
+
+        with open(path, encoding = "utf-8-sig", newline = "") as file :
+            if Path(path).suffix.lower() == ".csv" :
+                yield from csv.DictReader(file)
+            else :
+                for line in file :
+                    if line.strip() :
+                        yield json.loads(line)
+
+
+    @staticmethod
+    def to_activity( record: dict ) -> Activity or None :
+        """
+        :param record: 一筆活動資料
+        :return: Activity（location、address、coordinate 可能為 None），沒有內容、沒有時間、時間範圍不合理或座標不是數字則回傳 None
+        """
+
+        content = (record.get("content") or "").strip()
+        if content == "" :
+            return None
+
+        if record.get("start") :
+            start = ActivityFeed.parse_time(record["start"])
+            end = ActivityFeed.parse_time(record["end"]) if record.get("end") else None
+            if end is None and start is not None :
+                end = start.replace(hour = 23, minute = 59)
+        else :
+            start, end = ActivityFeed.parse_range(record.get("time") or content)
+
+        if start is None or end is None or end < start :
+            return None
+
+        coordinate = None
+        if record.get("latitude") not in (None, "") and record.get("longitude") not in (None, "") :
+            try :
+                coordinate = (float(record["latitude"]), float(record["longitude"]))
+            except (TypeError, ValueError) :
+                return None
+            if not (-90 <= coordinate[0] <= 90 and -180 <= coordinate[1] <= 180) :
+                return None
+
+        location = record.get("location") or None
+        if location == ActivityFeed.NO_LOCATION :
+            location = ""
+
+        return Activity(None, content, start, end, location, record.get("address") or None, coordinate)
+
+
+    @staticmethod
+    def parse_time( text: str ) -> datetime or None :
+        """
+        :param text: ISO 格式、"%Y/%m/%d %H:%M"、"%Y/%m/%d" 或其他描述時間的文字
+        :return: datetime，看不懂則回傳 None
+        """
+
+        text = str(text).strip()
+        for time_format in ActivityFeed.__TIME_FORMATS :
+            try :
+                return datetime.datetime.strptime(text, time_format)
+            except ValueError :
+                pass
+
+        return ActivityFeed.parse_range(text)[0]
+
+
+    @staticmethod
+    def parse_range( text: str ) -> (datetime or None, datetime or None) :
+        """
+        與 DatetimeConverter.extract_datetime 相同，但是文字中沒有時間時回傳 (None, None) 而不是當天
+
+        :param text: 描述時間的文字
+        :return: (起始時間, 結束時間)
+        """
+
+        if DatetimeLexer.tokenize(text) == [] :
+            return None, None
+        return DatetimeConverter.extract_datetime(text)
+
+
+    @staticmethod
+    def locate( activities: list ) -> None :
+        """
+        以 HanLP 找出沒有 location 的活動的主要地點，每 HANLP_MAX_BATCH 個活動一個 request，同時最多送出 HANLP_POOL_SIZE 個
+        再以 GeoApi 查詢沒有地址或座標的地點（查過的地點由 GeoApi.CACHE 直接回傳）
+
+        :param activities: list of Activity，找到的地點（沒有地點則為空字串）、地址與座標直接寫入
+        """
+
+        missing = [activity for activity in activities if activity.location is None]
+        chunks = [missing[i :i + HanlpApi.MAX_BATCH] for i in range(0, len(missing), HanlpApi.MAX_BATCH)]
+
+        def extract( chunk: list ) -> list or None :
+            return HanlpApi.extract_locations([activity.content for activity in chunk])
+
+        with ThreadPoolExecutor(max_workers = BotConfig.HANLP_POOL_SIZE) as executor :
+            for chunk, locations in zip(chunks, executor.map(extract, chunks)) :
+                if locations is None :
+                    BotLogger.info(f"Locating {len(chunk)} Activities Failed, Imported Without Location")
+                    continue
+                for activity, location in zip(chunk, locations) :
+                    activity.location = location or ""
+
+        for activity in activities :
+            if activity.location and (activity.address is None or activity.coordinate is None) :
+                activity.address, activity.coordinate = geocode(activity.location)
+
+
+    @staticmethod
+    def import_file( store: ActivityStore, path: str, batch_size = 1000, locate = True ) -> (int, int, int) :
+        """
+        :param store: 要匯入的 ActivityStore
+        :param path: .csv 或 .jsonl 檔案
+        :param batch_size: 每個 transaction 寫入的活動數
+        :param locate: 是否以 HanLP 找出沒有 location 的活動的地點並查詢地址與座標，否則在第一次被查到時才找
+        :return: (讀取的資料數, 無法解析而略過的資料數, 實際新增的活動數)
+        """
+
+        read = skipped = added = 0
+        records = ActivityFeed.records(path)
+
+        while True :
+            batch = list(islice(records, batch_size))
+            if batch == [] :
+                break
+
+            activities = []
+            for record in batch :
+                activity = ActivityFeed.to_activity(record)
+                if activity is None :
+                    skipped += 1
+                else :
+                    activities.append(activity)
+
+            if locate :
+                ActivityFeed.locate(activities)
+
+            read += len(batch)
+            added += store.add_many(activities)
+            BotLogger.info(f"Importing {path} : {read} Read, {skipped} Skipped, {added} Added")
+
+        return read, skipped, added
+
+
+    @staticmethod
+    def export_file( store: ActivityStore, path: str ) -> int :
+        """
+        :param store: 要匯出的 ActivityStore
+        :param path: .csv 或 .jsonl 檔案
+        :return: 匯出的活動數
+        """
+
+        exported = 0
+        with open(path, "w", encoding = "utf-8", newline = "") as file :
+            is_csv = Path(path).suffix.lower() == ".csv"
+            writer = csv.DictWriter(file, ActivityFeed.FIELDS) if is_csv else None
+            if is_csv :
+                writer.writeheader()
+
+            for activity in store.scan() :
+                record = {
+                    "content" : activity.content,
+                    "start" : activity.start.isoformat(),
+                    "end" : activity.end.isoformat(),
+                    "location" : ActivityFeed.NO_LOCATION if activity.location == "" else activity.location,
+                    "address" : activity.address,
+                    "latitude" : activity.coordinate[0] if activity.coordinate else None,
+                    "longitude" : activity.coordinate[1] if activity.coordinate else None
+                }
+                if is_csv :
+                    writer.writerow(record)
+                else :
+                    file.write(json.dumps(record, ensure_ascii = False) + "\n")
+                exported += 1
+
+        return exported
+
+
+if __name__ == '__main__' :
+    from botlib.services import activity
+
+    arg_parser = ArgumentParser(description = "import or export activities of the activity store")
+    arg_parser.add_argument("action", choices = ["import", "export"])
+    arg_parser.add_argument("path", help = ".csv or .jsonl file")
+    arg_parser.add_argument("--batch", type = int, default = 1000, help = "activities per transaction")
+    arg_parser.add_argument("--no-locate", action = "store_true", help = "don't find locations with hanlp or geocode them")
+    args = arg_parser.parse_args()
+
+    if args.action == "import" :
+        read_count, skipped_count, added_count = ActivityFeed.import_file(activity.get_store(), args.path, args.batch, not args.no_locate)
+        print(f"read {read_count}, skipped {skipped_count}, added {added_count}")
+    else :
+        print(f"exported {ActivityFeed.export_file(activity.get_store(), args.path)}")
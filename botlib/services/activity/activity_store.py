@@ -0,0 +1,462 @@
+import datetime
+import sqlite3
+import sys
+import threading
+import time
+
+# project libs
+from botlib.bigram_fts import BigramFts
+from botlib.botlogger import BotLogger
+
+
+
+class Activity :
+    """
+    An Activity Stored In ActivityStore
+    """
+
+    __slots__ = ("id", "content", "start", "end", "location", "address", "coordinate")
+
+
+    def __init__( self, id: int or None, content: str, start: datetime, end: datetime, location: str or None = None,
+                  address: str or None = None, coordinate: (float, float) or None = None ) :
+        """
+        :param id: ActivityStore 中的 id，還沒存入時為 None
+        :param content: 活動內容
+        :param start: 開始時間（datetime）
+        :param end: 結束時間（datetime）
+        :param location: 活動的主要地點（內容中最長的 location token），空字串表示沒有地點，None 表示還沒找過
+        :param address: 地點的完整地址，找不到則為 None
+        :param coordinate: 地點的 (緯度, 經度)，找不到則為 None
+        """
+
+        self.id = id
+        self.content = content
+        self.start = start
+        self.end = end
+        self.location = location
+        self.address = address
+        self.coordinate = coordinate
+
+
+    def __repr__( self ) :
+        return f"Activity({self.id}, {self.content!r}, {self.start}, {self.end}, {self.location!r}, {self.address!r}, {self.coordinate})"
+
+
+
+class NoLock :
+    """
+    A Context Manager That Does Nothing (contextlib.nullcontext needs Python 3.7)
+    """
+
+    def __enter__( self ) :
+        return self
+
+
+    def __exit__( self, *exc_info ) :
+        return False
+
+
+
+class ActivityStore :
+    """
+    Indexed Store Of Activities
+
+    活動內容建立 FTS5 全文索引（中文以二字詞切開，見 BigramFts），並依照 bm25 排序
+    開始與結束時間存成 unix time，另外放進一維的 R*Tree（以分鐘為單位）作為區間索引，所以查詢與時間範圍重疊的活動時不用掃過整個 table
+
+    每個 thread 使用自己的 connection，資料庫為 WAL 模式，所以查詢不會被寫入擋住，WAL 則由背景 thread 定期 checkpoint 回資料庫
+    寫入則在 process 內排隊，同時送來的 add 會由拿到 write lock 的 thread 合併成一個 transaction commit（group commit）
+    schema 的版本記在 user_version，開啟時依序執行還沒執行過的 migration
+    """
+
+    # __MIGRATIONS[i] 將 user_version i 升級到 i + 1
+    __MIGRATIONS = [
+        [
+            """
+            CREATE TABLE IF NOT EXISTS activities (
+                id INTEGER PRIMARY KEY,
+                content TEXT NOT NULL UNIQUE,
+                start_time INTEGER NOT NULL,
+                end_time INTEGER NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS activities_start ON activities (start_time)",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS activities_span USING rtree_i32(id, start_minute, end_minute)",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS activities_fts USING fts5(content, tokenize = 'unicode61')",
+        ],
+        [
+            "ALTER TABLE activities ADD COLUMN location TEXT",
+        ],
+        [
+            "ALTER TABLE activities ADD COLUMN address TEXT",
+            "ALTER TABLE activities ADD COLUMN latitude REAL",
+            "ALTER TABLE activities ADD COLUMN longitude REAL",
+        ],
+        [
+            # BigramFts VERSION 2 把英數字與跨文字種類的地方也切成二字詞，重建 FTS index
+            "DELETE FROM activities_fts",
+            "INSERT INTO activities_fts (rowid, content) SELECT id, bigrams(content) FROM activities",
+        ],
+    ]
+
+    # 時間範圍內的活動不超過這個數量時，直接在這些活動中比對關鍵字，否則由 FTS index 找出符合關鍵字的活動
+    RANGE_SCAN_LIMIT = 10000
+
+    __COUNT_RANGE = """
+        SELECT COUNT(*) FROM (SELECT 1 FROM activities_span WHERE start_minute <= ? AND end_minute >= ? LIMIT ?)"""
+
+    # 關鍵字常見但時間範圍小：在範圍內的活動中比對關鍵字
+    # 每個結果都恰好包含所有關鍵字，此時 bm25 主要由內容長度決定，所以短的在前
+    __SEARCH_RANGE_KEYWORDS = """
+        SELECT a.id, a.content, a.start_time, a.end_time, a.location, a.address, a.latitude, a.longitude
+        FROM activities_span s JOIN activities a ON a.id = s.id
+        WHERE s.start_minute <= ? AND s.end_minute >= ? AND a.start_time <= ? AND a.end_time >= ? {}
+        ORDER BY length(a.content), a.start_time LIMIT ?"""
+
+    # 時間範圍大：由 FTS index 找出符合關鍵字的活動，再檢查時間範圍與每個關鍵字（見 BigramFts），依照 bm25 排序
+    __SEARCH_KEYWORDS = """
+        SELECT a.id, a.content, a.start_time, a.end_time, a.location, a.address, a.latitude, a.longitude
+        FROM activities_fts JOIN activities a ON a.id = activities_fts.rowid
+        WHERE activities_fts MATCH ? AND a.start_time <= ? AND a.end_time >= ? {}
+        ORDER BY activities_fts.rank, a.start_time LIMIT ?"""
+
+    # 沒有關鍵字：起始時間仍在進行中的活動（區間索引），加上在範圍內開始的前幾個活動（開始時間索引），早開始的在前
+    __SEARCH_RANGE = """
+        SELECT id, content, start_time, end_time, location, address, latitude, longitude FROM (
+            SELECT a.id, a.content, a.start_time, a.end_time, a.location, a.address, a.latitude, a.longitude
+            FROM activities_span s JOIN activities a ON a.id = s.id
+            WHERE s.start_minute <= ? AND s.end_minute >= ? AND a.start_time < ? AND a.end_time >= ?
+            UNION ALL
+            SELECT * FROM (SELECT id, content, start_time, end_time, location, address, latitude, longitude FROM activities
+                           WHERE start_time BETWEEN ? AND ? ORDER BY start_time LIMIT ?)
+        ) ORDER BY start_time LIMIT ?"""
+
+
+    def __init__( self, path: str, mmap_size = 0, cache_size = 0, checkpoint_interval = 0.0 ) :
+        """
+        :param path: sqlite 檔案路徑，":memory:" 則只存在記憶體
+        :param mmap_size: 每個 connection 以 mmap 讀取資料庫的 bytes 數，0 表示不使用 mmap
+        :param cache_size: 每個 connection 的 page cache bytes 數，0 表示使用 sqlite 預設值
+        :param checkpoint_interval: 背景 checkpoint 的間隔秒數，0 則由 sqlite 在 commit 時自動 checkpoint
+        """
+
+        self.path = path
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.checkpoint_interval = checkpoint_interval if path != ":memory:" else 0.0
+
+        self.__local = threading.local()
+        self.__write_lock = threading.Lock()
+
+        # ":memory:" 的資料庫只存在於一個 connection 中，所有 thread 共用它並且讀寫都要排隊
+        self.__shared = self.__connect(check_same_thread = False) if path == ":memory:" else None
+        self.__read_lock = self.__write_lock if self.__shared is not None else NoLock()
+
+        # add() 排隊中的活動
+        self.__pending_lock = threading.Lock()
+        self.__pending = []
+
+        with self.__write_lock :
+            self.__migrate(self.__connection())
+
+        # 自動 checkpoint 會在某一次 commit 時把整個 WAL 搬回資料庫，讓那次 add 等上數十 ms
+        if self.checkpoint_interval > 0 :
+            threading.Thread(target = self.__checkpoint_loop, name = "ActivityStoreCheckpoint", daemon = True).start()
+
+
+    def add( self, content: str, time_range: (datetime, datetime), location: str or None = None, address: str or None = None,
+             coordinate: (float, float) or None = None ) -> bool :
+        """
+        新增一個活動，內容相同的活動已經存在時會被忽略
+        先放進佇列再等 write lock，拿到 lock 的 thread 會把佇列中所有活動（包含其他 thread 的）在同一個 transaction 中寫入
+
+        :param content: 活動內容
+        :param time_range: (開始時間, 結束時間)
+        :param location: 活動的主要地點（見 Activity）
+        :param address: 地點的完整地址
+        :param coordinate: 地點的 (緯度, 經度)
+        :return: 是否有新增
+        """
+
+        activity = Activity(None, content, time_range[0], time_range[1], location, address, coordinate)
+        request = { "activity" : activity, "added" : False, "error" : None }
+        with self.__pending_lock :
+            self.__pending.append(request)
+
+        with self.__write_lock :
+            with self.__pending_lock :
+                batch, self.__pending = self.__pending, []
+
+            # 佇列是空的表示這個活動已經被前一個拿到 lock 的 thread 寫入了
+            if batch :
+                try :
+                    for pending, added in zip(batch, self.__write([pending["activity"] for pending in batch])) :
+                        pending["added"] = added
+                # 任何錯誤都要交給同一批的所有 thread，否則其他 thread 會以為寫入成功
+                except Exception as e :
+                    for pending in batch :
+                        pending["error"] = e
+
+        if request["error"] is not None :
+            raise request["error"]
+        return request["added"]
+
+
+    def add_many( self, activities: list ) -> int :
+        """
+        在同一個 transaction 中新增多個活動，內容相同的活動已經存在時會被忽略
+
+        :param activities: list of Activity（id 會被忽略）
+        :return: 實際新增的活動數
+        """
+
+        with self.__write_lock :
+            return sum(self.__write(activities))
+
+
+    def search( self, time_range: (datetime, datetime), keywords: list, limit = 1 ) -> list :
+        """
+        找出與時間範圍重疊，且內容包含所有關鍵字的活動
+        有關鍵字時依照關聯程度（bm25）排序，沒有時早開始的在前（見 RANGE_SCAN_LIMIT）
+
+        :param time_range: (起始時間, 結束時間)
+        :param keywords: 關鍵字 list，空的話只依照時間範圍查詢
+        :param limit: 最多回傳幾個活動
+        :return: list of Activity
+        """
+
+        start, end = int(time_range[0].timestamp()), int(time_range[1].timestamp())
+        keywords = [keyword.strip().lower() for keyword in keywords if keyword.strip()]
+
+        try :
+            with self.__read_lock :
+                db = self.__connection()
+                rows = db.execute(*self.__plan(db, start, end, keywords, limit)).fetchall()
+        except sqlite3.Error as e :
+            BotLogger.exception(f"Searching Activities Failed, {type(e).__name__} : {e}")
+            return []
+
+        return [ActivityStore.__to_activity(row) for row in rows]
+
+
+    def set_location( self, id: int, location: str, address: str or None, coordinate: (float, float) or None ) -> None :
+        """
+        更新活動的地點、完整地址與座標
+
+        :param id: 活動的 id
+        """
+
+        latitude, longitude = coordinate or (None, None)
+        with self.__write_lock :
+            db = self.__connection()
+            with db :
+                db.execute("UPDATE activities SET location = ?, address = ?, latitude = ?, longitude = ? WHERE id = ?",
+                           (location, address, latitude, longitude, id))
+
+
+    def scan( self, batch_size = 1000 ) -> iter :
+        """
+        依照新增的順序讀出所有活動，每次只從資料庫讀取 batch_size 個，不會一次載入整個 table
+
+        :param batch_size: 每次讀取的活動數
+        :return: iterator of Activity
+        """
+
+        last_id = 0
+        while True :
+            with self.__read_lock :
+                rows = self.__connection().execute(
+                    "SELECT id, content, start_time, end_time, location, address, latitude, longitude FROM activities "
+                    "WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)).fetchall()
+
+            for row in rows :
+                yield ActivityStore.__to_activity(row)
+
+            if len(rows) < batch_size :
+                return
+            last_id = rows[-1][0]
+
+
+    def count( self ) -> int :
+
+        with self.__read_lock :
+            return self.__connection().execute("SELECT COUNT(*) FROM activities").fetchone()[0]
+
+
+    # ------------------------------------------------------------------------------------------------------------
+
+    def __connect( self, check_same_thread = True ) -> sqlite3.Connection :
+
+        db = sqlite3.connect(self.path, timeout = 30.0, check_same_thread = check_same_thread)
+        # 寫入時在 sql 中把內容切成 FTS 的二字詞
+        # deterministic（可用於 index 與 generated column）需要 Python 3.8
+        if sys.version_info >= (3, 8) :
+            db.create_function("bigrams", 1, BigramFts.to_document, deterministic = True)
+        else :
+            db.create_function("bigrams", 1, BigramFts.to_document)
+
+        # WAL : 讀取不會被寫入擋住，而且 commit 時只需要 append 到 log，synchronous = NORMAL 在 WAL 下斷電也不會損毀
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        db.execute("PRAGMA temp_store = MEMORY")
+        db.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        if self.checkpoint_interval > 0 :
+            db.execute("PRAGMA wal_autocheckpoint = 0")
+        # WAL 從頭覆寫時截斷到這個大小
+        db.execute("PRAGMA journal_size_limit = 67108864")
+        if self.cache_size > 0 :
+            # 負數表示以 KiB 為單位
+            db.execute(f"PRAGMA cache_size = {-int(self.cache_size // 1024)}")
+        return db
+
+
+    def __connection( self ) -> sqlite3.Connection :
+
+        if self.__shared is not None :
+            return self.__shared
+
+        db = getattr(self.__local, "db", None)
+        if db is None :
+            db = self.__local.db = self.__connect()
+        return db
+
+
+    def __checkpoint_loop( self ) -> None :
+
+        db = self.__connection()
+        # RESTART 等待查詢結束時會擋住寫入，等不到就留給下一次
+        db.execute("PRAGMA busy_timeout = 100")
+        while True :
+            time.sleep(self.checkpoint_interval)
+            try :
+                # PASSIVE 不會擋住同時進行的讀寫，先搬回大部分的 page
+                db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                # 一直有查詢在讀取時 WAL 不會從頭開始寫而會無限變大，RESTART 等目前的查詢結束，讓下一個寫入從頭覆寫 WAL
+                db.execute("PRAGMA wal_checkpoint(RESTART)")
+            except sqlite3.Error as e :
+                BotLogger.exception(f"Checkpointing {self.path} Failed, {type(e).__name__} : {e}")
+
+
+    def __migrate( self, db: sqlite3.Connection ) -> None :
+
+        with db :
+            # 其他 process 可能同時在開啟同一個資料庫，拿到 write lock 後再讀取版本
+            db.execute("BEGIN IMMEDIATE")
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            if version >= len(ActivityStore.__MIGRATIONS) :
+                return
+
+            legacy = version == 0 and self.__is_legacy(db)
+            if legacy :
+                db.execute("ALTER TABLE activities RENAME TO activities_legacy")
+
+            for statements in ActivityStore.__MIGRATIONS[version :] :
+                for statement in statements :
+                    db.execute(statement)
+
+            if legacy :
+                self.__import_legacy(db)
+
+            db.execute(f"PRAGMA user_version = {len(ActivityStore.__MIGRATIONS)}")
+
+        BotLogger.info(f"Migrated {self.path} From Version {version} To {len(ActivityStore.__MIGRATIONS)}")
+
+
+    def __write( self, activities: list ) -> list :
+        """
+        呼叫前必須拿到 write lock
+
+        :param activities: list of Activity
+        :return: 每個活動是否有新增
+        """
+
+        db = self.__connection()
+        with db :
+            db.execute("BEGIN IMMEDIATE")
+            return ActivityStore.__insert(db, activities)
+
+
+    def __plan( self, db: sqlite3.Connection, start: int, end: int, keywords: list, limit: int ) -> (str, list) :
+        """
+        :return: (sql, params)
+        """
+
+        if not keywords :
+            return ActivityStore.__SEARCH_RANGE, [start // 60, start // 60, start, start, start, end, limit, limit]
+
+        in_range = db.execute(ActivityStore.__COUNT_RANGE, (end // 60, start // 60, ActivityStore.RANGE_SCAN_LIMIT + 1)).fetchone()[0]
+        # 兩個 plan 都以 instr 確認每個關鍵字，所以找到的活動相同（只有排序不同）
+        # FTS index 只用來縮小範圍，單一個字或含有空白、標點的關鍵字 index 無法回答（見 BigramFts.is_indexed）
+        query = BigramFts.match_query(keywords)
+        contains = "".join(" AND instr(lower(a.content), ?) > 0" for _ in keywords)
+
+        if in_range <= ActivityStore.RANGE_SCAN_LIMIT or query is None :
+            return ActivityStore.__SEARCH_RANGE_KEYWORDS.format(contains), [end // 60, start // 60, end, start, *keywords, limit]
+
+        return ActivityStore.__SEARCH_KEYWORDS.format(contains), [query, end, start, *keywords, limit]
+
+
+    @staticmethod
+    def __insert( db: sqlite3.Connection, activities: list ) -> list :
+        """
+        以 executemany 寫入 activities，新增的 id 都大於寫入前最大的 id，再以這些 id 一次建立區間索引與 FTS index
+
+        :param db: 已經開始 transaction 的 connection
+        :param activities: list of Activity
+        :return: 每個活動是否有新增
+        """
+
+        last_id = db.execute("SELECT IFNULL(MAX(id), 0) FROM activities").fetchone()[0]
+        db.executemany("""INSERT OR IGNORE INTO activities (content, start_time, end_time, location, address, latitude, longitude)
+                          VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                       ((activity.content, int(activity.start.timestamp()), int(activity.end.timestamp()), activity.location,
+                         activity.address, *(activity.coordinate or (None, None))) for activity in activities))
+
+        # r-tree 的區間要包含整個活動，所以開始時間無條件捨去、結束時間無條件進位到分鐘
+        db.execute("""INSERT INTO activities_span SELECT id, start_time / 60, (end_time + 59) / 60 FROM activities WHERE id > ?""",
+                   (last_id,))
+        db.execute("INSERT INTO activities_fts (rowid, content) SELECT id, bigrams(content) FROM activities WHERE id > ?", (last_id,))
+
+        # 內容重複（已經存在或同一批中較晚出現）的活動沒有新增
+        added = { content for content, in db.execute("SELECT content FROM activities WHERE id > ?", (last_id,)) }
+        result = []
+        for activity in activities :
+            result.append(activity.content in added)
+            added.discard(activity.content)
+        return result
+
+
+    @staticmethod
+    def __to_activity( row: tuple ) -> Activity :
+
+        id, content, start_time, end_time, location, address, latitude, longitude = row
+        return Activity(id, content, datetime.datetime.fromtimestamp(start_time), datetime.datetime.fromtimestamp(end_time), location,
+                        address, None if latitude is None or longitude is None else (latitude, longitude))
+
+
+    @staticmethod
+    def __is_legacy( db: sqlite3.Connection ) -> bool :
+        """
+        舊版的 activities table 以 content 為 primary key，時間存成 "%Y%m%d%H%M" 格式的數字
+        """
+
+        columns = [row[1] for row in db.execute("PRAGMA table_info(activities)")]
+        return "start_datetime_value" in columns
+
+
+    def __import_legacy( self, db: sqlite3.Connection ) -> None :
+
+        activities = []
+        for content, start_value, end_value in db.execute(
+                "SELECT content, start_datetime_value, end_datetime_value FROM activities_legacy").fetchall() :
+            try :
+                start = datetime.datetime.strptime(str(start_value), "%Y%m%d%H%M")
+                end = datetime.datetime.strptime(str(end_value), "%Y%m%d%H%M")
+            except ValueError :
+                BotLogger.info(f"Skip Legacy Activity {content!r} With Invalid Time Range ({start_value}, {end_value})")
+                continue
+            activities.append(Activity(None, content, start, end))
+
+        imported = sum(ActivityStore.__insert(db, activities))
+        db.execute("DROP TABLE activities_legacy")
+        BotLogger.info(f"Imported {imported} Legacy Activities Into {self.path}")
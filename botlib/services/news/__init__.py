@@ -8,6 +8,9 @@ from botlib.converter.datetime_converter import DatetimeConverter
 
 # import crawler
 from botlib.services.news import udn, chinatimes, ltn, tvbs, ettoday, ncku, setn
+from botlib.services.news.fanout import NewsFanout
+from botlib.services.news.ingester import NewsIngester
+from botlib.services.news.news_index import NewsIndex
 
 
 
@@ -24,6 +27,31 @@ class AvailableMedia(Enum) :
     SETN = "三立新聞"
 
 
+# every crawler module provides :
+#   search(keywords, time_range = None) -> iterator of Article, in the order the site ranks them, fetching more pages only
+#       as it is consumed, time_range lets it skip pages that can not be in range
+#   latest() -> list of Article, newest articles for NewsIngester
+#   hot() -> [urls, texts], optional, used when there is no keyword
+CRAWLERS = {
+    AvailableMedia.NCKU : ncku,
+    AvailableMedia.LTN : ltn,
+    AvailableMedia.CHINATIME : chinatimes,
+    AvailableMedia.TVBS : tvbs,
+    AvailableMedia.ETTODAY : ettoday,
+    AvailableMedia.UDN : udn,
+    AvailableMedia.SETN : setn,
+}
+
+# articles pulled in background by INGESTER, search_news looks here before crawling the site
+INDEX = NewsIndex(BotConfig.NEWS_INDEX_PATH) if BotConfig.NEWS_INDEX_PATH else None
+INGESTER = None if INDEX is None else NewsIngester(INDEX, { media.name : crawler.latest for media, crawler in CRAWLERS.items() },
+                                                   BotConfig.NEWS_INGEST_INTERVAL)
+
+# searches every crawler at once when no media is named
+FANOUT = NewsFanout({ media.name : crawler for media, crawler in CRAWLERS.items() },
+                    BotConfig.NEWS_FANOUT_DEADLINE, BotConfig.NEWS_FANOUT_WORKERS)
+
+
 # ------------------------------------------------------------------------------------------------------------
 
 def simplify_news_content( content: str ) -> str :
@@ -31,36 +59,115 @@ def simplify_news_content( content: str ) -> str :
     return content[:30]
 
 
-def search_news( time_range: (datetime, datetime), keywords: list, media: AvailableMedia ) -> [str, str] :
+def start_ingester() -> None :
+    """
+    開始在背景定期將各媒體的最新文章拉到 INDEX（interval <= 0 或沒有 INDEX 則不會啟動）
+
+    :return: None
+    """
+
+    if INGESTER is not None and INGESTER.interval > 0 :
+        INGESTER.start()
+
+
+def search_index( time_range: (datetime, datetime), keywords: list, media: AvailableMedia or None ) -> [str, str] or None :
     """
+    從本地的 INDEX 中找出符合時間範圍與關鍵字的最新文章（media 為 None 則查詢所有媒體）
+
+    :return: [url, text]，沒找到則回傳 None
+    """
+
+    if INDEX is None or not keywords :
+        return None
+
+    hits = INDEX.search(time_range, keywords, None if media is None else media.name, limit = 1)
+    if hits == [] :
+        return None
+
+    article = hits[0]
+    return [article.url, simplify_news_content(article.snippet or article.title)]
+
+
+def search_crawler( time_range: (datetime, datetime), keywords: list, crawler ) -> [str, str] :
+    """
+    依序讀取 crawler 的搜尋結果，找到第一篇在時間範圍內的文章就停止（還沒送出的 request 會被取消）
+    沒有在時間範圍內的文章則回傳第一篇搜尋結果
+
+    :param time_range: (起始時間, 結束時間)
+    :param keywords: 關鍵字 list
+    :param crawler: CRAWLERS 中的 crawler module
+    :return: [url, text]
+    """
+
+    if not keywords and hasattr(crawler, "hot") :
+        return crawler.hot()
+
+    first = None
+    articles = crawler.search(keywords, time_range)
+    try :
+        for article in articles :
+            if time_range[0] <= article.date <= time_range[1] :
+                return [article.url, article.snippet]
+            if first is None :
+                first = article
+
+    except Exception as e :
+        BotLogger.exception(f"Searching {crawler.__name__} Failed, {type(e).__name__} : {e}")
+
+    finally :
+        articles.close()
+
+    if first is None :
+        return ["NO_URL", "找不到相符結果"]
+    return [first.url, first.snippet]
+
+
+def search_fanout( time_range: (datetime, datetime), keywords: list ) -> [str, str] :
+    """
+    同時搜尋所有媒體（見 NewsFanout），top k 模式下多篇文章的 url 與簡介以換行分隔
+
+    :param time_range: (起始時間, 結束時間)
+    :param keywords: 關鍵字 list
+    :return: [url, text]
+    """
+
+    articles = FANOUT.search(time_range, keywords, BotConfig.NEWS_FANOUT_TOP_K)
+    if articles == [] :
+        return ["NO_URL", "找不到相符結果"]
+
+    return ["\n".join(article.url for article in articles), "\n".join(article.snippet for article in articles)]
+
+
+def search_news( time_range: (datetime, datetime), keywords: list, media: AvailableMedia or None = None ) -> [str, str] :
+    """
+    先查詢本地的 INDEX，沒找到才去爬媒體的網站
+    沒有指定媒體時同時搜尋所有媒體（沒有關鍵字則搜尋成大新聞）
 
     :param time_range:
     :param keywords:
-    :param media:
+    :param media: None 表示沒有指定媒體
     :return: [url, text]
     """
 
-    if media == AvailableMedia.UDN :
-        result = udn.parse(keywords, time_range)
-    elif media == AvailableMedia.LTN :
-        result = ltn.parse(keywords, time_range)
-    elif media == AvailableMedia.CHINATIME :
-        result = chinatimes.parse(keywords, time_range)
-    elif media == AvailableMedia.ETTODAY :
-        result = ettoday.parse(keywords, time_range)
-    elif media == AvailableMedia.TVBS :
-        result = tvbs.parse(keywords, time_range)
-    elif media == AvailableMedia.NCKU :
-        result = ncku.parse(keywords, time_range)
-    elif media == AvailableMedia.SETN :
-        result = setn.parse(keywords, time_range)
+    result = search_index(time_range, keywords, media)
+    if result is not None :
+        BotLogger.debug(f"Search News : Found In Index, {result}")
+        return result
+
+    if media is None and not keywords :
+        media = AvailableMedia.NCKU
+
+    if media is None :
+        result = search_fanout(time_range, keywords)
+    elif media in CRAWLERS :
+        result = search_crawler(time_range, keywords, CRAWLERS[media])
     else :
         result = ["NO_URL", "無法判斷新聞媒體"]  # SAMPLE RESPONSE FORMAT
 
     BotLogger.debug(f""" Search News :
         Time Range  = {time_range.__str__()},
         Keywords    = {keywords.__str__()},
-        Media       = {media.value}
+        Media       = {'All' if media is None else media.value}
         Result      = {result}""")
 
     return result
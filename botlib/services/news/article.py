@@ -0,0 +1,93 @@
+import re
+
+
+
+class Article :
+    """
+    A News Article Found By Crawler
+
+    snippet 可以延後取得：如果列表頁沒有內文，crawler 可以給一個 loader(url) -> snippet，第一次讀取 snippet 時才會呼叫
+    """
+
+    __slots__ = ("url", "date", "title", "_snippet", "_loader")
+
+
+    def __init__( self, url: str, date, snippet: str or None = None, title = "", loader = None ) :
+        """
+        :param url: 文章網址
+        :param date: 發布時間（datetime）
+        :param snippet: 簡介
+        :param title: 標題
+        :param loader: 沒有 snippet 時，用來取得 snippet 的 function (url) -> str
+        """
+
+        self.url = url
+        self.date = date
+        self.title = title
+        self._snippet = snippet
+        self._loader = loader
+
+
+    @property
+    def snippet( self ) -> str :
+        self.load_snippet()
+        return self._snippet or ""
+
+
+    def load_snippet( self ) -> None :
+        """
+        有 loader 且還沒取得 snippet 時現在就取得，之後讀取 snippet 不會再送出 request
+        """
+
+        if self._snippet is None and self._loader is not None :
+            # a loader that fails is not retried
+            loader, self._loader = self._loader, None
+            self._snippet = loader(self.url)
+
+
+    def __repr__( self ) :
+        return f"Article({self.url!r}, {self.date}, {self._snippet!r})"
+
+
+    # ------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def all_before( articles: list, start ) -> bool :
+        """
+        判斷一頁由新到舊排列的搜尋結果是否全部早於 start，是的話之後的頁面也只會有更舊的文章，不用再往下找
+
+        :param articles: 一頁的 Article list
+        :param start: 時間範圍的起始時間
+        :return: 全部早於 start 且由新到舊排列時回傳 True（沒有依照時間排列的頁面無法判斷，回傳 False）
+        """
+
+        dates = [article.date for article in articles]
+        return dates != [] and dates[0] < start and all(newer >= older for newer, older in zip(dates, dates[1:]))
+
+
+    @staticmethod
+    def clean( text: str ) -> str :
+        """
+        移除英文字母、全形空白以及換行
+
+        :param text: 內文
+        :return: 處理後的內文
+        """
+
+        text = re.sub('[a-zA-Z]', '', text)
+        return text.replace(u'　', u' ').replace('\n', '')
+
+
+    @staticmethod
+    def shorten( text: str, limit = 50 ) -> str :
+        """
+        清理內文並只保留第一句（沒有句號則保留前 limit 個字）
+
+        :param text: 內文
+        :param limit: 沒有句號時保留的字數
+        :return: 簡介
+        """
+
+        text = Article.clean(text)
+        end = text.find("。")
+        return text[:end] if end > 0 else text[:limit]
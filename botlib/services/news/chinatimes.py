@@ -1,84 +1,88 @@
-import requests as rq
-from bs4 import BeautifulSoup
 import re
 import datetime
 
-html_list = []
-title_list = []
-content_list = []
-date_list = []
+# project libs
+from botlib.services.news.article import Article
+from botlib.services.news.fetcher import NewsFetcher
+from botlib.services.news.html_parser import HtmlParser
 
 
-def parse(keyword: list, ty: (datetime, datetime)):
-    search_string = "https://www.chinatimes.com/search/"
-    if_no_url = "NO_URL"
-    if_no_context = "找不到相符結果"
-    if keyword:
-        for ele in keyword:
-            search_string = search_string + ele + "%20"
-        for i in range(1, 6):
-            # get connect
-            url = search_string + "?page" + str(i)
-            response = rq.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            sel = soup.find("span", "search-result-count").text
-            if sel == "00":
-                break
-            sel = soup.select("h3.title a")
-            # get_html
-            for ele in sel:
-                html_list.append(ele["href"])
+SEARCH_URL = "https://www.chinatimes.com/search/"
+# result count, links, dates and texts on search page
+SEARCH_STRAINER = HtmlParser.classes("search-result-count", "title", "date", "intro")
 
-            # get date
-            s = ""
-            for ele in soup.select("span.date"):
-                s += ele.text + " 00:00"
-                date_list.append(s)
-                s = ""
 
-            # get_context
-            sel = soup.select("p.intro")
-            for ele in sel:
-                content_list.append(ele.text)
+def extract(page: str) -> list or None:
+    # articles on a search page, None when there is no result
+    soup = HtmlParser.parse(page, SEARCH_STRAINER)
+    sel = soup.find("span", "search-result-count").text
+    if sel == "00":
+        return None
 
-            for j in range(0, len(date_list)):
-                date = datetime.datetime.strptime(str(date_list[j]), '%Y/%m/%d %H:%M')
-                if ty[0] <= date <= ty[1]:
-                    content_list[j] = re.sub('[a-zA-Z]', '', content_list[j])
-                    content_list[j] = content_list[j].replace(u'\u3000', u' ').replace('\n', '')
-                    if content_list[j].find("。"):
-                        content_list[j] = content_list[j][:content_list[j].find("。")]
-                    elif len(content_list[j]) > 50:
-                        content_list[j] = content_list[j][:50]
-                    return [html_list[j], content_list[j]]
-            if i == 1:
-                if_no_url = html_list[0]
-                if_no_context = re.sub('[a-zA-Z]', '', content_list[0])
-                if_no_context = if_no_context.replace(u'\u3000', u' ').replace('\n', '')
-                if if_no_context.find("。"):
-                    if_no_context = if_no_context[:if_no_context.find("。")]
-                elif len(if_no_context) > 50:
-                    if_no_context = if_no_context[:50]
-            html_list.clear()
-            date_list.clear()
-            content_list.clear()
-    else:
-        html_string = ""
-        content_string = ""
-        url = "https://www.chinatimes.com/hotnews/?chdtv"
-        response = rq.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        sel = soup.find_all("h3", "title", limit=3)
-        for ele in sel:
-            e = ele.find("a")
-            html_string += e["href"]
-            if ele != sel[-1]:
-                html_string += "\n"
-        sel = soup.find_all("p", "intro", limit=3)
-        for ele in sel:
-            content_string += ele.text.replace(u'\u3000', u' ').replace('\n', '')
-            if ele != sel[-1]:
-                content_string += "\n"
-        content_string = re.sub('[a-zA-Z]', '', content_string)
-        return [html_string, content_string]
-    return [if_no_url, if_no_context]
+    links = soup.select("h3.title a")
+    dates = soup.select("span.date")
+    contents = soup.select("p.intro")
+    return [Article(link["href"], datetime.datetime.strptime(date.text + " 00:00", '%Y/%m/%d %H:%M'),
+                    Article.shorten(content.text))
+            for link, date, content in zip(links, dates, contents)]
+
+
+def search(keyword: list, time_range: (datetime, datetime) = None):
+    # time_range only saves requests, articles outside it are still yielded
+    search_string = SEARCH_URL
+    for ele in keyword:
+        search_string = search_string + ele + "%20"
+    # with a time range, page 1 is fetched alone first since it usually has the answer
+    # the rest are then fetched at once, pages after the caller stops are cancelled
+    urls = [search_string + "?page" + str(i) for i in range(1, 6)]
+    for page in NewsFetcher.iter_fetch(urls, head=None if time_range is None else 1):
+        articles = None if page is None else extract(page)
+        if articles is None:
+            return
+        yield from articles
+        # newest first, later pages are even older
+        if time_range is not None and Article.all_before(articles, time_range[0]):
+            return
+
+
+def hot():
+    html_string = ""
+    content_string = ""
+    url = "https://www.chinatimes.com/hotnews/?chdtv"
+    soup = HtmlParser.parse(NewsFetcher.get(url))
+    sel = soup.find_all("h3", "title", limit=3)
+    for ele in sel:
+        e = ele.find("a")
+        html_string += e["href"]
+        if ele != sel[-1]:
+            html_string += "\n"
+    sel = soup.find_all("p", "intro", limit=3)
+    for ele in sel:
+        content_string += ele.text.replace(u'\u3000', u' ').replace('\n', '')
+        if ele != sel[-1]:
+            content_string += "\n"
+    content_string = re.sub('[a-zA-Z]', '', content_string)
+    return [html_string, content_string]
+
+
+def latest():
+    # realtime news listing, for NewsIngester
+    articles = []
+    soup = HtmlParser.parse(NewsFetcher.get("https://www.chinatimes.com/realtimenews/?chdtv"))
+    for ele in soup.select("div.articlebox-compact"):
+        link = ele.select_one("h3.title a")
+        date_text = ele.select_one("span.date")
+        hour_text = ele.select_one("span.hour")
+        if link is None or date_text is None:
+            continue
+        date_text = date_text.text.strip() + " " + (hour_text.text.strip() if hour_text is not None else "00:00")
+        try:
+            date = datetime.datetime.strptime(date_text, '%Y/%m/%d %H:%M')
+        except ValueError:
+            continue
+        html = link["href"]
+        if not html.startswith("http"):
+            html = "https://www.chinatimes.com" + html
+        intro = ele.select_one("p.intro")
+        articles.append(Article(html, date, intro.text.strip() if intro is not None else "", link.text.strip()))
+    return articles
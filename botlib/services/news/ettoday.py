@@ -1,88 +1,101 @@
-import requests as rq
-from bs4 import BeautifulSoup
 import re
 import datetime
 
-html_list = []
-title_list = []
-content_list = []
-date_list = []
+# project libs
+from botlib.services.news.article import Article
+from botlib.services.news.fetcher import NewsFetcher
+from botlib.services.news.html_parser import HtmlParser
 
 
-def parse(keyword: list, ty: (datetime, datetime)):
-    if_no_url = "NO_URL"
-    if_no_context = "找不到相符結果"
-    search_string = "https://www.ettoday.net/news_search/doSearch.php?search_term_string="
-    if keyword:
-        for ele in keyword:
-            search_string = search_string + ele + "+"
-        for i in range(1, 6):
-            # get connect
-            url = search_string + "&page=" + str(i)
-            response = rq.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            sel = soup.find("p", "info").text
-            current_page = sel[1:sel.find("頁",0,len(sel))]
-            total_page   = sel[sel.find("共",0,len(sel))+1:len(sel)-1]
-            if int(total_page) == 0 or int(total_page) < int(current_page):
-                break
+SEARCH_URL = "https://www.ettoday.net/news_search/doSearch.php?search_term_string="
+# page info, links, dates and texts on search page
+SEARCH_STRAINER = HtmlParser.classes("info", "box_2", "date", "detail")
+# text on article page
+ARTICLE_STRAINER = HtmlParser.classes("story")
 
-            # get_html
-            sel = soup.select("div.box_2 h2 a")
-            for ele in sel:
-                html_list.append(ele["href"])
 
-            # get_date
-            for ele in soup.select("span.date"):
-                date_text = str(ele.text)
-                date_text = date_text[date_text.find("/")+2:len(date_text)-1]
-                date_list.append(date_text)
+def article_snippet(url: str) -> str:
+    # latest news listing has no text, NewsIngester fetches it once per new article
+    soup = HtmlParser.parse(NewsFetcher.get(url), ARTICLE_STRAINER)
+    text = "".join(ele.text for ele in soup.select("div.story p"))
+    return Article.shorten(text)
 
-            # get_context
-            for ele in soup.find_all("p", "detail"):
-                w = ele.find("span").text
-                content_list.append(ele.text[:len(ele.text)-len(w)])
 
-            for j in range(0, len(date_list)):
-                date = datetime.datetime.strptime(str(date_list[j]), '%Y-%m-%d %H:%M')
-                if ty[0] <= date <= ty[1]:
-                    content_list[j] = re.sub('[a-zA-Z]', '', content_list[j])
-                    content_list[j] = content_list[j].replace(u'\u3000', u' ').replace('\n', '')
-                    if content_list[j].find("。"):
-                        content_list[j] = content_list[j][:content_list[j].find("。")]
-                    elif len(content_list[j]) > 50:
-                        content_list[j] = content_list[j][:50]
-                    return [html_list[j], content_list[j]]
-            if i == 1:
-                if_no_url = html_list[0]
-                if_no_context = re.sub('[a-zA-Z]', '', content_list[0])
-                if_no_context = if_no_context.replace(u'\u3000', u' ').replace('\n', '')
-                if if_no_context.find("。"):
-                    if_no_context = if_no_context[:if_no_context.find("。")]
-                elif len(if_no_context) > 50:
-                    if_no_context = if_no_context[:50]
-            html_list.clear()
-            date_list.clear()
-            content_list.clear()
-    else:
-        html_string = ""
-        content_string = ""
-        url = "https://www.ettoday.net/news/hot-news.htm"
-        response = rq.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        sel = soup.find_all("div", "piece clearfix", limit=3)
-        for ele in sel:
-            e = ele.find("a")
-            html_string += "https://www.ettoday.net" + e["href"]
-            if ele != sel[-1]:
-                html_string += "\n"
-        sel = soup.find_all("p", "summary", limit=3)
-        for ele in sel:
-            content_string += ele.text.replace(u'\u3000', u' ').replace('\n', '')
-            if ele != sel[-1]:
-                content_string += "\n"
-        content_string = re.sub('[a-zA-Z]', '', content_string)
-        return [html_string, content_string]
+def extract(page: str) -> list or None:
+    # articles on a search page, None when there is no result or page is out of range
+    soup = HtmlParser.parse(page, SEARCH_STRAINER)
+    sel = soup.find("p", "info").text
+    current_page = sel[1:sel.find("頁",0,len(sel))]
+    total_page   = sel[sel.find("共",0,len(sel))+1:len(sel)-1]
+    if int(total_page) == 0 or int(total_page) < int(current_page):
+        return None
 
-    return [if_no_url, if_no_context]
+    articles = []
+    links = soup.select("div.box_2 h2 a")
+    dates = soup.select("span.date")
+    contents = soup.find_all("p", "detail")
+    for link, date, content in zip(links, dates, contents):
+        date_text = str(date.text)
+        date_text = date_text[date_text.find("/")+2:len(date_text)-1]
+        w = content.find("span").text
+        articles.append(Article(link["href"], datetime.datetime.strptime(date_text, '%Y-%m-%d %H:%M'),
+                                Article.shorten(content.text[:len(content.text)-len(w)])))
+    return articles
 
+
+def search(keyword: list, time_range: (datetime, datetime) = None):
+    # time_range only saves requests, articles outside it are still yielded
+    search_string = SEARCH_URL
+    for ele in keyword:
+        search_string = search_string + ele + "+"
+    # with a time range, page 1 is fetched alone first since it usually has the answer
+    # the rest are then fetched at once, pages after the caller stops are cancelled
+    urls = [search_string + "&page=" + str(i) for i in range(1, 6)]
+    for page in NewsFetcher.iter_fetch(urls, head=None if time_range is None else 1):
+        articles = None if page is None else extract(page)
+        if articles is None:
+            return
+        yield from articles
+        # newest first, later pages are even older
+        if time_range is not None and Article.all_before(articles, time_range[0]):
+            return
+
+
+def hot():
+    html_string = ""
+    content_string = ""
+    url = "https://www.ettoday.net/news/hot-news.htm"
+    soup = HtmlParser.parse(NewsFetcher.get(url))
+    sel = soup.find_all("div", "piece clearfix", limit=3)
+    for ele in sel:
+        e = ele.find("a")
+        html_string += "https://www.ettoday.net" + e["href"]
+        if ele != sel[-1]:
+            html_string += "\n"
+    sel = soup.find_all("p", "summary", limit=3)
+    for ele in sel:
+        content_string += ele.text.replace(u'\u3000', u' ').replace('\n', '')
+        if ele != sel[-1]:
+            content_string += "\n"
+    content_string = re.sub('[a-zA-Z]', '', content_string)
+    return [html_string, content_string]
+
+
+def latest():
+    # latest news listing, for NewsIngester
+    articles = []
+    soup = HtmlParser.parse(NewsFetcher.get("https://www.ettoday.net/news/news-list.htm"))
+    for ele in soup.select("div.part_list_2 h3"):
+        link = ele.find("a")
+        date_text = ele.find("span", "date")
+        if link is None or date_text is None:
+            continue
+        try:
+            date = datetime.datetime.strptime(date_text.text.strip(), '%Y/%m/%d %H:%M')
+        except ValueError:
+            continue
+        html = link["href"]
+        if not html.startswith("http"):
+            html = "https://www.ettoday.net" + html
+        articles.append(Article(html, date, title=link.text.strip(), loader=article_snippet))
+    return articles
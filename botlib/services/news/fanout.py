@@ -0,0 +1,176 @@
+import datetime
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# project libs
+from botlib.botlogger import BotLogger
+from botlib.latency_histogram import LatencyHistogram
+
+
+
+class NewsFanout :
+    """
+    Search Every News Crawler At Once
+
+    所有 crawler 同時搜尋，整體不會超過 deadline 秒
+    * first-hit（top_k = 1）：任何一個來源找到時間範圍內的文章就回傳，其他來源會被停止
+    * top-k：等所有來源結束（或到 deadline），把各來源時間範圍內的文章合併、去除重複後取最新的 k 篇
+
+    每個來源都有自己的 latency histogram，p90 超過 deadline 的來源會被視為太慢而先跳過（只會每 PROBE_EVERY 次搜尋試一次）
+    其餘來源依照 p50 由快到慢送出，thread 不夠時慢的來源會排在後面
+    """
+
+    PROBE_EVERY = 10
+
+
+    def __init__( self, crawlers: dict, deadline: float, max_workers: int ) :
+        """
+        :param crawlers: 媒體名稱 -> crawler module（提供 search(keywords, time_range) -> iterator of Article）
+        :param deadline: 每次搜尋最多花費的秒數
+        :param max_workers: 同時搜尋的來源數
+        """
+
+        self.crawlers = crawlers
+        self.deadline = deadline
+
+        self.__executor = ThreadPoolExecutor(max_workers = max(1, max_workers), thread_name_prefix = "NewsFanout")
+        self.__latency = { name : LatencyHistogram() for name in crawlers }
+        self.__searches = 0
+        self.__lock = threading.Lock()
+
+
+    def search( self, time_range: (datetime, datetime), keywords: list, top_k = 1 ) -> list :
+        """
+        :param time_range: (起始時間, 結束時間)
+        :param keywords: 關鍵字 list
+        :param top_k: 1 為 first-hit 模式，大於 1 則合併所有來源取前 k 篇
+        :return: list of Article（最多 top_k 篇），沒有時間範圍內的文章則回傳最快來源的第一篇搜尋結果
+        """
+
+        started = time.monotonic()
+        stop = threading.Event()
+
+        futures = { }
+        for name in self.__schedule() :
+            future = self.__executor.submit(self.__search_source, name, time_range, keywords, top_k, stop)
+            futures[future] = name
+
+        hits, fallback = [], None
+        pending = set(futures)
+        try :
+            while pending :
+                remaining = self.deadline - (time.monotonic() - started)
+                if remaining <= 0 :
+                    break
+
+                done, pending = wait(pending, timeout = remaining, return_when = FIRST_COMPLETED)
+                for future in done :
+                    source_hits, first = future.result()
+                    hits.extend((futures[future], article) for article in source_hits)
+                    if fallback is None :
+                        fallback = first
+
+                if top_k == 1 and hits :
+                    break
+
+        finally :
+            # sources still running stop at their next article, queued ones never start
+            stop.set()
+            for future in pending :
+                future.cancel()
+
+        if pending :
+            BotLogger.debug(f"News Fanout : {', '.join(futures[future] for future in pending)} Did Not Finish In Time.")
+
+        if not hits :
+            return [] if fallback is None else [fallback]
+        return NewsFanout.merge(hits, top_k)
+
+
+    def stats( self ) -> dict :
+        """
+        :return: 每個來源的 latency histogram
+        """
+
+        return { name : histogram.snapshot() for name, histogram in self.__latency.items() }
+
+
+    @staticmethod
+    def merge( hits: list, top_k: int ) -> list :
+        """
+        合併多個來源的文章：相同網址或相同簡介（不同媒體轉載同一篇稿）只留一篇，新的在前
+        簡介已經在各來源的 worker 中取得，這裡不會送出 request
+
+        :param hits: list of (媒體名稱, Article)，同一個來源的文章依照其搜尋排名
+        :param top_k: 最多回傳幾篇
+        :return: list of Article
+        """
+
+        merged, seen = [], set()
+        for name, article in sorted(hits, key = lambda hit : hit[1].date, reverse = True) :
+            keys = (article.url.split("?")[0].rstrip("/"), article.snippet.strip()[:20] or article.url)
+            if seen.intersection(keys) :
+                continue
+            seen.update(keys)
+            merged.append(article)
+            if len(merged) == top_k :
+                break
+
+        return merged
+
+
+    # ------------------------------------------------------------------------------------------------------------
+
+    def __schedule( self ) -> list :
+
+        with self.__lock :
+            self.__searches += 1
+            probe = self.__searches % NewsFanout.PROBE_EVERY == 0
+
+        expected = { name : self.__latency[name].percentile(0.5) or 0 for name in self.crawlers }
+        names = sorted(self.crawlers, key = lambda name : expected[name])
+
+        slow = [name for name in names if (self.__latency[name].percentile(0.9) or 0) > self.deadline * 1000]
+        if slow and not probe and len(slow) != len(names) :
+            BotLogger.debug(f"News Fanout : Skip Slow Sources {slow}")
+            names = [name for name in names if name not in slow]
+
+        return names
+
+
+    def __search_source( self, name: str, time_range: (datetime, datetime), keywords: list, limit: int, stop: threading.Event ) -> (list, object) :
+
+        started = time.monotonic()
+        hits, first, stopped = [], None, False
+
+        articles = self.crawlers[name].search(keywords, time_range)
+        try :
+            for article in articles :
+                if stop.is_set() :
+                    stopped = True
+                    break
+                if first is None :
+                    first = article
+                if time_range[0] <= article.date <= time_range[1] :
+                    hits.append(article)
+                    if len(hits) == limit :
+                        break
+
+            # lazy snippets (tvbs) are fetched here, before the deadline, so merge() and the answer never fetch in the request thread
+            if not stopped :
+                for article in hits or ([first] if first is not None else []) :
+                    article.load_snippet()
+
+        except Exception as e :
+            BotLogger.exception(f"Searching {name} Failed, {type(e).__name__} : {e}")
+
+        finally :
+            articles.close()
+
+        # a source stopped because others already answered tells nothing about its own speed
+        elapsed = time.monotonic() - started
+        if not stopped or elapsed > self.deadline :
+            self.__latency[name].record(elapsed)
+
+        return hits, first
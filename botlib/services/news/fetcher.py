@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from requests import RequestException, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# project libs
+from botlib import BotConfig
+from botlib.botlogger import BotLogger
+from botlib.services.news.http_cache import HttpCache
+
+
+
+class HostLimit :
+    """
+    First-In-First-Out Semaphore
+
+    threading.Semaphore 釋放名額時，剛好來 acquire 的 thread 可能搶在被喚醒的 thread 之前拿走名額
+    同一個網站的 request 很多時，有些 request 會一直被插隊而等很久，這裡則是依照到達順序直接把名額交給等待中的 thread
+    """
+
+
+    def __init__( self, value: int ) :
+        self.__value = value
+        self.__waiters = deque()
+        self.__lock = threading.Lock()
+
+
+    def __enter__( self ) :
+
+        with self.__lock :
+            if self.__value > 0 and not self.__waiters :
+                self.__value -= 1
+                return self
+
+            waiter = threading.Lock()
+            waiter.acquire()
+            self.__waiters.append(waiter)
+
+        # released by __exit__ of the request that hands its slot over
+        waiter.acquire()
+        return self
+
+
+    def __exit__( self, *exc_info ) :
+
+        with self.__lock :
+            if self.__waiters :
+                self.__waiters.popleft().release()
+            else :
+                self.__value += 1
+
+
+
+class NewsFetcher :
+    """
+    Shared HTTP Fetch Layer For News Crawlers
+
+    所有 crawler 共用同一個 keep-alive session 與 thread pool，多個頁面（搜尋結果的各頁、文章）可以同時送出
+    每個網站同時最多只會有 HOST_CONNECTIONS 個 request，避免對同一個網站送出太多 request
+    回應會存在 CACHE，過期後以 ETag / Last-Modified 向網站確認是否有更新
+    """
+
+    TIMEOUT = (BotConfig.NEWS_CONNECT_TIMEOUT, BotConfig.NEWS_READ_TIMEOUT)
+    HOST_CONNECTIONS = BotConfig.NEWS_HOST_CONNECTIONS
+
+    __SESSION = Session()
+    __SESSION.mount("http://", HTTPAdapter(pool_connections = 16, pool_maxsize = BotConfig.NEWS_HOST_CONNECTIONS,
+                                           max_retries = Retry(total = BotConfig.NEWS_RETRIES, backoff_factor = 0.2,
+                                                               status_forcelist = (502, 503, 504),
+                                                               raise_on_status = False)))
+    __SESSION.mount("https://", __SESSION.get_adapter("http://"))
+
+    # search results and listings change often, articles rarely do
+    CACHE = None if BotConfig.NEWS_CACHE_SIZE <= 0 else HttpCache(
+        BotConfig.NEWS_CACHE_SIZE, BotConfig.NEWS_CACHE_PATH,
+        [(r"search|/api/more|/list|hot|/rank/|realtime|ViewAll|403-1000-", BotConfig.NEWS_CACHE_LISTING_TTL)],
+        BotConfig.NEWS_CACHE_ARTICLE_TTL)
+
+    __EXECUTOR = ThreadPoolExecutor(max_workers = BotConfig.NEWS_FETCH_WORKERS, thread_name_prefix = "NewsFetcher")
+
+    __HOST_LIMITS = { }
+    __HOST_LIMITS_LOCK = threading.Lock()
+
+
+    @staticmethod
+    def __host_limit( url: str ) -> HostLimit :
+
+        host = urlsplit(url).netloc
+        with NewsFetcher.__HOST_LIMITS_LOCK :
+            limit = NewsFetcher.__HOST_LIMITS.get(host)
+            if limit is None :
+                limit = NewsFetcher.__HOST_LIMITS[host] = HostLimit(NewsFetcher.HOST_CONNECTIONS)
+            return limit
+
+
+    @staticmethod
+    def get( url: str ) -> str or None :
+        """
+        取得網頁內容，CACHE 中沒過期的直接回傳，過期的則送 conditional request
+
+        :param url: 網頁 url
+        :return: 網頁內容（text），連線失敗或逾時則回傳 None（有過期的 cache 則回傳過期的內容）
+        """
+
+        started = time.monotonic()
+        cached = None if NewsFetcher.CACHE is None else NewsFetcher.CACHE.lookup(url)
+        if cached is not None and cached.is_fresh() :
+            NewsFetcher.CACHE.record("warm", time.monotonic() - started)
+            return cached.text
+
+        try :
+            with NewsFetcher.__host_limit(url) :
+                response = NewsFetcher.__SESSION.get(url, timeout = NewsFetcher.TIMEOUT,
+                                                     headers = cached.validators() if cached is not None else None)
+
+        except RequestException as e :
+            BotLogger.exception(f"Fetching {url} Failed, {type(e).__name__} : {e}")
+            return cached.text if cached is not None else None
+
+        if NewsFetcher.CACHE is None :
+            return response.text
+
+        if response.status_code == 304 and cached is not None :
+            NewsFetcher.CACHE.revalidate(url, cached)
+            NewsFetcher.CACHE.record("revalidated", time.monotonic() - started)
+            return cached.text
+
+        if response.status_code == 200 :
+            NewsFetcher.CACHE.store(url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        NewsFetcher.CACHE.record("cold", time.monotonic() - started)
+        return response.text
+
+
+    @staticmethod
+    def fetch_all( urls: list ) -> list :
+        """
+        同時取得多個網頁的內容
+
+        :param urls: 網頁 url list
+        :return: 與 urls 順序相同的網頁內容 list，失敗的網頁為 None
+        """
+
+        futures = [NewsFetcher.__EXECUTOR.submit(NewsFetcher.get, url) for url in urls]
+        return [future.result() for future in futures]
+
+
+    @staticmethod
+    def iter_fetch( urls: list, head: int or None = None ) :
+        """
+        同時送出所有 request，但依照 urls 的順序逐一 yield 網頁內容
+        caller 提早結束（break、return、找到結果）時，還沒開始的 request 會被取消
+
+        :param urls: 網頁 url list
+        :param head: 一開始只送出前 head 個 request，caller 讀完它們還要繼續時才同時送出其餘的，None 表示一開始全部送出
+        :return: generator of 網頁內容（失敗為 None）
+        """
+
+        head = len(urls) if head is None else head
+        futures = [NewsFetcher.__EXECUTOR.submit(NewsFetcher.get, url) for url in urls[:head]]
+        try :
+            for i in range(len(urls)) :
+                if i == len(futures) :
+                    futures += [NewsFetcher.__EXECUTOR.submit(NewsFetcher.get, url) for url in urls[i:]]
+                yield futures[i].result()
+
+        finally :
+            cancelled = sum(future.cancel() for future in futures)
+            if cancelled != 0 :
+                BotLogger.debug(f"News Fetch Stopped Early, {cancelled} Requests Cancelled.")
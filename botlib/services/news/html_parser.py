@@ -0,0 +1,61 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+# project libs
+from botlib import BotConfig
+
+try :
+    import lxml
+except ImportError :
+    lxml = None
+
+
+
+class HtmlParser :
+    """
+    HTML Parsing Backend For News Crawlers
+
+    有安裝 lxml 時使用 C 實作的 lxml parser，否則使用 python 的 html.parser（也可以在設定檔指定）
+    crawler 可以給一個 SoupStrainer，只把需要的 container 建成 tree，其他的 tag 在 parse 時就丟掉
+    """
+
+    BACKEND = BotConfig.NEWS_HTML_PARSER or ("html.parser" if lxml is None else "lxml")
+
+    # False to always build the whole tree (for comparison in benchmark)
+    TARGETED = True
+
+
+    @staticmethod
+    def classes( *classes: str ) -> SoupStrainer :
+        """
+        只保留 class 包含任一個 classes 的 tag（以及其下所有內容）
+
+        :param classes: css class names
+        :return: SoupStrainer
+        """
+
+        wanted = frozenset(classes)
+        # while parsing, class is still the raw attribute string (e.g. "title search-title")
+        return SoupStrainer(class_ = lambda value : value is not None and not wanted.isdisjoint(value.split()))
+
+
+    @staticmethod
+    def tags( *names: str ) -> SoupStrainer :
+        """
+        只保留 tag name 為 names 之一的 tag（以及其下所有內容）
+
+        :param names: tag names
+        :return: SoupStrainer
+        """
+
+        return SoupStrainer(list(names))
+
+
+    @staticmethod
+    def parse( page: str or None, only: SoupStrainer or None = None ) -> BeautifulSoup :
+        """
+        :param page: 網頁內容，None 視為空白網頁
+        :param only: 只 parse 符合的 tag，None 則 parse 整個網頁
+        :return: BeautifulSoup
+        """
+
+        return BeautifulSoup(page or "", HtmlParser.BACKEND, parse_only = only if HtmlParser.TARGETED else None)
@@ -0,0 +1,198 @@
+import re
+import sqlite3
+import threading
+import time
+
+# project libs
+from botlib.botlogger import BotLogger
+from botlib.latency_histogram import LatencyHistogram
+from botlib.ttl_cache import TtlLruCache
+
+
+
+class CachedPage :
+    """
+    A Cached HTTP Response Body With Its Validators
+    """
+
+    __slots__ = ("text", "etag", "last_modified", "expires")
+
+
+    def __init__( self, text: str, etag: str or None, last_modified: str or None, expires: float ) :
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+
+    def is_fresh( self ) -> bool :
+        return time.time() < self.expires
+
+
+    def validators( self ) -> dict :
+        """
+        :return: conditional request headers（If-None-Match、If-Modified-Since）
+        """
+
+        headers = { }
+        if self.etag :
+            headers["If-None-Match"] = self.etag
+        if self.last_modified :
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+
+class HttpCache :
+    """
+    Two Level HTTP Response Cache
+
+    記憶體中是有大小上限的 LRU（TtlLruCache），後面是 sqlite 的硬碟 store（path 為空則只有記憶體）
+    每個 url 依照 ttl_rules 決定存活秒數，過期的 entry 不會被刪掉，而是留著它的 ETag / Last-Modified 讓 caller 送 conditional request
+    """
+
+    __SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            expires REAL NOT NULL
+        )"""
+
+
+    def __init__( self, memory_size: int, path: str, ttl_rules: list, default_ttl: float ) :
+        """
+        :param memory_size: 記憶體中最多保留幾個網頁
+        :param path: sqlite 檔案路徑，空字串表示不存到硬碟
+        :param ttl_rules: list of (regex, ttl)，url 符合的第一條規則決定存活秒數
+        :param default_ttl: 沒有符合任何規則時的存活秒數
+        """
+
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in ttl_rules]
+        self.default_ttl = default_ttl
+
+        self.__memory = TtlLruCache(memory_size)
+
+        self.__db = None
+        self.__db_lock = threading.Lock()
+        if path :
+            self.__db = sqlite3.connect(path, check_same_thread = False)
+            with self.__db_lock, self.__db :
+                self.__db.execute(HttpCache.__SCHEMA)
+
+        self.__lock = threading.Lock()
+        self.__counts = { "memory_hits" : 0, "disk_hits" : 0, "revalidated" : 0, "misses" : 0, "stored" : 0 }
+        self.__latency = { "warm" : LatencyHistogram(), "revalidated" : LatencyHistogram(), "cold" : LatencyHistogram() }
+
+
+    def ttl_of( self, url: str ) -> float :
+        for rule, ttl in self.ttl_rules :
+            if rule.search(url) :
+                return ttl
+        return self.default_ttl
+
+
+    def lookup( self, url: str ) -> CachedPage or None :
+        """
+        先查記憶體再查硬碟，硬碟找到的會放回記憶體
+
+        :param url: 網頁 url
+        :return: CachedPage（可能已經過期，用 is_fresh() 判斷），沒有則回傳 None
+        """
+
+        page = self.__memory.get(url)
+        if page is not None :
+            if page.is_fresh() :
+                self.__count("memory_hits")
+            return page
+
+        page = self.__load(url)
+        if page is not None :
+            self.__memory.put(url, page)
+            if page.is_fresh() :
+                self.__count("disk_hits")
+            return page
+
+        return None
+
+
+    def store( self, url: str, text: str, etag: str or None, last_modified: str or None ) -> CachedPage :
+        """
+        :return: 新的 CachedPage
+        """
+
+        page = CachedPage(text, etag, last_modified, time.time() + self.ttl_of(url))
+        self.__memory.put(url, page)
+        self.__save(url, page)
+        self.__count("stored")
+        return page
+
+
+    def revalidate( self, url: str, page: CachedPage ) -> None :
+        """
+        server 回傳 304 時呼叫，重新計算過期時間
+        """
+
+        page.expires = time.time() + self.ttl_of(url)
+        self.__memory.put(url, page)
+        self.__save(url, page)
+        self.__count("revalidated")
+
+
+    def record( self, kind: str, seconds: float ) -> None :
+        """
+        :param kind: "warm"（cache 直接回傳）、"revalidated"（304）或 "cold"（完整下載）
+        :param seconds: 花費的秒數
+        """
+
+        if kind == "cold" :
+            self.__count("misses")
+        self.__latency[kind].record(seconds)
+
+
+    def stats( self ) -> dict :
+
+        with self.__lock :
+            stats = dict(self.__counts)
+
+        served = stats["memory_hits"] + stats["disk_hits"] + stats["revalidated"]
+        stats["hit_rate"] = round(served / (served + stats["misses"]), 3) if served + stats["misses"] != 0 else None
+        stats["memory_entries"] = len(self.__memory)
+        stats["latency"] = { kind : histogram.snapshot() for kind, histogram in self.__latency.items() }
+        return stats
+
+
+    # ------------------------------------------------------------------------------------------------------------
+
+    def __count( self, name: str ) -> None :
+        with self.__lock :
+            self.__counts[name] += 1
+
+
+    def __load( self, url: str ) -> CachedPage or None :
+
+        if self.__db is None :
+            return None
+
+        try :
+            with self.__db_lock :
+                row = self.__db.execute("SELECT text, etag, last_modified, expires FROM pages WHERE url = ?", (url,)).fetchone()
+        except sqlite3.Error as e :
+            BotLogger.exception(f"Loading Cached {url} Failed, {type(e).__name__} : {e}")
+            return None
+
+        return None if row is None else CachedPage(*row)
+
+
+    def __save( self, url: str, page: CachedPage ) -> None :
+
+        if self.__db is None :
+            return
+
+        try :
+            with self.__db_lock, self.__db :
+                self.__db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                                  (url, page.text, page.etag, page.last_modified, page.expires))
+        except sqlite3.Error as e :
+            BotLogger.exception(f"Saving Cached {url} Failed, {type(e).__name__} : {e}")
@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# project libs
+from botlib.botlogger import BotLogger
+from botlib.services.news.news_index import NewsIndex
+
+
+
+class NewsIngester :
+    """
+    Background News Ingester
+
+    每隔 interval 秒同時向所有來源拉一次最新文章列表並寫入 NewsIndex，並記錄每個來源各自的新鮮度
+    列表頁沒有內文的文章（有 loader，見 Article）在第一次寫入前由 ingester 取得內文，查詢時不會再送出 request
+    """
+
+
+    def __init__( self, index: NewsIndex, sources: dict, interval: float ) :
+        """
+        :param index: 寫入的 NewsIndex
+        :param sources: 媒體名稱 -> latest()，latest() 回傳 list of Article
+        :param interval: 每次拉取的間隔秒數
+        """
+
+        self.index = index
+        self.sources = sources
+        self.interval = interval
+
+        self.__executor = ThreadPoolExecutor(max_workers = max(1, len(sources)), thread_name_prefix = "NewsIngester")
+        self.__stop = threading.Event()
+        self.__thread = None
+
+        self.__lock = threading.Lock()
+        self.__freshness = {
+            name : {
+                "last_attempt" : None,
+                "last_success" : None,
+                "last_error" : None,
+                "consecutive_failures" : 0,
+                "last_fetched" : 0,
+                "last_added" : 0,
+                "total_added" : 0,
+                "last_duration_ms" : 0.0,
+            }
+            for name in sources
+        }
+
+
+    def start( self ) -> None :
+        if self.__thread is not None :
+            return
+
+        self.__thread = threading.Thread(target = self.__loop, name = "NewsIngester", daemon = True)
+        self.__thread.start()
+        BotLogger.info(f"News Ingester Started, {len(self.sources)} Sources Every {self.interval} Seconds.")
+
+
+    def stop( self ) -> None :
+        self.__stop.set()
+
+
+    def is_running( self ) -> bool :
+        return self.__thread is not None and not self.__stop.is_set()
+
+
+    def run_once( self ) -> None :
+        """
+        同時拉取所有來源一次，等待全部完成
+
+        :return: None
+        """
+
+        futures = [self.__executor.submit(self.__ingest, name, latest) for name, latest in self.sources.items()]
+        for future in futures :
+            future.result()
+
+
+    def stats( self ) -> dict :
+        """
+        :return: 每個來源的新鮮度（距離上次成功幾秒、最新文章時間、連續失敗次數...）
+        """
+
+        now = time.time()
+        index_stats = self.index.stats()
+
+        with self.__lock :
+            stats = { }
+            for name, freshness in self.__freshness.items() :
+                stats[name] = dict(freshness)
+                stats[name]["age_seconds"] = None if freshness["last_success"] is None else round(now - freshness["last_success"], 1)
+                stats[name].update(index_stats.get(name, { "articles" : 0, "newest" : None }))
+
+        return stats
+
+
+    # -------------------------------------------------------------------------------------------------------
+
+    def __loop( self ) -> None :
+
+        while not self.__stop.is_set() :
+            self.run_once()
+            self.__stop.wait(self.interval)
+
+
+    def __ingest( self, name: str, latest ) -> None :
+
+        started = time.time()
+        try :
+            articles = latest()
+            # 已經在 index 中的文章不用再取得內文
+            missing = self.index.missing([article.url for article in articles])
+            new_articles = [article for article in articles if article.url in missing]
+            for article in new_articles :
+                try :
+                    article.load_snippet()
+                except Exception as e :
+                    BotLogger.debug(f"Loading {article.url} Failed, {type(e).__name__} : {e}")
+            added = self.index.add_articles(name, new_articles)
+            error = None
+
+        except Exception as e :
+            BotLogger.exception(f"Ingesting {name} News Failed, {type(e).__name__} : {e}")
+            articles, added, error = [], 0, f"{type(e).__name__} : {e}"
+
+        finished = time.time()
+        with self.__lock :
+            freshness = self.__freshness[name]
+            freshness["last_attempt"] = finished
+            freshness["last_duration_ms"] = round((finished - started) * 1000, 1)
+            if error is None :
+                freshness["last_success"] = finished
+                freshness["consecutive_failures"] = 0
+                freshness["last_fetched"] = len(articles)
+                freshness["last_added"] = added
+                freshness["total_added"] += added
+            else :
+                freshness["last_error"] = error
+                freshness["consecutive_failures"] += 1
+
+        BotLogger.debug(f"Ingested {name} News, {added} New Of {len(articles)}.")
@@ -1,104 +1,132 @@
-import requests as rq
-from bs4 import BeautifulSoup
 import re
 import datetime
 
-html_list = []
-title_list = []
-content_list = []
-date_list = []
-
-
-def parse(keyword: list, ty: (datetime, datetime)):
-    if_no_url = "NO_URL"
-    if_no_context = "找不到相符結果"
-    search_string = "https://search.ltn.com.tw/list?keyword="
-    if keyword:
-        for ele in keyword:
-            search_string = search_string + ele + "+"
-        for i in range(1, 6):
-            # get connect
-            url = search_string + "&page=" + str(i)
-            response = rq.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            sel = soup.find("div", "mark").text
-            sel = sel[sel.find("有", 0, len(sel))+2:sel.find("項", 0, len(sel))-1]
-            if int(sel) == 0:
-                break
-
-            # get_html
-            sel = soup.select("a.tit")
-            for ele in sel:
-                html_list.append(ele["href"])
-
-            # get_date
-            sel = soup.select("span.time")
-            for ele in sel:
-                date_text = ele.text
-                if "分鐘" in date_text:
-                    real_date = datetime.datetime.now().strftime('%Y/%m/%d %H:%M')
-                elif "小時" in date_text:
-                    now_time = date_text[0:date_text.find("小")]
-                    real_date = (datetime.datetime.now() - datetime.timedelta(hours=float(now_time))).strftime('%Y/%m/%d %H:%M')
-                elif "天" in date_text:
-                    now_time = date_text[0:date_text.find("天")]
-                    real_date = (datetime.datetime.now() - datetime.timedelta(days=float(now_time))).strftime('%Y/%m/%d %H:%M')
-                else:
-                    real_date = date_text + " 00:00"
-                date_list.append(real_date)
-
-            # get_context
-            sel = soup.select("div.cont p")
-            for ele in sel:
-                content_list.append(ele.text)
-
-            for j in range(0, len(date_list)):
-                date = datetime.datetime.strptime(str(date_list[j]), '%Y/%m/%d %H:%M')
-                if ty[0] <= date <= ty[1]:
-                    content_list[j] = re.sub('[a-zA-Z]', '', content_list[j])
-                    content_list[j] = content_list[j].replace(u'\u3000', u' ').replace('\n', '')
-                    if content_list[j].find("。"):
-                        content_list[j] = content_list[j][:content_list[j].find("。")]
-                    elif len(content_list[j]) > 50:
-                        content_list[j] = content_list[j][:50]
-                    return [html_list[j], content_list[j]]
-            if i == 1:
-                if_no_url = html_list[0]
-                content_list[0] = re.sub('[a-zA-Z]', '', content_list[0])
-                if_no_context = content_list[0].replace(u'\u3000', u' ').replace('\n', '')
-                if if_no_context.find("。"):
-                    if_no_context = if_no_context[:if_no_context.find("。")]
-                elif len(if_no_context) > 50:
-                    if_no_context = if_no_context[:50]
-            html_list.clear()
-            date_list.clear()
-            content_list.clear()
-    else:
-        html_string = ""
-        content_string = ""
-        url = "https://news.ltn.com.tw/list/breakingnews/popular"
-        response = rq.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        sel = soup.find_all("a", "tit", limit=3)
-        for ele in sel:
-            te = ""
-            html_string += ele["href"]
-            url = ele["href"]
-            response = rq.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            se = soup.select("div.text")
-            for el in se:
-                te += el.text
-            te = te.replace(u'\u3000', u' ').replace('\n', '')
-            if te.find("〔"):
-                te = te[te.find("〔"):te.find("〔")+40]
-            else:
-                te = te[0:40]
-            content_string += te
-            if ele != sel[-1]:
-                content_string += "\n"
-                html_string += "\n"
-        content_string = re.sub('[a-zA-Z]', '', content_string)
-        return [html_string, content_string]
-
-    return [if_no_url, if_no_context]
+# project libs
+from botlib.services.news.article import Article
+from botlib.services.news.fetcher import NewsFetcher
+from botlib.services.news.html_parser import HtmlParser
+
+
+SEARCH_URL = "https://search.ltn.com.tw/list?keyword="
+# result count, links, dates and texts on search page
+SEARCH_STRAINER = HtmlParser.classes("mark", "tit", "time", "cont")
+# text on article page
+ARTICLE_STRAINER = HtmlParser.classes("text")
+
+
+def article_snippet(url: str) -> str:
+    # breaking news listing has no text, NewsIngester fetches it once per new article
+    soup = HtmlParser.parse(NewsFetcher.get(url), ARTICLE_STRAINER)
+    text = "".join(ele.text for ele in soup.select("div.text"))
+    return Article.shorten(text)
+
+
+def search_date(date_text: str) -> datetime.datetime:
+    # search results show relative time for recent news
+    now = datetime.datetime.now().replace(second=0, microsecond=0)
+    if "分鐘" in date_text:
+        return now
+    elif "小時" in date_text:
+        return now - datetime.timedelta(hours=float(date_text[0:date_text.find("小")]))
+    elif "天" in date_text:
+        return now - datetime.timedelta(days=float(date_text[0:date_text.find("天")]))
+    return datetime.datetime.strptime(date_text + " 00:00", '%Y/%m/%d %H:%M')
+
+
+def extract(page: str) -> list or None:
+    # articles on a search page, None when there is no result
+    soup = HtmlParser.parse(page, SEARCH_STRAINER)
+    sel = soup.find("div", "mark").text
+    sel = sel[sel.find("有", 0, len(sel))+2:sel.find("項", 0, len(sel))-1]
+    if int(sel) == 0:
+        return None
+
+    links = soup.select("a.tit")
+    dates = soup.select("span.time")
+    contents = soup.select("div.cont p")
+    return [Article(link["href"], search_date(date.text), Article.shorten(content.text))
+            for link, date, content in zip(links, dates, contents)]
+
+
+def search(keyword: list, time_range: (datetime, datetime) = None):
+    # time_range only saves requests, articles outside it are still yielded
+    search_string = SEARCH_URL
+    for ele in keyword:
+        search_string = search_string + ele + "+"
+    if time_range is None:
+        yield from search_pages(search_string, None)
+        return
+
+    # let the site filter by date, newest first
+    found = False
+    for article in search_pages(search_string + "&start_time=" + time_range[0].strftime('%Y%m%d') +
+                                "&end_time=" + time_range[1].strftime('%Y%m%d') + "&sort=date", time_range):
+        found = True
+        yield article
+    # nothing inside time_range, search again without the date filter so the nearest result is still yielded
+    if not found:
+        yield from search_pages(search_string, time_range)
+
+
+def search_pages(search_string: str, time_range: (datetime, datetime) = None):
+    # with a time range, page 1 is fetched alone first since it usually has the answer
+    # the rest are then fetched at once, pages after the caller stops are cancelled
+    urls = [search_string + "&page=" + str(i) for i in range(1, 6)]
+    for page in NewsFetcher.iter_fetch(urls, head=None if time_range is None else 1):
+        articles = None if page is None else extract(page)
+        if articles is None:
+            return
+        yield from articles
+        # newest first, later pages are even older
+        if time_range is not None and Article.all_before(articles, time_range[0]):
+            return
+
+
+def hot():
+    html_string = ""
+    content_string = ""
+    url = "https://news.ltn.com.tw/list/breakingnews/popular"
+    soup = HtmlParser.parse(NewsFetcher.get(url))
+    sel = soup.find_all("a", "tit", limit=3)
+    # fetch the 3 articles at once
+    pages = NewsFetcher.fetch_all([ele["href"] for ele in sel])
+    for ele, page in zip(sel, pages):
+        te = ""
+        html_string += ele["href"]
+        soup = HtmlParser.parse(page, ARTICLE_STRAINER)
+        se = soup.select("div.text")
+        for el in se:
+            te += el.text
+        te = te.replace(u'\u3000', u' ').replace('\n', '')
+        if te.find("〔"):
+            te = te[te.find("〔"):te.find("〔")+40]
+        else:
+            te = te[0:40]
+        content_string += te
+        if ele != sel[-1]:
+            content_string += "\n"
+            html_string += "\n"
+    content_string = re.sub('[a-zA-Z]', '', content_string)
+    return [html_string, content_string]
+
+
+def latest():
+    # breaking news listing, for NewsIngester
+    articles = []
+    soup = HtmlParser.parse(NewsFetcher.get("https://news.ltn.com.tw/list/breakingnews"))
+    for ele in soup.select("ul.list li"):
+        link = ele.select_one("a.tit")
+        date_text = ele.select_one("span.time")
+        if link is None or date_text is None:
+            continue
+        date_text = date_text.text.strip()
+        try:
+            # today's news only shows time
+            if len(date_text) == 5:
+                date_text = datetime.datetime.now().strftime('%Y/%m/%d ') + date_text
+            date = datetime.datetime.strptime(date_text, '%Y/%m/%d %H:%M')
+        except ValueError:
+            continue
+        title = link.get("title") or link.text.strip()
+        articles.append(Article(link["href"], date, title=title, loader=article_snippet))
+    return articles
@@ -1,44 +1,101 @@
-import requests as rq
-from bs4 import BeautifulSoup
 import re
+import atexit
 import datetime
 
-html_list = []
-title_list = []
-content_list = []
-date_list = []
-
-
-def parse(keyword: list, ty: (datetime, datetime)):
-    url = "https://web.ncku.edu.tw/p/403-1000-3094-1.php?Lang=zh-tw"
-    response = rq.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    sel = soup.select("div.mtitle a")
-    for ele in sel:
-        html_list.append(ele["href"])
-
-    for link in html_list:
-        url = link
-        response = rq.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # get title
-        s = soup.find("h2", "hdline").text
-
-        # get title
-        s = soup.find_all("span", "mattr-val")
-        date_text = s[1].text + " 00:01"
-        date = datetime.datetime.strptime(date_text, '%Y-%m-%d %H:%M')
-        if ty[0] < date < ty[1]:
-            # get context
-            s = soup.find_all('span', attrs={'style': 'font-size:1.125em;'})
-            text = ""
-            for ele in s:
-                text += ele.text.replace("\n", "")
-            text = re.sub('[a-zA-Z]', '', text)
-            if match(text, keyword):
-                return [link, text[:30]]
-    return ["NO_URL", "找不到相符結果"]
+# project libs
+from botlib import BotConfig
+from botlib.botlogger import BotLogger
+from botlib.services.news.article import Article
+from botlib.services.news.fetcher import NewsFetcher
+from botlib.services.news.html_parser import HtmlParser
+from botlib.ttl_cache import TtlLruCache
+
+
+LISTING_URL = "https://web.ncku.edu.tw/p/403-1000-3094-1.php?Lang=zh-tw"
+# article links on listing page
+LISTING_STRAINER = HtmlParser.classes("mtitle")
+# title, date and text on article page
+ARTICLE_STRAINER = HtmlParser.tags("h2", "span")
+
+# crawled articles, url -> Article, an article is only fetched the first time it shows up on listing
+ARTICLES = TtlLruCache(2048, persist_path=BotConfig.NCKU_CACHE_PATH or None)
+atexit.register(ARTICLES.save)
+
+# listing page is reused for a while, so requests in a row don't fetch it again
+LISTING = TtlLruCache(1, ttl=BotConfig.NCKU_LISTING_TTL)
+
+
+def listing() -> list:
+    links = LISTING.get(LISTING_URL)
+    if links is None:
+        page = NewsFetcher.get(LISTING_URL)
+        if page is None:
+            return []
+        soup = HtmlParser.parse(page, LISTING_STRAINER)
+        links = [ele["href"] for ele in soup.select("div.mtitle a")]
+        LISTING.put(LISTING_URL, links)
+    return links
+
+
+def read_article(link: str, page: str):
+    soup = HtmlParser.parse(page, ARTICLE_STRAINER)
+
+    # get title
+    title = soup.find("h2", "hdline").text.strip()
+
+    # get date
+    s = soup.find_all("span", "mattr-val")
+    date_text = s[1].text + " 00:01"
+    date = datetime.datetime.strptime(date_text, '%Y-%m-%d %H:%M')
+
+    # get context
+    s = soup.find_all('span', attrs={'style': 'font-size:1.125em;'})
+    text = ""
+    for ele in s:
+        text += ele.text.replace("\n", "")
+
+    return Article(link, date, text, title)
+
+
+def crawl() -> list:
+    """
+    incremental crawl, only articles that are not in ARTICLES yet are fetched
+
+    :return: list of Article in listing order
+    """
+    links = listing()
+
+    # fetch all new articles at once
+    new_links = [link for link in links if ARTICLES.get(link) is None]
+    for link, page in zip(new_links, NewsFetcher.fetch_all(new_links)):
+        if page is None:
+            continue
+        try:
+            ARTICLES.put(link, read_article(link, page))
+        except (AttributeError, IndexError, ValueError) as e:
+            BotLogger.debug(f"Parsing NCKU Article {link} Failed, {type(e).__name__} : {e}")
+
+    if new_links:
+        BotLogger.debug(f"NCKU Crawled, {len(new_links)} New Of {len(links)} Articles.")
+
+    articles = [ARTICLES.get(link) for link in links]
+    return [article for article in articles if article is not None]
+
+
+def search(keyword: list, time_range: (datetime, datetime) = None):
+    # match against crawled articles, an empty keyword matches every article
+    # only articles inside time_range are yielded, so search_crawler answers NO_URL when none is in range
+    for article in crawl():
+        if time_range is not None and not time_range[0] < article.date < time_range[1]:
+            continue
+        text = re.sub('[a-zA-Z]', '', article.snippet)
+        if match(text, keyword):
+            yield Article(article.url, article.date, text[:30], article.title)
+
+
+def latest():
+    # every article on the listing page, for NewsIngester
+    return crawl()
 
 
 def match(content: str, keyword: list):
@@ -0,0 +1,153 @@
+import datetime
+import sqlite3
+import threading
+import time
+
+# project libs
+from botlib.bigram_fts import BigramFts
+from botlib.botlogger import BotLogger
+from botlib.services.news.article import Article
+
+
+
+class NewsIndex :
+    """
+    Local Searchable Index Of News Articles
+
+    文章存在 sqlite 中，title 與 body 建立 FTS5 全文索引（中文以二字詞切開，見 BigramFts），發布時間建立一般索引
+    所以可以直接在本地以「時間範圍 + 關鍵字 + 媒體」查詢，而不用每次都去爬網站
+    """
+
+    __SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS articles (
+            url TEXT PRIMARY KEY,
+            media TEXT NOT NULL,
+            title TEXT NOT NULL,
+            body TEXT NOT NULL,
+            published INTEGER NOT NULL,
+            ingested INTEGER NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS articles_published ON articles (published)",
+        "CREATE INDEX IF NOT EXISTS articles_media_published ON articles (media, published)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, body, tokenize = 'unicode61')",
+    ]
+
+
+    def __init__( self, path: str ) :
+        """
+        :param path: sqlite 檔案路徑，":memory:" 則只存在記憶體
+        """
+
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, check_same_thread = False)
+
+        with self.__lock, self.__db :
+            for statement in NewsIndex.__SCHEMA :
+                self.__db.execute(statement)
+
+            # FTS index 是以舊版 BigramFts 建立的，重建後把版本記在 user_version
+            if self.__db.execute("PRAGMA user_version").fetchone()[0] != BigramFts.VERSION :
+                self.__db.execute("DELETE FROM articles_fts")
+                self.__db.executemany("INSERT INTO articles_fts (rowid, title, body) VALUES (?, ?, ?)",
+                                      ((rowid, BigramFts.to_document(title), BigramFts.to_document(body))
+                                       for rowid, title, body in self.__db.execute("SELECT rowid, title, body FROM articles").fetchall()))
+                self.__db.execute(f"PRAGMA user_version = {BigramFts.VERSION}")
+
+
+    def add_articles( self, media: str, articles: list ) -> int :
+        """
+        新增文章，已經存在的 url 會被忽略
+
+        :param media: 媒體名稱（AvailableMedia 的 name）
+        :param articles: list of Article，snippet 當作內文
+        :return: 實際新增的文章數
+        """
+
+        now = int(time.time())
+        added = 0
+
+        with self.__lock, self.__db :
+            for article in articles :
+                cursor = self.__db.execute("INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?, ?)",
+                                           (article.url, media, article.title, article.snippet,
+                                            int(article.date.timestamp()), now))
+                if cursor.rowcount == 1 :
+                    self.__db.execute("INSERT INTO articles_fts (rowid, title, body) VALUES (?, ?, ?)",
+                                      (cursor.lastrowid, BigramFts.to_document(article.title),
+                                       BigramFts.to_document(article.snippet)))
+                    added += 1
+
+        return added
+
+
+    def missing( self, urls: list ) -> set :
+        """
+        :param urls: 文章網址 list
+        :return: 還不在 index 中的網址
+        """
+
+        known = set()
+        with self.__lock :
+            # sqlite 一個 statement 最多 999 個參數
+            for i in range(0, len(urls), 500) :
+                chunk = urls[i :i + 500]
+                known.update(url for url, in self.__db.execute(
+                    f"SELECT url FROM articles WHERE url IN ({', '.join('?' * len(chunk))})", chunk))
+
+        return set(urls) - known
+
+
+    def search( self, time_range: (datetime, datetime), keywords: list, media: str or None = None, limit = 1 ) -> list :
+        """
+        找出發布時間在範圍內，且 title 或 body 包含所有關鍵字的文章（新的在前）
+
+        :param time_range: (起始時間, 結束時間)
+        :param keywords: 關鍵字 list，空的話只依照時間範圍查詢
+        :param media: 只查詢這個媒體（AvailableMedia 的 name），None 表示所有媒體
+        :param limit: 最多回傳幾篇
+        :return: list of Article
+        """
+
+        sql = "SELECT url, title, body, published FROM articles WHERE published BETWEEN ? AND ?"
+        params = [int(time_range[0].timestamp()), int(time_range[1].timestamp())]
+
+        if media is not None :
+            sql += " AND media = ?"
+            params.append(media)
+
+        # FTS index 只用來縮小範圍，每個關鍵字都再以 instr 確認（見 BigramFts）
+        query = BigramFts.match_query(keywords)
+        if query is not None :
+            sql += " AND rowid IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)"
+            params.append(query)
+        for keyword in keywords :
+            sql += " AND (instr(lower(title), ?) > 0 OR instr(lower(body), ?) > 0)"
+            params += [keyword.lower(), keyword.lower()]
+
+        sql += " ORDER BY published DESC LIMIT ?"
+        params.append(limit)
+
+        try :
+            with self.__lock :
+                rows = self.__db.execute(sql, params).fetchall()
+        except sqlite3.Error as e :
+            BotLogger.exception(f"Searching News Index Failed, {type(e).__name__} : {e}")
+            return []
+
+        return [Article(url, datetime.datetime.fromtimestamp(published), body, title) for url, title, body, published in rows]
+
+
+    def stats( self ) -> dict :
+        """
+        :return: 各媒體的文章數與最新文章的發布時間
+        """
+
+        with self.__lock :
+            rows = self.__db.execute("SELECT media, COUNT(*), MAX(published) FROM articles GROUP BY media").fetchall()
+
+        return {
+            media : { "articles" : count, "newest" : datetime.datetime.fromtimestamp(newest).isoformat() }
+            for media, count, newest in rows
+        }
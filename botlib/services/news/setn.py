@@ -1,82 +1,95 @@
-import requests as rq
-from bs4 import BeautifulSoup
 import re
 import datetime
 
+# project libs
+from botlib.services.news.article import Article
+from botlib.services.news.fetcher import NewsFetcher
+from botlib.services.news.html_parser import HtmlParser
 
-html_list = []
-title_list = []
-content_list = []
-date_list = []
 
+SEARCH_URL = "https://www.setn.com/search.aspx?q="
+# links, titles and dates on search page
+SEARCH_STRAINER = HtmlParser.classes("newsimg-area-info", "newsimg-date")
 
-def parse(keyword: list, ty: (datetime, datetime)):
-    if_no_url = "NO_URL"
-    if_no_context = "找不到相符結果"
-    search_string = "https://www.setn.com/search.aspx?q="
-    if keyword:
-        last_page = False
-        for ele in keyword:
-            search_string = search_string + ele
-            if ele != keyword[-1]:
-                search_string = search_string + "%20"
-        for i in range(1, 6):
-            url = search_string + "&p=" + str(i)
-            response = rq.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            sel = soup.select("div.newsimg-area-info a")
 
-            # get_html
-            for ele in sel:
-                html_list.append("https://www.setn.com/" + ele["href"])
-            if len(html_list) < 36:
-                last_page = True
+def extract(page: str) -> list:
+    # articles on a search page
+    soup = HtmlParser.parse(page, SEARCH_STRAINER)
+    links = soup.select("div.newsimg-area-info a")
+    dates = soup.select("div.newsimg-date")
+    return [Article("https://www.setn.com/" + link["href"],
+                    datetime.datetime.strptime(date.text, '%Y/%m/%d %H:%M'),
+                    Article.clean(link.text))
+            for link, date in zip(links, dates)]
 
-            # get_date
-            for ele in soup.select("div.newsimg-date"):
-                date_list.append(ele.text)
 
-            # get_context
-            for ele in soup.select("div.newsimg-area-info a"):
-                content_list.append(ele.text)
+def search(keyword: list, time_range: (datetime, datetime) = None):
+    # time_range only saves requests, articles outside it are still yielded
+    search_string = SEARCH_URL + "%20".join(keyword)
+    # with a time range, page 1 is fetched alone first since it usually has the answer
+    # the rest are then fetched at once, pages after the caller stops are cancelled
+    urls = [search_string + "&p=" + str(i) for i in range(1, 6)]
+    for page in NewsFetcher.iter_fetch(urls, head=None if time_range is None else 1):
+        if page is None:
+            return
+        articles = extract(page)
+        yield from articles
+        # a full page has 36 results
+        if len(articles) < 36:
+            return
+        # newest first, later pages are even older
+        if time_range is not None and Article.all_before(articles, time_range[0]):
+            return
 
-            for j in range(0, len(html_list)):
-                date = datetime.datetime.strptime(str(date_list[j]), '%Y/%m/%d %H:%M')
-                if ty[0] <= date <= ty[1]:
-                    content_list[j] = re.sub('[a-zA-Z]', '', content_list[j])
-                    content_list[j] = content_list[j].replace(u'\u3000', u' ').replace('\n', '')
-                    return [html_list[j], content_list[j]]
-            if last_page:
-                break
-            if i == 1:
-                if_no_url = html_list[0]
-                content_list[0] = re.sub('[a-zA-Z]', '', content_list[0])
-                if_no_context = content_list[0].replace(u'\u3000', u' ').replace('\n', '')
-            html_list.clear()
-            date_list.clear()
-            content_list.clear()
 
-    else:
-        html_string = ""
-        content_string = ""
-        url = "https://www.setn.com/ViewAll.aspx?PageGroupID=0"
-        response = rq.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        sel = soup.select("h3.view-li-title a", limit=3)
-        for ele in sel:
-            html = ele["href"]
-            if html.find("http"):
-                html = "https://www.setn.com/" + html
-            html_string += html
-            response = rq.get(html)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            text = soup.find("div", id="ckuse").text
-            text = text.replace("\r", "").replace("\n", "")
-            text = text[text.find("報導")+2:text.find("報導")+52]
-            content_string += text
-            if ele != sel[-1]:
-                content_string += "\n"
-                html_string += "\n"
-        content_string = re.sub('[a-zA-Z]', '', content_string)
-        return [html_string, content_string]
-    return [if_no_url, if_no_context]
\ No newline at end of file
+def hot():
+    html_string = ""
+    content_string = ""
+    url = "https://www.setn.com/ViewAll.aspx?PageGroupID=0"
+    soup = HtmlParser.parse(NewsFetcher.get(url))
+    sel = soup.select("h3.view-li-title a", limit=3)
+    htmls = []
+    for ele in sel:
+        html = ele["href"]
+        if html.find("http"):
+            html = "https://www.setn.com/" + html
+        htmls.append(html)
+    # fetch the 3 articles at once
+    pages = NewsFetcher.fetch_all(htmls)
+    for ele, html, page in zip(sel, htmls, pages):
+        html_string += html
+        soup = HtmlParser.parse(page)
+        text = soup.find("div", id="ckuse").text
+        text = text.replace("\r", "").replace("\n", "")
+        text = text[text.find("報導")+2:text.find("報導")+52]
+        content_string += text
+        if ele != sel[-1]:
+            content_string += "\n"
+            html_string += "\n"
+    content_string = re.sub('[a-zA-Z]', '', content_string)
+    return [html_string, content_string]
+
+
+def latest():
+    # latest news listing, for NewsIngester
+    articles = []
+    now = datetime.datetime.now()
+    soup = HtmlParser.parse(NewsFetcher.get("https://www.setn.com/ViewAll.aspx?PageGroupID=0"))
+    for ele in soup.select("div.newsItems"):
+        link = ele.select_one("h3.view-li-title a")
+        date_text = ele.find("time")
+        if link is None or date_text is None:
+            continue
+        try:
+            # listing shows "MM/DD HH:MM" only
+            date = datetime.datetime.strptime(str(now.year) + "/" + date_text.text.strip(), '%Y/%m/%d %H:%M')
+        except ValueError:
+            continue
+        if date > now:
+            date = date.replace(year=now.year - 1)
+        html = link["href"]
+        if html.find("http"):
+            html = "https://www.setn.com/" + html
+        # same text search() answers with
+        articles.append(Article(html, date, Article.clean(link.text), link.text.strip()))
+    return articles
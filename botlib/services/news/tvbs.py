@@ -1,104 +1,104 @@
-import requests as rq
-from bs4 import BeautifulSoup
 import re
 import datetime
 
+# project libs
+from botlib.services.news.article import Article
+from botlib.services.news.fetcher import NewsFetcher
+from botlib.services.news.html_parser import HtmlParser
 
-html_list = []
-title_list = []
-content_list = []
-date_list = []
 
+SEARCH_URL = "https://news.tvbs.com.tw/news/searchresult/"
+# result count, links and dates on search page
+SEARCH_STRAINER = HtmlParser.classes("search_result", "search_list_text", "publish_date")
+# text on article page
+ARTICLE_STRAINER = HtmlParser.classes("article_content")
 
-def parse(keyword: list, ty: (datetime, datetime)):
-    if_no_url = "NO_URL"
-    if_no_context = "找不到相符結果"
-    search_string = "https://news.tvbs.com.tw/news/searchresult/"
-    if keyword:
-        for ele in keyword:
-            search_string = search_string + ele
-            if ele != keyword[-1]:
-                search_string = search_string + "%20"
-        search_string = search_string + "/news/"
-        response = rq.get(search_string)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        sel = soup.find("h1", "search_result").text
-        sel = sel[sel.find("結果共:")+5:sel.find("筆")-1]
 
-        if int(sel) != 0:
-            total_page = int(int(sel)/25) + 1
-            if total_page > 5:
-                total_page = 5
-            for i in range(1, total_page+1):
-                if i != 1:
-                    url = search_string + str(i)
-                    response = rq.get(url)
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                # get_html
-                sel = soup.select("div.search_list_text")
-                for ele in sel:
-                    w = ele.find("a")
-                    html_list.append(w["href"])
+def article_snippet(url: str) -> str:
+    # search results have no text, only fetched for the article actually used
+    soup = HtmlParser.parse(NewsFetcher.get(url), ARTICLE_STRAINER)
+    text_list = soup.find_all("div", {"class": "article_content"})
+    text = "".join(
+        t.text.replace("\r", "").replace("\n", "").replace('</p>', '').replace('<p>', '') for t in
+        text_list)
+    return Article.shorten(text)
 
-                # get_date
-                sel = soup.find_all("span", "publish_date display_none")
-                for ele in sel:
-                    date_list.append(ele.text)
 
-                for j in range(0, len(date_list)):
-                    date = datetime.datetime.strptime(str(date_list[j]), '%Y/%m/%d %H:%M')
-                    if ty[0] <= date <= ty[1]:
-                        response = rq.get(html_list[j])
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        text_list = soup.find_all("div", {"class": "article_content"})
-                        text = "".join(
-                            t.text.replace("\r", "").replace("\n", "").replace('</p>', '').replace('<p>', '') for t in
-                            text_list)
-                        text = re.sub('[a-zA-Z]', '', text)
-                        if text.find("。"):
-                            text = text[:text.find("。")]
-                        elif len(text) > 50:
-                            text = text[:50]
-                        return [html_list[j], text]
-                if i == 1:
-                    response = rq.get(html_list[0])
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    text_list = soup.find_all("div", {"class": "article_content"})
-                    text = "".join(
-                        t.text.replace("\r", "").replace("\n", "").replace('</p>', '').replace('<p>', '') for t in
-                        text_list)
-                    text = re.sub('[a-zA-Z]', '', text)
-                    if text.find("。"):
-                        text = text[:text.find("。")]
-                    elif len(text) > 50:
-                        text = text[:50]
-                    if_no_url = html_list[0]
-                    if_no_context = text
-                html_list.clear()
-                date_list.clear()
-                content_list.clear()
-    else:
-        html_string = ""
-        content_string = ""
-        url = "https://news.tvbs.com.tw/hot?from=click_hot"
-        response = rq.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        sel = soup.select("div.content_center_contxt_real_news li a", limit=3)
-        for ele in sel:
-            html_string += "https://news.tvbs.com.tw/" + ele["href"]
-            url = "https://news.tvbs.com.tw/" + ele["href"]
-            response = rq.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            se = soup.find_all("div", {"class": "article_content"})
-            text = "".join(t.text.replace("\r", "").replace("\n", "").replace('</p>', '').replace('<p>', '') for t in se)
-            text = text[0:50]
-            content_string += text
-            if ele != sel[-1]:
-                content_string += "\n"
-                html_string += "\n"
-        content_string = re.sub('[a-zA-Z]', '', content_string)
-        return [html_string, content_string]
-    return [if_no_url, if_no_context]
+def extract(page: str) -> (int or None, list):
+    # result count (only on first page) and articles on a search page
+    soup = HtmlParser.parse(page, SEARCH_STRAINER)
+    count = soup.find("h1", "search_result")
+    if count is not None:
+        count = count.text
+        count = int(count[count.find("結果共:")+5:count.find("筆")-1])
 
+    links = [ele.find("a") for ele in soup.select("div.search_list_text")]
+    dates = soup.find_all("span", "publish_date display_none")
+    return count, [Article(link["href"], datetime.datetime.strptime(date.text, '%Y/%m/%d %H:%M'), loader=article_snippet)
+                   for link, date in zip(links, dates)]
 
 
+def search(keyword: list, time_range: (datetime, datetime) = None):
+    # time_range only saves requests, articles outside it are still yielded
+    search_string = SEARCH_URL + "%20".join(keyword) + "/news/"
+    # page 1 tells how many pages there are, the rest (at most page 5) are then fetched at once
+    count, articles = extract(NewsFetcher.get(search_string) or "")
+    if not count:
+        return
+    yield from articles
+
+    total_page = min(int(count/25) + 1, 5)
+    urls = [search_string + str(i) for i in range(2, total_page+1)]
+    # newest first, later pages are even older
+    if time_range is not None and Article.all_before(articles, time_range[0]):
+        return
+    for page in NewsFetcher.iter_fetch(urls):
+        if page is None:
+            return
+        articles = extract(page)[1]
+        yield from articles
+        if time_range is not None and Article.all_before(articles, time_range[0]):
+            return
+
+
+def hot():
+    html_string = ""
+    content_string = ""
+    url = "https://news.tvbs.com.tw/hot?from=click_hot"
+    soup = HtmlParser.parse(NewsFetcher.get(url))
+    sel = soup.select("div.content_center_contxt_real_news li a", limit=3)
+    # fetch the 3 articles at once
+    articles = NewsFetcher.fetch_all(["https://news.tvbs.com.tw/" + ele["href"] for ele in sel])
+    for ele, article in zip(sel, articles):
+        html_string += "https://news.tvbs.com.tw/" + ele["href"]
+        soup = HtmlParser.parse(article, ARTICLE_STRAINER)
+        se = soup.find_all("div", {"class": "article_content"})
+        text = "".join(t.text.replace("\r", "").replace("\n", "").replace('</p>', '').replace('<p>', '') for t in se)
+        text = text[0:50]
+        content_string += text
+        if ele != sel[-1]:
+            content_string += "\n"
+            html_string += "\n"
+    content_string = re.sub('[a-zA-Z]', '', content_string)
+    return [html_string, content_string]
+
+
+def latest():
+    # realtime news listing, for NewsIngester
+    articles = []
+    soup = HtmlParser.parse(NewsFetcher.get("https://news.tvbs.com.tw/realtime"))
+    for ele in soup.select("div.news_list li"):
+        link = ele.find("a")
+        title = ele.find("h2")
+        date_text = ele.find("div", "time")
+        if link is None or title is None or date_text is None:
+            continue
+        try:
+            date = datetime.datetime.strptime(date_text.text.strip(), '%Y/%m/%d %H:%M')
+        except ValueError:
+            continue
+        html = link["href"]
+        if not html.startswith("http"):
+            html = "https://news.tvbs.com.tw" + html
+        articles.append(Article(html, date, title=title.text.strip(), loader=article_snippet))
+    return articles
@@ -0,0 +1,172 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# project libs
+from botlib.botlogger import BotLogger
+
+
+
+class TtlLruCache :
+    """
+    Thread-Safe LRU Cache With Per-Entry TTL
+
+    超過 max_size 時會移除最久沒被使用的 entry，過期的 entry 則會在被讀取時移除
+    有設定 persist_path 的話，可以用 save() 存到硬碟，下次建立時會自動讀回來（過期的不會讀回）
+    """
+
+    __MISSING = object()
+
+
+    def __init__( self, max_size: int, ttl: float or None = None, persist_path: str or None = None ) :
+        """
+        :param max_size: 最多保留幾個 entry
+        :param ttl: 預設的存活秒數，None 表示不會過期
+        :param persist_path: 持久化的檔案路徑，None 表示只存在記憶體
+        """
+
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.persist_path = persist_path
+
+        # key : (expire_at or None, value)
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+        if persist_path :
+            self.load()
+
+
+    def __len__( self ) -> int :
+        return len(self.__entries)
+
+
+    def get( self, key, default = None ) :
+        """
+        取得 key 對應的 value，過期或不存在則回傳 default
+
+        :param key: hashable key
+        :param default: cache miss 時的回傳值
+        :return: cached value or default
+        """
+
+        with self.__lock :
+            entry = self.__entries.get(key, TtlLruCache.__MISSING)
+
+            if entry is not TtlLruCache.__MISSING :
+                expire_at, value = entry
+                if expire_at is None or expire_at > time.time() :
+                    self.__entries.move_to_end(key)
+                    self.__hits += 1
+                    return value
+
+                del self.__entries[key]
+
+            self.__misses += 1
+            return default
+
+
+    def put( self, key, value, ttl: float or None = __MISSING ) -> None :
+        """
+        新增或更新一個 entry
+
+        :param key: hashable key
+        :param value: value to cache
+        :param ttl: 這個 entry 的存活秒數，不指定則使用預設 ttl，None 表示不會過期
+        :return: None
+        """
+
+        ttl = self.ttl if ttl is TtlLruCache.__MISSING else ttl
+        expire_at = None if ttl is None else time.time() + ttl
+
+        with self.__lock :
+            self.__entries[key] = (expire_at, value)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.max_size :
+                self.__entries.popitem(last = False)
+                self.__evictions += 1
+
+
+    def pop( self, key, default = None ) :
+        with self.__lock :
+            entry = self.__entries.pop(key, None)
+            return default if entry is None else entry[1]
+
+
+    def clear( self ) -> None :
+        with self.__lock :
+            self.__entries.clear()
+
+
+    def stats( self ) -> dict :
+        with self.__lock :
+            lookups = self.__hits + self.__misses
+            return {
+                "size" : len(self.__entries),
+                "max_size" : self.max_size,
+                "hits" : self.__hits,
+                "misses" : self.__misses,
+                "hit_rate" : self.__hits / lookups if lookups != 0 else 0.0,
+                "evictions" : self.__evictions,
+            }
+
+
+    # -------------------------------------------------------------------------------------------------------
+    # persistence
+
+    def save( self ) -> None :
+        """
+        將未過期的 entries 存到 persist_path（先寫到暫存檔再取代，避免寫到一半的檔案）
+
+        :return: None
+        """
+
+        if not self.persist_path :
+            return
+
+        now = time.time()
+        with self.__lock :
+            entries = [(key, entry) for key, entry in self.__entries.items() if entry[0] is None or entry[0] > now]
+
+        try :
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, "wb") as file :
+                pickle.dump(entries, file, protocol = pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.persist_path)
+            BotLogger.debug(f"Cache Saved To {self.persist_path} ({len(entries)} Entries).")
+
+        except Exception as e :
+            BotLogger.exception(f"Saving Cache To {self.persist_path} Failed, {type(e).__name__} : {e}")
+
+
+    def load( self ) -> None :
+        """
+        從 persist_path 讀回之前存下的 entries（檔案不存在則忽略）
+
+        :return: None
+        """
+
+        if not self.persist_path or not os.path.exists(self.persist_path) :
+            return
+
+        try :
+            with open(self.persist_path, "rb") as file :
+                entries = pickle.load(file)
+
+            now = time.time()
+            with self.__lock :
+                for key, (expire_at, value) in entries[-self.max_size :] :
+                    if expire_at is None or expire_at > now :
+                        self.__entries[key] = (expire_at, value)
+
+            BotLogger.debug(f"Cache Loaded From {self.persist_path} ({len(self.__entries)} Entries).")
+
+        except Exception as e :
+            BotLogger.exception(f"Loading Cache From {self.persist_path} Failed, {type(e).__name__} : {e}")
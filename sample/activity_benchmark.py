@@ -0,0 +1,288 @@
+"""
+Benchmark ActivityStore Search On Synthetic Activities
+
+fills a store with synthetic campus activities (kept in --db, so later runs reuse it), then runs searches with a time
+range of a day / a week / a year and zero to two keywords, reporting p50 / p99 latency and results per query
+--legacy also loads the same activities into the old activities table and runs the LIKE query search_activity used to build
+--threads runs adds and searches from parallel threads (half each) for --seconds, like webhook workers do
+--check runs the same searches through both plans of ActivityStore.search (instr on the time range, FTS index) on a
+small in-memory store and exits with 1 if they find different activities
+
+    python activity_benchmark.py --rows 1000000 --queries 200
+    python activity_benchmark.py --rows 100000 --legacy
+    python activity_benchmark.py --rows 100000 --threads 8 --legacy
+    python activity_benchmark.py --check
+"""
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from sys import path
+
+path.append("..")
+
+# proj libs
+from botlib.services.activity.activity_store import Activity, ActivityStore
+
+
+PLACES = ["榕園", "總圖", "活動中心", "系館", "宿舍", "光復校區", "成功校區", "自強校區", "力行校區", "大成館", "格致堂",
+          "成功湖", "未來館", "國際會議廳", "台南火車站", "安平古堡", "孔廟", "奇美博物館", "赤崁樓", "神農街"]
+HOSTS = ["資訊系", "電機系", "數學系", "物理系", "化學系", "中文系", "外文系", "歷史系", "建築系", "機械系", "土木系",
+         "學生會", "吉他社", "熱舞社", "攝影社"]
+TOPICS = ["人工智慧", "區塊鏈", "永續發展", "職涯", "創業", "程式設計", "量子計算", "半導體", "文學", "電影", "攝影",
+          "音樂", "登山", "烹飪", "桌遊", "心理健康", "自然語言處理", "機器學習", "資訊安全", "語音辨識"]
+KINDS = ["演講", "講座", "工作坊", "比賽", "展覽", "說明會", "音樂會", "市集", "讀書會", "迎新"]
+
+# contents with latin letters, digits and punctuation, next to the synthetic ones in --check
+MIXED = ["台北101跨年煙火zzqq", "NCKU AI Day 2020 人工智慧論壇", "C++ 程式設計工作坊（Python / Go）", "成大x台積電TSMC半導體說明會",
+         "Café 音樂會 ÉCOLE", "3/14 Pi Day 數學系 π 競賽"]
+# keywords --check always searches, besides substrings of the contents
+CHECK_KEYWORDS = [["北101"], ["zzq"], ["火z"], ["北"], ["ncku"], ["AI Day"], ["c++"], ["3/14"], ["x台積"], ["é"], ["π"]]
+
+# (hours of time range, keywords drawn from)
+QUERIES = {
+    "day, 1 keyword" : (24, [TOPICS]),
+    "day, 2 keywords" : (24, [PLACES, KINDS]),
+    "day, no keyword" : (24, []),
+    "week, 1 keyword" : (24 * 7, [TOPICS]),
+    "week, no keyword" : (24 * 7, []),
+    "year, 2 keywords" : (24 * 365, [HOSTS, TOPICS]),
+}
+
+FIRST_DAY = datetime.datetime(2019, 1, 1)
+DAYS = 365 * 5
+
+
+def synthetic( rows: int, rng: random.Random ) -> iter :
+    """
+    :return: iterator of (content, (start, end))
+    """
+
+    for _ in range(rows) :
+        start = FIRST_DAY + datetime.timedelta(days = rng.randrange(DAYS), hours = rng.randrange(8, 21))
+        end = start + datetime.timedelta(hours = rng.choice([1, 2, 3, 24, 72, 168]))
+        content = (f"{start.month}月{start.day}號{start.hour}點{rng.choice(HOSTS)}在{rng.choice(PLACES)}"
+                   f"舉辦{rng.choice(TOPICS)}{rng.choice(KINDS)}")
+        yield content, (start, end)
+
+
+def fill( store: ActivityStore, rows: int, seed: int ) -> None :
+    rng = random.Random(seed)
+    missing = rows - store.count()
+    started = time.perf_counter()
+
+    # contents can repeat, keep adding until the store has enough rows
+    while missing > 0 :
+        batch = [Activity(None, content, start, end) for content, (start, end) in synthetic(min(missing, 100000), rng)]
+        store.add_many(batch)
+        missing = rows - store.count()
+        print(f"  {store.count()} activities ({time.perf_counter() - started:.0f} s)")
+
+
+def fill_legacy( db: sqlite3.Connection, store: ActivityStore ) -> None :
+    if db.execute("SELECT COUNT(*) FROM activities").fetchone()[0] != 0 :
+        return
+
+    db.executemany("INSERT OR IGNORE INTO activities VALUES (?, ?, ?, ?, ?)",
+                   ((activity.content, activity.start.strftime("%Y%m%d%H%M"), activity.end.strftime("%Y%m%d%H%M"),
+                     activity.start.strftime("%Y/%m/%d %H:%M"), activity.end.strftime("%Y/%m/%d %H:%M"))
+                    for activity in store.scan()))
+    db.commit()
+
+
+def legacy_add( path: str, content: str, time_range: (datetime, datetime) ) -> bool :
+    # what create_activity did before ActivityStore : a new connection and a commit per call
+    db = sqlite3.connect(path)
+    db.execute("INSERT OR IGNORE INTO activities VALUES (?, ?, ?, ?, ?)",
+               (content, time_range[0].strftime("%Y%m%d%H%M"), time_range[1].strftime("%Y%m%d%H%M"),
+                time_range[0].strftime("%Y/%m/%d %H:%M"), time_range[1].strftime("%Y/%m/%d %H:%M")))
+    db.commit()
+    db.close()
+    return True
+
+
+def legacy_search( db: sqlite3.Connection, time_range: (datetime, datetime), keywords: list ) -> list :
+    # what search_activity did before ActivityStore
+    search_cmd = f"""
+        SELECT content from activities WHERE
+            {time_range[0].strftime("%Y%m%d%H%M")} <= end_datetime_value
+        AND
+            {time_range[1].strftime("%Y%m%d%H%M")} >= start_datetime_value
+    """
+    for kw in keywords :
+        search_cmd += f""" AND content LIKE "%{kw}%" """
+    return db.execute(search_cmd).fetchall()[:1]
+
+
+def bench( search, queries: int, seed: int ) -> None :
+    for name, (hours, vocabularies) in QUERIES.items() :
+        rng = random.Random(seed)
+        latencies = []
+        found = 0
+
+        for _ in range(queries) :
+            start = FIRST_DAY + datetime.timedelta(days = rng.randrange(DAYS))
+            time_range = (start, start + datetime.timedelta(hours = hours))
+            keywords = [rng.choice(vocabulary) for vocabulary in vocabularies]
+
+            started = time.perf_counter()
+            found += len(search(time_range, keywords))
+            latencies.append(time.perf_counter() - started)
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        print(f"  {name:<18} : p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  {found / queries:5.2f} results / query")
+
+
+def check_plans( rows: int, queries: int, seed: int ) -> list :
+    """
+    search the same time ranges and keywords with RANGE_SCAN_LIMIT forcing the instr plan and then the FTS plan
+    keywords are substrings of the stored contents (single characters, latin and digits, across scripts and punctuation)
+
+    :return: list of (time range, keywords, ids found by instr, ids found by FTS) that differ
+    """
+
+    rng = random.Random(seed)
+    store = ActivityStore(":memory:")
+    store.add_many([Activity(None, content, start, end) for content, (start, end) in synthetic(rows, rng)] +
+                   [Activity(None, content, FIRST_DAY, FIRST_DAY + datetime.timedelta(days = DAYS)) for content in MIXED])
+    contents = [activity.content for activity in store.scan()]
+
+    searches = [((FIRST_DAY, FIRST_DAY + datetime.timedelta(days = DAYS)), keywords) for keywords in CHECK_KEYWORDS]
+    for _ in range(queries) :
+        keywords = []
+        for _ in range(rng.randint(1, 2)) :
+            content = rng.choice(contents)
+            length = rng.randint(1, 5)
+            begin = rng.randrange(max(1, len(content) - length + 1))
+            keywords.append(content[begin :begin + length])
+        start = FIRST_DAY + datetime.timedelta(days = rng.randrange(DAYS))
+        searches.append(((start, start + datetime.timedelta(hours = rng.choice([24, 24 * 30, 24 * 365]))), keywords))
+
+    scan_limit = ActivityStore.RANGE_SCAN_LIMIT
+    mismatches = []
+    try :
+        for time_range, keywords in searches :
+            found = []
+            # every range is scanned, then no range is
+            for limit in (len(contents), -1) :
+                ActivityStore.RANGE_SCAN_LIMIT = limit
+                found.append(sorted(activity.id for activity in store.search(time_range, keywords, limit = len(contents))))
+            if found[0] != found[1] :
+                mismatches.append((time_range, keywords, *found))
+    finally :
+        ActivityStore.RANGE_SCAN_LIMIT = scan_limit
+
+    return mismatches
+
+
+def percentile( latencies: list, ratio: float ) -> float :
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * ratio))] * 1000 if latencies else 0.0
+
+
+def concurrent( add, search, threads: int, seconds: float, seed: int ) -> None :
+    """
+    half of the threads add activities, the other half search a day with one keyword
+    """
+
+    latencies = { "add" : [], "search" : [] }
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def work( index: int ) -> None :
+        rng = random.Random(seed + index)
+        kind = "add" if index % 2 == 0 else "search"
+        activities = synthetic(10 ** 9, rng)
+        mine = []
+
+        while time.perf_counter() < deadline :
+            started = time.perf_counter()
+            try :
+                if kind == "add" :
+                    content, time_range = next(activities)
+                    add(f"{content}（{index}-{len(mine)}）", time_range)
+                else :
+                    start = FIRST_DAY + datetime.timedelta(days = rng.randrange(DAYS))
+                    search((start, start + datetime.timedelta(days = 1)), [rng.choice(TOPICS)])
+            except sqlite3.Error as e :
+                with lock :
+                    errors.append(f"{type(e).__name__} : {e}")
+            mine.append(time.perf_counter() - started)
+
+        with lock :
+            latencies[kind].extend(mine)
+
+    workers = [threading.Thread(target = work, args = (index,)) for index in range(threads)]
+    for worker in workers :
+        worker.start()
+    for worker in workers :
+        worker.join()
+
+    for kind, samples in latencies.items() :
+        print(f"  {kind:<6} : {len(samples) / seconds:8.1f} / s  p50 {percentile(samples, 0.5):8.2f} ms  "
+              f"p99 {percentile(samples, 0.99):8.2f} ms")
+    print(f"  errors : {len(errors)} {sorted(set(errors))[:3]}")
+
+
+if __name__ == '__main__' :
+    arg_parser = ArgumentParser(description = "activity store search benchmark")
+    arg_parser.add_argument("--db", default = "activity_benchmark.db")
+    arg_parser.add_argument("--rows", type = int, default = 1000000)
+    arg_parser.add_argument("--queries", type = int, default = 200)
+    arg_parser.add_argument("--top-k", type = int, default = 5)
+    arg_parser.add_argument("--seed", type = int, default = 1)
+    arg_parser.add_argument("--legacy", action = "store_true", help = "also benchmark the old LIKE query")
+    arg_parser.add_argument("--threads", type = int, default = 0, help = "threads adding and searching at once")
+    arg_parser.add_argument("--seconds", type = float, default = 10.0)
+    arg_parser.add_argument("--check", action = "store_true", help = "compare both search plans on 5000 activities instead")
+    args = arg_parser.parse_args()
+
+    if args.check :
+        failures = check_plans(5000, args.queries * 10, args.seed)
+        for time_range, keywords, scanned, indexed in failures[:10] :
+            print(f"FAILED {keywords} in {time_range[0]} ~ {time_range[1]} : instr {scanned[:5]}, fts {indexed[:5]}")
+        print(f"{len(failures)} of {args.queries * 10 + len(CHECK_KEYWORDS)} searches differ between the plans")
+        sys.exit(1 if failures else 0)
+
+    activity_store = ActivityStore(args.db, mmap_size = 256 * 1024 * 1024, cache_size = 32 * 1024 * 1024, checkpoint_interval = 1.0)
+    print(f"filling {args.db}")
+    fill(activity_store, args.rows, args.seed)
+    size = sum(os.path.getsize(file) for file in (args.db, args.db + "-wal") if os.path.exists(file))
+    print(f"{activity_store.count()} activities, {size / 1024 / 1024:.0f} MiB")
+
+    print(f"ActivityStore.search (top {args.top_k})")
+    bench(lambda time_range, keywords : activity_store.search(time_range, keywords, limit = args.top_k), args.queries, args.seed)
+
+    if args.threads > 0 :
+        print(f"ActivityStore, {args.threads} threads")
+        concurrent(activity_store.add, activity_store.search, args.threads, args.seconds, args.seed)
+
+    if args.legacy :
+        legacy_path = os.path.splitext(args.db)[0] + "_legacy.db"
+        legacy_db = sqlite3.connect(legacy_path)
+        legacy_db.execute("""
+            CREATE TABLE IF NOT EXISTS activities (
+                content TEXT NOT NULL PRIMARY KEY,
+                start_datetime_value NUMERIC NOT NULL DEFAULT -1,
+                end_datetime_value NUMERIC NOT NULL DEFAULT -1,
+                start_datetime TEXT NOT NULL,
+                end_datetime TEXT NOT NULL
+            )""")
+        fill_legacy(legacy_db, activity_store)
+
+        print("old search_activity query (first result)")
+        bench(lambda time_range, keywords : legacy_search(legacy_db, time_range, keywords), max(1, args.queries // 10), args.seed)
+        legacy_db.close()
+
+        if args.threads > 0 :
+            print(f"old create_activity / search_activity, {args.threads} threads")
+            concurrent(lambda content, time_range : legacy_add(legacy_path, content, time_range),
+                       lambda time_range, keywords : legacy_search(sqlite3.connect(legacy_path), time_range, keywords),
+                       args.threads, args.seconds, args.seed)
@@ -0,0 +1,112 @@
+"""
+Benchmark DatetimeConverter.parse Against The Regex Cascade It Replaced
+
+runs both on a corpus of user utterances (the same way SemanticAnalyzer does), reports timings and any different outputs
+known differences are bugs of the old implementation : "兩週後" became an empty string, and a "從" before the range
+or a "到" without datetime (我要到台南) made the range start at current time
+
+    python datetime_benchmark.py --rounds 200
+"""
+import time
+from argparse import ArgumentParser
+from sys import path
+
+path.append("..")
+
+# proj libs
+from botlib.converter.datetime_converter import DatetimeConverter
+from datetime_legacy import LegacyDatetimeConverter
+
+
+CORPUS = [
+    "今天成功大學有什麼活動",
+    "明天成大有什麼演講",
+    "後天在光復校區舉辦的比賽",
+    "昨天的新聞",
+    "前天自由時報的報導",
+    "我想知道下週有哪些活動",
+    "上週有什麼考試",
+    "這禮拜有什麼展覽",
+    "下下個星期的遊行",
+    "這個月的賽事",
+    "下個月有什麼競賽",
+    "上上個月的新聞",
+    "今年有什麼展",
+    "去年的新聞",
+    "明年有哪些活動",
+    "三天前的新聞",
+    "五天後有什麼活動",
+    "5天三小時後有什麼活動",
+    "兩個小時後有什麼演講",
+    "十分鐘後有什麼活動",
+    "一個月後的考試",
+    "一年又兩個月前的報導",
+    "三月二十日到三月二十五日的展覽",
+    "十二月二十五日晚上八點的活動",
+    "十點十分在成功大學的演講",
+    "三點到五點有什麼活動",
+    "二零二一年三月一日舉辦的比賽",
+    "2021年3月1日有什麼活動",
+    "五月一號到五月三號的遊行",
+    "十月十日的新聞",
+    "以台語告訴我今天的新聞",
+    "用中文說明天有什麼活動",
+    "中時電子報三天前的報導",
+    "TVBS 昨天的新聞",
+    "聯合報今天的新聞",
+    "三立新聞台北101跨年活動",
+    "北捷明天有什麼活動",
+    "台大下個月有什麼演講",
+    "我要查詢成功大學光復宿舍的活動",
+    "有什麼活動",
+    "兩週後的比賽",
+    "從明天到後天的活動",
+    "我要到台南看明天的展覽",
+]
+
+
+def run_legacy( text: str ) -> (str, tuple) :
+    # SemanticAnalyzer used to standardize, then extract_datetime standardized it once more
+    parsed_content = LegacyDatetimeConverter.standardize_datetime(text)
+    try :
+        time_range = LegacyDatetimeConverter.extract_datetime(parsed_content)
+    except Exception as e :
+        time_range = f"{type(e).__name__} : {e}"
+    return parsed_content, time_range
+
+
+def run_parse( text: str ) -> (str, tuple) :
+    return DatetimeConverter.parse(text)
+
+
+def bench( func, rounds: int ) -> float :
+    start = time.perf_counter()
+    for _ in range(rounds) :
+        for text in CORPUS :
+            func(text)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__' :
+    arg_parser = ArgumentParser(description = "DatetimeConverter benchmark")
+    arg_parser.add_argument("--rounds", type = int, default = 200)
+    args = arg_parser.parse_args()
+
+    # compare outputs first
+    different = []
+    for text in CORPUS :
+        legacy, new = run_legacy(text), run_parse(text)
+        if legacy != new :
+            different.append((text, legacy, new))
+
+    print(f"same output : {len(CORPUS) - len(different)} / {len(CORPUS)}")
+    for text, legacy, new in different :
+        print(f"  {text}\n    legacy : {legacy}\n    parse  : {new}")
+
+    legacy_time = bench(run_legacy, args.rounds)
+    parse_time = bench(run_parse, args.rounds)
+    calls = args.rounds * len(CORPUS)
+
+    print(f"legacy  : {legacy_time:.3f} s ({legacy_time / calls * 1e6:.1f} us / utterance)")
+    print(f"parse   : {parse_time:.3f} s ({parse_time / calls * 1e6:.1f} us / utterance)")
+    print(f"speedup : {legacy_time / parse_time:.1f}x")
@@ -1,5 +1,11 @@
 import os
 import json
+import queue
+import threading
+import time
+from argparse import ArgumentParser
+from collections import deque
+
 import hanlp
 
 from flask import abort, Flask, jsonify, request
@@ -9,6 +15,168 @@ from flask import abort, Flask, jsonify, request
 app = Flask(__name__)
 HanLP = hanlp.load(hanlp.pretrained.mtl.CLOSE_TOK_POS_NER_SRL_DEP_SDP_CON_ELECTRA_SMALL_ZH)
 
+# dict_combine is a global state of the model, so setting dict and running model must be done together
+MODEL_LOCK = threading.Lock()
+
+
+def tokenize( sentence_list: list, custom_dict: dict ) -> list :
+    """
+    tokenize sentences base on custom_dict
+
+    :return: ws_result
+    """
+
+    with MODEL_LOCK :
+        # set custom dict (low priority, combine tokens after ws)
+        HanLP['tok/fine'].dict_combine = custom_dict
+        return HanLP(sentence_list)['tok/fine']
+
+
+def tag( ws_result: list ) -> (list, list) :
+    """
+    do pos and ner base on tokens, custom dict only matters to tokenize
+
+    :return: (pos_result, ner_result)
+    """
+
+    with MODEL_LOCK :
+        pn_result = HanLP(ws_result, tasks = ['pos', 'ner'], skip_tasks = 'tok*')
+    return pn_result['pos/ctb'], pn_result['ner/msra']
+
+
+def run_model( sentence_list: list, custom_dict: dict ) -> (list, list, list) :
+    """
+    tokenize sentences base on custom_dict, then do pos and ner base on tokens
+
+    :return: (ws_result, pos_result, ner_result)
+    """
+
+    ws_result = tokenize(sentence_list, custom_dict)
+    return (ws_result, *tag(ws_result))
+
+
+class DynamicBatcher :
+    """
+    Queue Sentences Of Concurrent Requests And Run The Model Once Per Batch
+
+    a batch is closed when it has max_batch sentences or its first request waited max_latency seconds,
+    requests with different custom dicts can't share tokenize, so a batch tokenizes once per distinct custom dict,
+    then does pos and ner once over the tokens of the whole batch
+    """
+
+
+    class Job :
+        __slots__ = ("sentences", "custom_dict", "result", "done")
+
+
+        def __init__( self, sentences: list, custom_dict: dict ) :
+            self.sentences = sentences
+            self.custom_dict = custom_dict
+            self.result = None
+            self.done = threading.Event()
+
+
+    def __init__( self, max_batch: int, max_latency: float, history = 100 ) :
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.__queue = queue.Queue()
+
+        # timings of recent batches
+        self.timings = deque(maxlen = history)
+
+        threading.Thread(target = self.__loop, name = "DynamicBatcher", daemon = True).start()
+
+
+    def parse( self, sentences: list, custom_dict: dict ) -> (list, list, list) :
+        job = DynamicBatcher.Job(sentences, custom_dict)
+        self.__queue.put(job)
+        job.done.wait()
+
+        if isinstance(job.result, Exception) :
+            raise job.result
+        return job.result
+
+
+    def __loop( self ) :
+
+        while True :
+            batch = [self.__queue.get()]
+            opened = time.perf_counter()
+            size = len(batch[0].sentences)
+
+            # collect until batch is full or latency budget is used up
+            while size < self.max_batch :
+                remaining = self.max_latency - (time.perf_counter() - opened)
+                if remaining <= 0 :
+                    break
+                try :
+                    job = self.__queue.get(timeout = remaining)
+                except queue.Empty :
+                    break
+                batch.append(job)
+                size += len(job.sentences)
+
+            self.__run(batch, opened)
+
+
+    def __run( self, batch: list, opened: float ) :
+
+        started = time.perf_counter()
+
+        groups = { }
+        for job in batch :
+            groups.setdefault(json.dumps(job.custom_dict, sort_keys = True, ensure_ascii = False), []).append(job)
+
+        # tokenize once per custom dict, a failed group doesn't stop the others
+        tokenized = []
+        for group in groups.values() :
+            try :
+                ws_result = tokenize([sentence for job in group for sentence in job.sentences], group[0].custom_dict)
+            except Exception as e :
+                for job in group :
+                    job.result = e
+                    job.done.set()
+                continue
+
+            offset = 0
+            for job in group :
+                end = offset + len(job.sentences)
+                tokenized.append((job, ws_result[offset :end]))
+                offset = end
+
+        # pos and ner once for the whole batch, then give each request its own slice
+        try :
+            if tokenized :
+                pos_result, ner_result = tag([tokens for job, ws_result in tokenized for tokens in ws_result])
+                offset = 0
+                for job, ws_result in tokenized :
+                    end = offset + len(ws_result)
+                    job.result = (ws_result, pos_result[offset :end], ner_result[offset :end])
+                    offset = end
+
+        except Exception as e :
+            for job, ws_result in tokenized :
+                job.result = e
+
+        finally :
+            for job, ws_result in tokenized :
+                job.done.set()
+
+        finished = time.perf_counter()
+        timing = {
+            "requests" : len(batch),
+            "sentences" : sum(len(job.sentences) for job in batch),
+            "tokenize_calls" : len(groups),
+            "wait_ms" : round((started - opened) * 1000, 2),
+            "run_ms" : round((finished - started) * 1000, 2),
+        }
+        self.timings.append(timing)
+        app.logger.info(f"HanLP Batch : {timing}")
+
+
+# created when server runs with --batching
+batcher = None
+
 
 @app.route('/')
 def index() :
@@ -19,12 +187,12 @@ def index() :
 def nlp() :
     # TODO : ADD LOG FOR THIS
     try :
-        # get json content from post request
-        try :
-            post_data = json.loads(request.get_json())
-        except TypeError :
-            # curl POST will be here
-            post_data = request.get_json()
+        # get json content from post request (a dict for curl and current clients)
+        post_data = request.get_json()
+
+        # old clients double-encode the body as a json string
+        if type(post_data) is str :
+            post_data = json.loads(post_data)
 
         # try to extract useful data from dict
         sentence_list = post_data["sentences"]
@@ -35,20 +203,17 @@ def nlp() :
         if type(custom_dict) is not dict :
             raise TypeError
 
-        # set custom dict (low priority, combine tokens after ws)
-        HanLP['tok/fine'].dict_combine = custom_dict
-
-        # tokenize sentences base on custom_dict
-        ws_result = HanLP(sentence_list)['tok/fine']
-
-        # do pos and ner base on tokens
-        pn_result = HanLP(ws_result, tasks = ['pos', 'ner'], skip_tasks = 'tok*')
+        # run model with sentences of other requests in batching mode, or run it for this request only
+        if batcher is not None :
+            ws_result, pos_result, ner_result = batcher.parse(sentence_list, custom_dict)
+        else :
+            ws_result, pos_result, ner_result = run_model(sentence_list, custom_dict)
 
         # return ws, pos, ner result as json(dict)
         result = {
             "WS" : ws_result,
-            "POS" : pn_result['pos/ctb'],
-            "NER" : pn_result['ner/msra']
+            "POS" : pos_result,
+            "NER" : ner_result
         }
 
         return jsonify(result)
@@ -62,5 +227,29 @@ def nlp() :
         return jsonify(error_msg)
 
 
+@app.route("/stats")
+def stats() :
+    if batcher is None :
+        return jsonify({ "batching" : False })
+
+    timings = list(batcher.timings)
+    return jsonify({
+        "batching" : True,
+        "max_batch" : batcher.max_batch,
+        "max_latency" : batcher.max_latency,
+        "recent_batches" : timings,
+    })
+
+
 if __name__ == '__main__' :
-    app.run(host = '0.0.0.0', port = 7778, debug = True)
\ No newline at end of file
+    arg_parser = ArgumentParser(description = "Flask-HanLP API")
+    arg_parser.add_argument("--batching", action = "store_true", help = "batch sentences of concurrent requests")
+    arg_parser.add_argument("--max-batch", type = int, default = 64, help = "max sentences per batch")
+    arg_parser.add_argument("--max-latency", type = float, default = 0.02, help = "max seconds a batch waits for more requests")
+    args = arg_parser.parse_args()
+
+    if args.batching :
+        batcher = DynamicBatcher(args.max_batch, args.max_latency)
+
+    # batching needs concurrent requests, and the reloader would load the model twice
+    app.run(host = '0.0.0.0', port = 7778, debug = not args.batching, threaded = True)
@@ -0,0 +1,78 @@
+"""
+Offline Load Test For AsyncLabApi Against lab_stub_server
+
+    python lab_load_test.py --requests 500 --delay 0.05
+"""
+import asyncio
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from sys import path
+
+path.append("..")
+
+# proj libs
+from botlib import BotConfig
+from botlib.api.async_labapi import AsyncLabApi
+from lab_stub_server import serve, SERVICES
+
+
+async def timed( coroutine ) -> float :
+    start = time.perf_counter()
+    await coroutine
+    return time.perf_counter() - start
+
+
+async def run( total: int, delay: float, framed: bool, base_port: int ) :
+
+    await serve("127.0.0.1", base_port, delay, framed)
+
+    # point lab api to the stand-in servers
+    host_ports = [("127.0.0.1", base_port + i) for i in range(len(SERVICES))]
+    BotConfig.LAB_NER_HOST_PORT, BotConfig.LAB_C2T_HOST_PORT, BotConfig.LAB_TSTT_HOST_PORT, BotConfig.LAB_T2C_HOST_PORT = host_ports
+    BotConfig.LAB_KEEP_ALIVE_HOST_PORTS = host_ports if framed else []
+
+    wav = Path(tempfile.mkstemp(suffix = ".wav")[1])
+    wav.write_bytes(b"RIFF" + bytes(40) + bytes(32000))
+
+    # c2t writes the speech it receives into AUDIO_OUTPUT_TMP_DIR, keep them out of the project's tmp dir
+    output_dir = tempfile.TemporaryDirectory()
+    BotConfig.AUDIO_OUTPUT_TMP_DIR = output_dir.name
+
+    # mix of all four apis
+    calls = []
+    for i in range(total) :
+        kind = i % 4
+        if kind == 0 :
+            calls.append(AsyncLabApi.lab_ner_api(f"今天成功大學有什麼活動 {i}"))
+        elif kind == 1 :
+            calls.append(AsyncLabApi.lab_c2t_api(f"load_test_{i % 16}", "我今天肚子不舒服"))
+        elif kind == 2 :
+            calls.append(AsyncLabApi.lab_tstt_api(wav))
+        else :
+            calls.append(AsyncLabApi.lab_t2c_api("tai_text"))
+
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*[timed(call) for call in calls]))
+    elapsed = time.perf_counter() - start
+
+    wav.unlink()
+    output_dir.cleanup()
+
+    print(f"requests   : {total} (server delay {delay * 1000:.0f} ms, framed = {framed})")
+    print(f"elapsed    : {elapsed:.3f} s")
+    print(f"throughput : {total / elapsed:.1f} req/s")
+    print(f"p50        : {latencies[len(latencies) // 2] * 1000:.1f} ms")
+    print(f"p99        : {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.1f} ms")
+
+
+if __name__ == '__main__' :
+    arg_parser = ArgumentParser(description = "AsyncLabApi offline load test")
+    arg_parser.add_argument("--requests", type = int, default = 400)
+    arg_parser.add_argument("--delay", type = float, default = 0.05)
+    arg_parser.add_argument("--framed", action = "store_true")
+    arg_parser.add_argument("--base-port", type = int, default = 50100)
+    args = arg_parser.parse_args()
+
+    asyncio.get_event_loop().run_until_complete(run(args.requests, args.delay, args.framed, args.base_port))
@@ -0,0 +1,92 @@
+"""
+Local Stand-In For WMMKS Lab's APIs (NER, C2T, TSTT, T2C)
+
+speaks the same framing as LabProtocol : ">I" length + token + "@@@" + payload,
+and answers with canned responses after an optional delay, so LabApi / AsyncLabApi can be load-tested offline
+
+    python lab_stub_server.py --base-port 50100 --delay 0.05
+    => NER : 50100, C2T : 50101, TSTT : 50102, T2C : 50103
+"""
+import asyncio
+import json
+import struct
+from argparse import ArgumentParser
+
+
+SERVICES = ["NER", "C2T", "TSTT", "T2C"]
+
+
+def make_response( service: str, payload: bytes ) -> bytes :
+
+    if service == "NER" :
+        text = payload.decode("utf-8")
+        return json.dumps({ "text" : text, "ner" : [] }, ensure_ascii = False).encode("utf-8")
+
+    if service == "C2T" :
+        # fake wav : 44 bytes header + 1 second of 16khz 16bit silence
+        return b"RIFF" + bytes(40) + bytes(32000)
+
+    if service == "TSTT" :
+        # audio payload is "main"(8s) + "P" + wav bytes
+        return f"1.tai_{len(payload) - 9} 2.candidate".encode("utf-8")
+
+    # T2C, echo the text back
+    return payload
+
+
+async def handle( service: str, delay: float, framed: bool, reader: asyncio.StreamReader, writer: asyncio.StreamWriter ) :
+
+    try :
+        while True :
+            try :
+                (length,) = struct.unpack(">I", await reader.readexactly(4))
+                body = await reader.readexactly(length)
+            except asyncio.IncompleteReadError :
+                break
+
+            token, payload = body.split(b"@@@", 1)
+            if delay > 0 :
+                await asyncio.sleep(delay)
+
+            response = make_response(service, payload)
+
+            # framed (keep-alive) mode keeps the connection open for the next request
+            if framed :
+                writer.write(struct.pack(">I", len(response)) + response)
+                await writer.drain()
+            else :
+                writer.write(response)
+                await writer.drain()
+                break
+
+    finally :
+        writer.close()
+
+
+async def serve( host: str, base_port: int, delay = 0.0, framed = False ) -> list :
+    """
+    start one server per service on base_port, base_port + 1, ...
+
+    :return: list of asyncio servers
+    """
+
+    servers = []
+    for i, service in enumerate(SERVICES) :
+        callback = lambda r, w, s = service : handle(s, delay, framed, r, w)
+        servers.append(await asyncio.start_server(callback, host, base_port + i))
+    return servers
+
+
+if __name__ == '__main__' :
+    arg_parser = ArgumentParser(description = "Stand-in server for WMMKS Lab's APIs")
+    arg_parser.add_argument("--host", default = "127.0.0.1")
+    arg_parser.add_argument("--base-port", type = int, default = 50100)
+    arg_parser.add_argument("--delay", type = float, default = 0.0, help = "seconds before each response")
+    arg_parser.add_argument("--framed", action = "store_true", help = "reply with >I length prefix and keep connections open")
+    args = arg_parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(serve(args.host, args.base_port, args.delay, args.framed))
+    for i, name in enumerate(SERVICES) :
+        print(f"{name} : {args.host}:{args.base_port + i}")
+    loop.run_forever()
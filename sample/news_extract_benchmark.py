@@ -0,0 +1,135 @@
+"""
+Benchmark Crawler HTML Extraction Over Saved Pages
+
+runs each crawler's extract function on saved search / article pages with every parser backend (html.parser, and lxml
+if installed), building the whole tree or only the containers in the crawler's SoupStrainer
+reports cpu time and peak memory per page, and checks every setting extracts the same articles as the full html.parser tree
+exits with 1 if, for any backend, the targeted parse extracts different articles than the full tree (or none at all)
+the default fixtures are the synthetic pages of news_pages.py (python news_pages.py --extract news_extract_fixtures)
+
+    python news_extract_benchmark.py --rounds 20
+    python news_extract_benchmark.py --check                # only compare outputs, for ci
+    python news_extract_benchmark.py --save 成功大學 --fixtures live_fixtures   # save the current search results instead
+"""
+import os
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from sys import path
+from urllib.parse import quote
+
+# project root, so the script also runs from other directories (e.g. the project root in CI)
+path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# proj libs
+from botlib.services.news import chinatimes, ettoday, ltn, ncku, setn, tvbs
+from botlib.services.news.fetcher import NewsFetcher
+from botlib.services.news.html_parser import HtmlParser, lxml
+
+
+# fixture name prefix -> (first search page url of a keyword, extract function)
+SITES = {
+    "ltn" : (lambda keyword : ltn.SEARCH_URL + keyword + "+&page=1", ltn.extract),
+    "ettoday" : (lambda keyword : ettoday.SEARCH_URL + keyword + "+&page=1", ettoday.extract),
+    "chinatimes" : (lambda keyword : chinatimes.SEARCH_URL + keyword + "%20?page1", chinatimes.extract),
+    "setn" : (lambda keyword : setn.SEARCH_URL + keyword + "&p=1", setn.extract),
+    "tvbs" : (lambda keyword : tvbs.SEARCH_URL + keyword + "/news/", lambda page : tvbs.extract(page)[1]),
+    "ncku" : (None, lambda page : [ncku.read_article("fixture", page)]),
+}
+
+SETTINGS = [("html.parser", False), ("html.parser", True)] + ([("lxml", False), ("lxml", True)] if lxml is not None else [])
+
+
+def save_fixtures( directory: str, keyword: str ) -> None :
+    os.makedirs(directory, exist_ok = True)
+
+    for name, (url_of, extract) in SITES.items() :
+        if url_of is None :
+            continue
+        page = NewsFetcher.get(url_of(quote(keyword)))
+        if page is not None :
+            with open(os.path.join(directory, f"{name}_search.html"), "w", encoding = "utf-8") as file :
+                file.write(page)
+
+    # newest ncku article
+    links = ncku.listing()
+    page = NewsFetcher.get(links[0]) if links else None
+    if page is not None :
+        with open(os.path.join(directory, "ncku_article.html"), "w", encoding = "utf-8") as file :
+            file.write(page)
+
+
+def run( extract, page: str, backend: str, targeted: bool ) -> list :
+    HtmlParser.BACKEND, HtmlParser.TARGETED = backend, targeted
+    # repr does not trigger lazy snippet loaders
+    return [repr(article) for article in extract(page) or []]
+
+
+def bench( extract, page: str, backend: str, targeted: bool, rounds: int ) -> (float, float) :
+    """
+    :return: (cpu ms per page, peak memory KiB)
+    """
+
+    tracemalloc.start()
+    run(extract, page, backend, targeted)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    started = time.process_time()
+    for _ in range(rounds) :
+        run(extract, page, backend, targeted)
+    cpu = time.process_time() - started
+
+    return cpu / rounds * 1000, peak / 1024
+
+
+if __name__ == '__main__' :
+    arg_parser = ArgumentParser(description = "news crawler extraction benchmark")
+    arg_parser.add_argument("--fixtures", default = os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_extract_fixtures"))
+    arg_parser.add_argument("--save", metavar = "KEYWORD", help = "fetch and save fixtures before benchmarking")
+    arg_parser.add_argument("--rounds", type = int, default = 20)
+    arg_parser.add_argument("--check", action = "store_true", help = "only check targeted and full tree outputs are the same")
+    args = arg_parser.parse_args()
+
+    if args.save :
+        save_fixtures(args.fixtures, args.save)
+
+    if lxml is None :
+        print("lxml is not installed, only html.parser is benchmarked and checked")
+
+    failures = []
+
+    for filename in sorted(os.listdir(args.fixtures)) :
+        site = filename.split("_")[0]
+        if site not in SITES :
+            continue
+
+        with open(os.path.join(args.fixtures, filename), encoding = "utf-8") as file :
+            page = file.read()
+        extract = SITES[site][1]
+
+        expected = run(extract, page, "html.parser", False)
+        print(f"{filename} ({len(page) / 1024:.0f} KiB, {len(expected)} articles)")
+        if expected == [] :
+            failures.append(f"{filename} : no article extracted")
+
+        # the strainer must not change what each backend extracts
+        for backend in sorted({ backend for backend, _ in SETTINGS }) :
+            if run(extract, page, backend, True) != run(extract, page, backend, False) :
+                failures.append(f"{filename} : {backend} targeted and full tree differ")
+
+        if args.check :
+            continue
+
+        baseline = None
+        for backend, targeted in SETTINGS :
+            cpu, peak = bench(extract, page, backend, targeted, args.rounds)
+            baseline = baseline or (cpu, peak)
+            same = "" if run(extract, page, backend, targeted) == expected else "  DIFFERENT OUTPUT"
+            print(f"  {backend:<11} {'targeted' if targeted else 'full tree':<9} : "
+                  f"{cpu:8.2f} ms ({baseline[0] / cpu:4.1f}x)  {peak:8.0f} KiB ({baseline[1] / peak:4.1f}x){same}")
+
+    for failure in failures :
+        print(f"FAILED {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,166 @@
+"""
+Offline Load Test For News Crawlers Against news_stub_server
+
+first record the pages one search of every media fetches, then replay them from the stand-in server with latency and
+jitter, running each crawler's search (news.search_crawler, what search_news calls) under load
+reports throughput, p50 / p99 latency, requests per query and peak RSS, and exits with 1 if p99 exceeds --max-p99-ms
+
+news_load_fixtures is recorded with --synthesize (pages from news_pages.page_for, no network), --record uses the live sites
+
+    python news_load_test.py --synthesize 成功大學 --days 30
+    python news_load_test.py --record 成功大學 --days 30 --fixtures news_live_fixtures
+
+CI (the committed fixtures, from any directory, exits with 1 on a p99 regression) :
+
+    python sample/news_load_test.py --queries 50 --concurrency 8 --delay 0.08 --jitter 0.04 --max-p99-ms 2000
+"""
+import datetime
+import hashlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from sys import path
+
+# project root, so the script also runs from other directories (e.g. the project root in CI)
+path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# proj libs
+from botlib.services import news
+from botlib.services.news import ncku
+from botlib.services.news.fetcher import NewsFetcher
+from news_pages import page_for
+from news_stub_server import rewrite, serve
+
+
+ORIGINAL_GET = NewsFetcher.get
+
+# recorded_at in meta.json
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def record( directory: str, keywords: list, days: int, get = ORIGINAL_GET,
+            recorded_at: datetime.datetime or None = None ) -> None :
+    """
+    :param get: fetches the pages, NewsFetcher.get for the live sites
+    :param recorded_at: end of the searched time range, now by default
+    """
+
+    os.makedirs(directory, exist_ok = True)
+
+    index = { }
+    lock = threading.Lock()
+
+    def recording_get( url: str ) -> str or None :
+        page = get(url)
+        if page is not None :
+            with lock :
+                if url not in index :
+                    # named after the url, so recording again gives the same files
+                    index[url] = hashlib.sha1(url.encode()).hexdigest()[:16] + ".html"
+                    with open(os.path.join(directory, index[url]), "w", encoding = "utf-8") as file :
+                        file.write(page)
+        return page
+
+    NewsFetcher.get = staticmethod(recording_get)
+    recorded_at = recorded_at or datetime.datetime.now().replace(microsecond = 0)
+    time_range = (recorded_at - datetime.timedelta(days = days), recorded_at)
+
+    for media, crawler in news.CRAWLERS.items() :
+        result = news.search_crawler(time_range, keywords, crawler)
+        print(f"{media.name:<10} : {result[0]}")
+
+    NewsFetcher.get = staticmethod(ORIGINAL_GET)
+
+    with open(os.path.join(directory, "index.json"), "w", encoding = "utf-8") as file :
+        json.dump(index, file, ensure_ascii = False, indent = 1, sort_keys = True)
+    with open(os.path.join(directory, "meta.json"), "w", encoding = "utf-8") as file :
+        json.dump({ "keywords" : keywords, "days" : days, "recorded_at" : recorded_at.strftime(TIME_FORMAT) }, file, ensure_ascii = False)
+
+    print(f"{len(index)} pages recorded in {directory}")
+
+
+def run( server, port: int, directory: str, queries: int, concurrency: int, warmup: int, max_p99_ms: float or None ) -> bool :
+
+    with open(os.path.join(directory, "meta.json"), encoding = "utf-8") as file :
+        meta = json.load(file)
+
+    # same time range as recording, so the same pages are requested
+    recorded_at = datetime.datetime.strptime(meta["recorded_at"], TIME_FORMAT)
+    time_range = (recorded_at - datetime.timedelta(days = meta["days"]), recorded_at)
+    keywords = meta["keywords"]
+
+    NewsFetcher.get = staticmethod(lambda url : ORIGINAL_GET(rewrite(url, port)))
+
+    def timed_search( crawler ) -> float :
+        start = time.perf_counter()
+        news.search_crawler(time_range, keywords, crawler)
+        return time.perf_counter() - start
+
+    print(f"queries    : {queries} per media, {concurrency} at once, keywords = {keywords}")
+    print(f"{'media':<10} {'q/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'req/query':>10} {'missing':>8} {'peak rss':>10}")
+
+    passed = True
+    for media, crawler in news.CRAWLERS.items() :
+        # connections to the stand-in are opened before measuring
+        with ThreadPoolExecutor(max_workers = concurrency) as executor :
+            list(executor.map(timed_search, [crawler] * warmup))
+
+        # ncku starts with nothing crawled, the first queries fetch every article
+        ncku.ARTICLES.clear()
+        ncku.LISTING.clear()
+
+        requests_before, missing_before = server.requests, server.missing
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers = concurrency) as executor :
+            latencies = sorted(executor.map(timed_search, [crawler] * queries))
+        elapsed = time.perf_counter() - start
+
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{media.name:<10} {queries / elapsed:8.1f} {p50:9.1f} {p99:9.1f} "
+              f"{(server.requests - requests_before) / queries:10.1f} {server.missing - missing_before:8d} {rss:8.1f} MB")
+
+        if max_p99_ms is not None and p99 > max_p99_ms :
+            passed = False
+
+    NewsFetcher.get = staticmethod(ORIGINAL_GET)
+    return passed
+
+
+if __name__ == '__main__' :
+    arg_parser = ArgumentParser(description = "news crawler offline load test")
+    arg_parser.add_argument("--fixtures", default = os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_load_fixtures"))
+    arg_parser.add_argument("--record", metavar = "KEYWORD", nargs = "+", help = "record pages from live sites instead")
+    arg_parser.add_argument("--synthesize", metavar = "KEYWORD", nargs = "+", help = "record synthetic pages instead")
+    arg_parser.add_argument("--days", type = int, default = 30, help = "time range of recorded search")
+    arg_parser.add_argument("--queries", type = int, default = 50)
+    arg_parser.add_argument("--concurrency", type = int, default = 8)
+    arg_parser.add_argument("--warmup", type = int, default = 8, help = "queries per media before measuring")
+    arg_parser.add_argument("--delay", type = float, default = 0.08)
+    arg_parser.add_argument("--jitter", type = float, default = 0.04)
+    arg_parser.add_argument("--port", type = int, default = 50200)
+    arg_parser.add_argument("--cache", action = "store_true", help = "keep NewsFetcher http cache (off to measure crawling)")
+    arg_parser.add_argument("--max-p99-ms", type = float, default = None)
+    args = arg_parser.parse_args()
+
+    if args.record :
+        record(args.fixtures, args.record, args.days)
+        sys.exit(0)
+
+    if args.synthesize :
+        # a fixed time, so rebuilding the fixtures gives the same files
+        recorded_at = datetime.datetime(2020, 6, 1, 12)
+        record(args.fixtures, args.synthesize, args.days, lambda url : page_for(url, recorded_at, args.synthesize), recorded_at)
+        sys.exit(0)
+
+    if not args.cache :
+        NewsFetcher.CACHE = None
+
+    stub = serve(args.fixtures, args.port, args.delay, args.jitter)
+    sys.exit(0 if run(stub, args.port, args.fixtures, args.queries, args.concurrency, args.warmup, args.max_p99_ms) else 1)
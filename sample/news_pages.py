@@ -0,0 +1,188 @@
+"""
+Synthetic Pages For The News Crawlers
+
+builds pages in the markup each crawler's extract function reads, so the extraction benchmark and the load test run
+without network : page_for() answers every url a crawler's search requests (news_load_test.py --synthesize records them)
+extraction fixtures are wrapped in FILLER (menus and scripts the strainers have to skip), about 90 KiB per page
+
+    python news_pages.py --extract news_extract_fixtures
+"""
+import datetime
+import json
+import os
+from argparse import ArgumentParser
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+def filler( blocks: int ) -> str :
+    return "".join('<div class="nav"><ul>' + "".join(f'<li><a href="/x{j}">選單{j}</a></li>' for j in range(30)) +
+                   '</ul></div><script>var a = 1;</script>' for _ in range(blocks))
+
+
+# 40 menus and scripts, on both sides of the content
+FILLER = filler(40)
+# smaller pages for the load test, about 11 KiB
+LOAD_FILLER = filler(5)
+
+# search result pages of every site, articles per page
+SEARCH_PAGES = 3
+PER_PAGE = 10
+
+
+def text_of( i: int ) -> str :
+    return f"第{i}篇內容。後面的文字"
+
+
+def ltn_search( items: list, filler = FILLER ) -> str :
+    """
+    :param items: list of (url, datetime, text)
+    """
+
+    rows = "".join(f'<li><a class="tit" href="{url}">標題{i}</a><span class="time">{date:%Y/%m/%d}</span>'
+                   f'<div class="cont"><p>{text}</p></div></li>' for i, (url, date, text) in enumerate(items))
+    return (f'<html><head><title>t</title></head><body>{filler}<div class="mark">共有 {len(items)} 項結果</div>'
+            f'<ul>{rows}</ul>{filler}</body></html>')
+
+
+def ettoday_search( items: list, page = 1, pages = 5, filler = FILLER ) -> str :
+    rows = "".join(f'<div class="box_2"><h2><a href="{url}">標題{i}</a></h2>'
+                   f'<p class="detail">{text}<span class="date">(新聞 / {date:%Y-%m-%d %H:%M})</span></p></div>'
+                   for i, (url, date, text) in enumerate(items))
+    return f'<html><body>{filler}<p class="info">第{page}頁，共{pages}頁</p>{rows}{filler}</body></html>'
+
+
+def chinatimes_search( items: list, filler = FILLER ) -> str :
+    rows = "".join(f'<li><h3 class="title"><a href="{url}">標題{i}</a></h3><span class="date">{date:%Y/%m/%d}</span>'
+                   f'<p class="intro">{text}</p></li>' for i, (url, date, text) in enumerate(items))
+    return (f'<html><body>{filler}<span class="search-result-count">{len(items):02d}</span>'
+            f'<ul>{rows}</ul>{filler}</body></html>')
+
+
+def setn_search( items: list, filler = FILLER ) -> str :
+    rows = "".join(f'<div class="newsimg-area-info"><a href="{url}">{text}</a></div>'
+                   f'<div class="newsimg-date">{date:%Y/%m/%d %H:%M}</div>' for url, date, text in items)
+    return f'<html><body>{filler}{rows}{filler}</body></html>'
+
+
+def tvbs_search( items: list, count: int or None = None, filler = FILLER ) -> str :
+    """
+    :param count: result count shown on the first page, None for later pages
+    """
+
+    header = "" if count is None else f'<h1 class="search_result">搜尋結果共: {count} 筆</h1>'
+    rows = "".join(f'<div class="search_list_text"><a href="{url}">標題{i}</a></div>'
+                   f'<span class="publish_date display_none">{date:%Y/%m/%d %H:%M}</span>'
+                   for i, (url, date, text) in enumerate(items))
+    return f'<html><body>{filler}{header}{rows}{filler}</body></html>'
+
+
+def tvbs_article( text: str, filler = FILLER ) -> str :
+    return f'<html><body>{filler}<div class="article_content"><p>{text}</p></div>{filler}</body></html>'
+
+
+def ncku_listing( urls: list, filler = FILLER ) -> str :
+    rows = "".join(f'<div class="mtitle"><a href="{url}">標題{i}</a></div>' for i, url in enumerate(urls))
+    return f'<html><body>{filler}{rows}{filler}</body></html>'
+
+
+def ncku_article( date: datetime, title = "成大新聞", paragraphs = 10, paragraph = "段落", filler = FILLER ) -> str :
+    article = (f'<h2 class="hdline">{title}</h2><span class="mattr-val">x</span><span class="mattr-val">{date:%Y-%m-%d}</span>'
+               '<div>' + "".join(f'<p><span style="font-size:1.125em;">{paragraph}{i}</span></p>' for i in range(paragraphs)) +
+               '</div>')
+    return f'<html><body>{filler}{article}{filler}</body></html>'
+
+
+def udn_search( items: list, last: bool ) -> str :
+    lists = [{ "titleLink" : url, "time" : { "date" : f"{date:%Y-%m-%d %H:%M}" }, "paragraph" : text } for url, date, text in items]
+    return json.dumps({ "end" : last, "lists" : lists }, ensure_ascii = False)
+
+
+def page_for( url: str, now: datetime, keywords: list ) -> str or None :
+    """
+    a synthetic page for any url a crawler's search requests : SEARCH_PAGES pages of PER_PAGE results, newest first and
+    an hour apart from now, whose text contains every keyword
+
+    :return: page, None for urls no crawler requests
+    """
+
+    parts = urlsplit(url)
+    host, path, query = parts.netloc, unquote(parts.path), parse_qs(parts.query)
+    text = "".join(keywords) + "的相關報導"
+
+    def items( page: int, url_format: str ) -> list :
+        if page > SEARCH_PAGES :
+            return []
+        first = (page - 1) * PER_PAGE
+        return [(url_format.format(first + i), now - datetime.timedelta(hours = first + i), text) for i in range(PER_PAGE)]
+
+    def page_number( value: str or None ) -> int :
+        return int(value) if value and value.isdigit() else 1
+
+    if host == "udn.com" and path == "/api/more" :
+        page = page_number(query.get("page", [""])[0])
+        return udn_search(items(page, "/news/story/{}"), page >= SEARCH_PAGES)
+
+    if host == "search.ltn.com.tw" :
+        return ltn_search(items(page_number(query.get("page", [""])[0]), "https://news.ltn.com.tw/news/{}"), LOAD_FILLER)
+
+    if host == "www.ettoday.net" and path.startswith("/news_search/") :
+        page = page_number(query.get("page", [""])[0])
+        return ettoday_search(items(page, "https://www.ettoday.net/news/{}.htm"), page, SEARCH_PAGES, LOAD_FILLER)
+
+    if host == "www.chinatimes.com" and path.startswith("/search/") :
+        page = page_number(parts.query[len("page") :] if parts.query.startswith("page") else "")
+        return chinatimes_search(items(page, "https://www.chinatimes.com/realtimenews/{}"), LOAD_FILLER)
+
+    if host == "www.setn.com" and path == "/search.aspx" :
+        return setn_search(items(page_number(query.get("p", [""])[0]), "News.aspx?NewsID={}"), LOAD_FILLER)
+
+    if host == "news.tvbs.com.tw" and path.startswith("/news/searchresult/") :
+        page = page_number(path.rstrip("/").rsplit("/", 1)[-1])
+        return tvbs_search(items(page, "https://news.tvbs.com.tw/life/{}"), SEARCH_PAGES * PER_PAGE if page == 1 else None,
+                           LOAD_FILLER)
+
+    if host == "news.tvbs.com.tw" and path.startswith("/life/") :
+        return tvbs_article(text, LOAD_FILLER)
+
+    if host == "web.ncku.edu.tw" and path.startswith("/p/403-") :
+        return ncku_listing([f"https://web.ncku.edu.tw/p/406-1000-{i},r3094.php?Lang=zh-tw" for i in range(PER_PAGE)],
+                            LOAD_FILLER)
+
+    if host == "web.ncku.edu.tw" and path.startswith("/p/406-") :
+        index = int(path[len("/p/406-1000-") :].split(",")[0])
+        return ncku_article(now - datetime.timedelta(days = index), f"成大新聞{index}", 3, text, LOAD_FILLER)
+
+    return None
+
+
+def extract_fixtures( directory: str ) -> None :
+    """
+    the pages news_extract_benchmark.py measures, one search page of every site and one ncku article
+    """
+
+    os.makedirs(directory, exist_ok = True)
+
+    def items( url: str ) -> list :
+        return [(url.format(i), datetime.datetime(2020, 5, i % 9 + 1, 10), text_of(i)) for i in range(20)]
+
+    pages = {
+        "ltn_search.html" : ltn_search(items("https://news.ltn.com.tw/{}")),
+        "ettoday_search.html" : ettoday_search(items("https://www.ettoday.net/news/{}.htm")),
+        "chinatimes_search.html" : chinatimes_search(items("https://www.chinatimes.com/realtimenews/{}")),
+        "setn_search.html" : setn_search(items("News.aspx?NewsID={}")),
+        "tvbs_search.html" : tvbs_search(items("https://news.tvbs.com.tw/life/{}"), 20),
+        "ncku_article.html" : ncku_article(datetime.datetime(2020, 5, 1)),
+    }
+    for filename, page in pages.items() :
+        with open(os.path.join(directory, filename), "w", encoding = "utf-8") as file :
+            file.write(page)
+
+
+if __name__ == '__main__' :
+    arg_parser = ArgumentParser(description = "synthetic pages for the news crawlers")
+    arg_parser.add_argument("--extract", metavar = "DIRECTORY", help = "write the extraction benchmark fixtures")
+    args = arg_parser.parse_args()
+
+    if args.extract :
+        extract_fixtures(args.extract)
+        print(f"fixtures written to {args.extract}")
@@ -0,0 +1,118 @@
+"""
+Local Stand-In For The News Sites
+
+replays pages recorded by news_load_test.py --record / --synthesize (fixtures/index.json : url -> file), with a configurable
+latency and jitter for every response, so the crawlers can be benchmarked on a machine without network
+
+crawler urls are rewritten to http://host:port/<scheme>/<site host>/<path and query>, see rewrite()
+
+    python news_stub_server.py --fixtures news_load_fixtures --port 50200 --delay 0.08 --jitter 0.04
+"""
+import json
+import os
+import random
+import threading
+import time
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit
+
+from requests.utils import requote_uri
+
+
+def normalize( url: str ) -> str :
+    # crawlers build urls with raw chinese keywords, requests sends them percent-encoded
+    return requote_uri(url)
+
+
+def rewrite( url: str, port: int, host = "127.0.0.1" ) -> str :
+    parts = urlsplit(url)
+    rest = parts.path + ("?" + parts.query if parts.query else "")
+    return f"http://{host}:{port}/{parts.scheme}/{parts.netloc}{rest}"
+
+
+def load_fixtures( directory: str ) -> dict :
+    """
+    :return: normalized url -> page bytes
+    """
+
+    with open(os.path.join(directory, "index.json"), encoding = "utf-8") as file :
+        index = json.load(file)
+
+    pages = { }
+    for url, filename in index.items() :
+        with open(os.path.join(directory, filename), "rb") as file :
+            pages[normalize(url)] = file.read()
+    return pages
+
+
+class StubServer(ThreadingMixIn, HTTPServer) :
+    daemon_threads = True
+    # crawlers open many connections at once, the default backlog of 5 drops some of them
+    request_queue_size = 128
+
+    def __init__( self, address, pages: dict, delay: float, jitter: float ) :
+        super().__init__(address, StubHandler)
+        self.pages = pages
+        self.delay = delay
+        self.jitter = jitter
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.missing = 0
+
+
+class StubHandler(BaseHTTPRequestHandler) :
+    # keep-alive, like the real sites
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes, nagle would hold the body until the client acks the headers
+    disable_nagle_algorithm = True
+
+    def do_GET( self ) :
+        scheme, host, rest = (self.path.lstrip("/").split("/", 2) + ["", ""])[:3]
+        page = self.server.pages.get(normalize(f"{scheme}://{host}/{rest}"))
+
+        with self.server.lock :
+            self.server.requests += 1
+            self.server.missing += page is None
+
+        delay = self.server.delay + random.uniform(-self.server.jitter, self.server.jitter)
+        if delay > 0 :
+            time.sleep(delay)
+
+        body = page if page is not None else b"not recorded"
+        self.send_response(200 if page is not None else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message( self, format, *args ) :
+        pass
+
+
+def serve( fixtures: str, port: int, delay = 0.0, jitter = 0.0, host = "127.0.0.1" ) -> StubServer :
+    """
+    start the stand-in server in a daemon thread
+
+    :return: StubServer (requests / missing counters)
+    """
+
+    server = StubServer((host, port), load_fixtures(fixtures), delay, jitter)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server
+
+
+if __name__ == '__main__' :
+    arg_parser = ArgumentParser(description = "Stand-in server for news sites")
+    arg_parser.add_argument("--fixtures", default = os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_load_fixtures"))
+    arg_parser.add_argument("--host", default = "127.0.0.1")
+    arg_parser.add_argument("--port", type = int, default = 50200)
+    arg_parser.add_argument("--delay", type = float, default = 0.0, help = "seconds before each response")
+    arg_parser.add_argument("--jitter", type = float, default = 0.0, help = "delay varies uniformly by +- jitter seconds")
+    args = arg_parser.parse_args()
+
+    server = serve(args.fixtures, args.port, args.delay, args.jitter, args.host)
+    print(f"{len(server.pages)} pages on {args.host}:{args.port}")
+    threading.Event().wait()